@@ -0,0 +1,77 @@
+import atexit
+import threading
+import time
+
+from django.conf import settings
+from django.db.models import F
+from django.utils import timezone
+
+from . import background
+from .buckets import record_requests
+from .models import NameCountryProbability, NameDistribution
+
+
+def write_accesses(batch):
+    """
+    Apply {(name, country_codes, hour): count} to the request counters, last
+    access times and hourly request buckets.
+
+    last_accessed is stamped when the batch is written rather than when the
+    lookups happened: incremental rollups pick up names by last_accessed since
+    their previous run, and a batch flushed after a run started must not carry
+    times from before it.
+    """
+    model = NameDistribution if settings.NAME_STORAGE == "compact" else NameCountryProbability
+    now = timezone.now()
+    for (name, country_codes, hour), count in batch.items():
+        model.objects.filter(name=name).update(
+            count_of_requests=F("count_of_requests") + count, last_accessed=now
+        )
+        record_requests(name, country_codes, now=hour, count=count)
+
+
+class AccessRecorder:
+    """
+    Counts name lookups away from the freshness check.
+
+    With ACCESS_FLUSH_INTERVAL=0 every lookup is written immediately. Otherwise
+    lookups are aggregated in memory and written by the background pool at
+    most once per interval, so cache hits do not write to the database.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pending = {}
+        self._last_flush = time.monotonic()
+
+    def record(self, name, country_codes):
+        now = timezone.now()
+        hour = now.replace(minute=0, second=0, microsecond=0)
+        key = (name, tuple(country_codes), hour)
+
+        interval = settings.ACCESS_FLUSH_INTERVAL
+        if interval <= 0:
+            write_accesses({key: 1})
+            return
+
+        with self._lock:
+            self._pending[key] = self._pending.get(key, 0) + 1
+            if time.monotonic() - self._last_flush < interval:
+                return
+            batch = self._take()
+        background.submit(write_accesses, batch)
+
+    def flush(self):
+        with self._lock:
+            batch = self._take()
+        if batch:
+            write_accesses(batch)
+
+    def _take(self):
+        batch, self._pending = self._pending, {}
+        self._last_flush = time.monotonic()
+        return batch
+
+
+recorder = AccessRecorder()
+atexit.register(recorder.flush)
@@ -1,6 +1,36 @@
-from django.contrib import admin
+from django.conf import settings
+from django.contrib import admin, messages
+from django.core.paginator import Paginator
+from django.db import connections
+from django.utils.functional import cached_property
 
-from .models import Country, NameCountryProbability
+from . import background
+from .models import Country, NameCountryProbability, NamePopularityArchive
+from .serializers import NameCountryProbabilitySerializer
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Uses PostgreSQL's planner statistics instead of COUNT(*) for unfiltered
+    changelists of large tables; small or filtered results are counted exactly.
+    """
+
+    exact_count_threshold = 100_000
+
+    @cached_property
+    def count(self):
+        query = self.object_list.query
+        connection = connections[self.object_list.db]
+        if connection.vendor == "postgresql" and not query.where:
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    "SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass",
+                    [query.model._meta.db_table],
+                )
+                row = cursor.fetchone()
+            if row and row[0] > self.exact_count_threshold:
+                return row[0]
+        return super().count
 
 
 @admin.register(Country)
@@ -8,12 +38,49 @@ class CountryAdmin(admin.ModelAdmin):
     list_display = ["code", "name", "region", "subregion"]
     list_filter = ["region", "subregion", "independent"]
     search_fields = ["code", "name", "official_name"]
-    filter_horizontal = ["borders"]
+    autocomplete_fields = ["borders"]
 
 
 @admin.register(NameCountryProbability)
 class NameCountryProbabilityAdmin(admin.ModelAdmin):
-    list_display = ["name", "country", "probability", "count_of_requests", "last_accessed"]
+    list_display = [
+        "name",
+        "country",
+        "probability",
+        "count_of_requests",
+        "last_accessed",
+        "fetched_at",
+    ]
+    list_select_related = ["country"]
     list_filter = ["country"]
-    search_fields = ["name"]
-    readonly_fields = ["count_of_requests", "last_accessed"]
+    # Prefix search is served by the UPPER(name) text_pattern_ops index.
+    search_fields = ["^name"]
+    readonly_fields = ["count_of_requests", "last_accessed", "fetched_at"]
+    autocomplete_fields = ["country"]
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    actions = ["refresh_names"]
+
+    @admin.action(description="Refresh selected names from Nationalize in the background")
+    def refresh_names(self, request, queryset):
+        limit = settings.ADMIN_REFRESH_MAX_NAMES
+        names = queryset.order_by().values_list("name", flat=True).distinct()
+        names = list(names[: limit + 1])
+        if len(names) > limit:
+            self.message_user(
+                request,
+                f"Select at most {limit} names to refresh; nothing was queued",
+                messages.ERROR,
+            )
+            return
+        for name in names:
+            background.submit(NameCountryProbabilitySerializer.refresh_probabilities, name)
+        self.message_user(request, f"Queued refresh of {len(names)} names")
+
+
+@admin.register(NamePopularityArchive)
+class NamePopularityArchiveAdmin(admin.ModelAdmin):
+    list_display = ["name", "country", "total_requests", "purged_rows", "last_purged_at"]
+    list_select_related = ["country"]
+    search_fields = ["^name"]
+    readonly_fields = ["total_requests", "purged_rows", "last_purged_at"]
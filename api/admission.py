@@ -0,0 +1,204 @@
+"""
+Admission control for the name and popular names endpoints.
+
+The service is overloaded when more than ADMISSION_MAX_CONCURRENCY requests
+are in flight across all workers, or when the request waited longer than
+ADMISSION_MAX_QUEUE_DELAY in front of the worker, as told by the proxy's
+X-Request-Start header. Overloaded requests are still served when the answer
+is stored: name lookups skip upstream calls, return stale predictions if there
+are any and are rejected with a 503 otherwise.
+
+FairShareThrottle splits ADMISSION_RATE requests per window between the
+clients seen in that window.
+
+Both keep their counters in the default cache so that every worker sees the
+same numbers. When the cache is unavailable, requests are let through.
+"""
+
+import logging
+import math
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework.exceptions import Throttled
+from rest_framework.throttling import BaseThrottle
+
+from .metrics import ADMISSION, ADMISSION_CACHE_ERRORS, IN_FLIGHT, QUEUE_DELAY
+
+logger = logging.getLogger(__name__)
+
+REQUEST_START_HEADER = "HTTP_X_REQUEST_START"
+
+
+class Overloaded(Exception):
+    """The request would need upstream calls while the service is overloaded."""
+
+
+def queue_delay(request, now=None):
+    """
+    Seconds between the proxy receiving the request and now, or None without a
+    usable X-Request-Start header. Accepts "t=<seconds>" as sent by nginx and
+    the millisecond and microsecond timestamps of other proxies.
+    """
+    value = request.META.get(REQUEST_START_HEADER, "").strip().removeprefix("t=")
+    try:
+        started = float(value)
+    except ValueError:
+        return None
+    if started <= 0:
+        return None
+
+    now = time.time() if now is None else now
+    while started > now * 100:
+        started /= 1000
+    return max(0.0, now - started)
+
+
+def _incr(key, timeout):
+    cache.add(key, 0, timeout=timeout)
+    try:
+        return cache.incr(key)
+    except ValueError:
+        # Expired between add() and incr().
+        cache.set(key, 1, timeout=timeout)
+        return 1
+
+
+def _cache_failed(operation):
+    logger.warning("Admission counters unavailable (%s), admitting", operation, exc_info=True)
+    ADMISSION_CACHE_ERRORS.labels(operation=operation).inc()
+
+
+class AdmissionController:
+    """
+    Counts requests in flight across workers. Each request increments the
+    counter of the slot it started in and decrements the same counter when it
+    ends, so the current and the previous slot together hold every request
+    shorter than a slot. Increments of killed workers expire with their slot.
+    """
+
+    key_prefix = "admission:in-flight"
+
+    def _key(self, slot):
+        return f"{self.key_prefix}:{slot}"
+
+    @contextmanager
+    def admit(self, request):
+        """Track the request while it runs; yields whether the service is overloaded."""
+        delay = queue_delay(request)
+        if delay is not None:
+            QUEUE_DELAY.observe(delay)
+
+        key, in_flight = self._enter()
+        IN_FLIGHT.inc()
+        try:
+            yield self.is_overloaded(in_flight, delay)
+        finally:
+            IN_FLIGHT.dec()
+            if key is not None:
+                self._leave(key)
+
+    def in_flight(self):
+        slot = int(time.time() // settings.ADMISSION_IN_FLIGHT_SLOT_SECONDS)
+        counts = cache.get_many([self._key(slot), self._key(slot - 1)])
+        return sum(counts.values())
+
+    def _enter(self):
+        if not settings.ADMISSION_MAX_CONCURRENCY:
+            return None, None
+
+        slot_seconds = settings.ADMISSION_IN_FLIGHT_SLOT_SECONDS
+        slot = int(time.time() // slot_seconds)
+        key = self._key(slot)
+        try:
+            current = _incr(key, timeout=slot_seconds * 2 + 1)
+            previous = cache.get(self._key(slot - 1), 0)
+        except Exception:
+            _cache_failed("in-flight")
+            return None, None
+        return key, current + max(previous, 0)
+
+    def _leave(self, key):
+        try:
+            cache.decr(key)
+        except ValueError:
+            # The slot expired: the request outlived two slots.
+            pass
+        except Exception:
+            _cache_failed("in-flight")
+
+    @staticmethod
+    def is_overloaded(in_flight, delay):
+        max_concurrency = settings.ADMISSION_MAX_CONCURRENCY
+        if max_concurrency and in_flight is not None and in_flight > max_concurrency:
+            return True
+        max_delay = settings.ADMISSION_MAX_QUEUE_DELAY
+        return bool(max_delay and delay is not None and delay > max_delay)
+
+
+controller = AdmissionController()
+
+
+class FairShareThrottle(BaseThrottle):
+    """
+    While the requests of the current window stay within ADMISSION_RATE every
+    client is let through. Past it, a client gets an equal share of the rate
+    among the clients seen in the window, so one busy client cannot starve the
+    others.
+    """
+
+    key_prefix = "admission"
+
+    def allow_request(self, request, view):
+        rate = settings.ADMISSION_RATE
+        if not rate:
+            return True
+
+        self.window = settings.ADMISSION_WINDOW_SECONDS
+        self.now = time.time()
+        prefix = f"{self.key_prefix}:{int(self.now // self.window)}"
+        # Keys outlive their window a little so a late increment never
+        # recreates an expired counter.
+        timeout = int(self.window) * 2 + 1
+
+        try:
+            requests = _incr(f"{prefix}:client:{self.get_ident(request)}", timeout)
+            if requests == 1:
+                clients = _incr(f"{prefix}:clients", timeout)
+            else:
+                clients = cache.get(f"{prefix}:clients", 1)
+            total = _incr(f"{prefix}:total", timeout)
+        except Exception:
+            _cache_failed("throttle")
+            return True
+
+        if total <= rate or requests <= max(1, rate // max(clients, 1)):
+            return True
+        ADMISSION.labels(view=getattr(view, "admission_name", ""), decision="throttled").inc()
+        return False
+
+    def wait(self):
+        return self.window - self.now % self.window
+
+
+class AdmissionControlMixin:
+    """
+    For APIViews: throttles by fair share and sets `request.overloaded` for
+    the handler to decide how much work it may do.
+    """
+
+    admission_name = ""
+    throttle_classes = [FairShareThrottle]
+
+    def dispatch(self, request, *args, **kwargs):
+        with controller.admit(request) as overloaded:
+            request.overloaded = overloaded
+            return super().dispatch(request, *args, **kwargs)
+
+    def throttled(self, request, wait):
+        # Same body as the other errors of these views; DRF adds Retry-After.
+        exc = Throttled(detail={"error": "Too many requests, retry later"})
+        exc.wait = math.ceil(wait) if wait is not None else None
+        raise exc
@@ -1,6 +1,20 @@
 from django.apps import AppConfig
+from django.db.models.signals import m2m_changed, post_delete, post_save
 
 
 class ApiConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "api"
+
+    def ready(self):
+        from .borders import invalidate_adjacency
+        from .geo import invalidate_grid
+        from .models import Country
+
+        post_save.connect(invalidate_grid, sender=Country, dispatch_uid="geo-grid-save")
+        post_delete.connect(invalidate_grid, sender=Country, dispatch_uid="geo-grid-delete")
+        m2m_changed.connect(
+            invalidate_adjacency, sender=Country.borders.through, dispatch_uid="borders-changed"
+        )
+        post_save.connect(invalidate_adjacency, sender=Country, dispatch_uid="borders-save")
+        post_delete.connect(invalidate_adjacency, sender=Country, dispatch_uid="borders-delete")
@@ -0,0 +1,44 @@
+import logging
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+_lock = threading.Lock()
+
+
+def _get_executor():
+    global _executor
+    with _lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.BACKGROUND_WORKERS, thread_name_prefix="api-background"
+            )
+        return _executor
+
+
+def _run(fn, args, kwargs):
+    try:
+        return fn(*args, **kwargs)
+    except Exception:
+        logger.exception("Background task %s failed", getattr(fn, "__qualname__", fn))
+        raise
+    finally:
+        # Every pool thread has its own connections; do not leave them open.
+        connections.close_all()
+
+
+def submit(fn, *args, **kwargs):
+    """Run `fn` in the process-wide thread pool and return its Future."""
+    if settings.BACKGROUND_TASKS_EAGER:
+        future = Future()
+        try:
+            future.set_result(fn(*args, **kwargs))
+        except Exception as e:
+            future.set_exception(e)
+        return future
+    return _get_executor().submit(_run, fn, args, kwargs)
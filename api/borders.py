@@ -0,0 +1,80 @@
+import heapq
+from collections import defaultdict
+
+from django.conf import settings
+from django.db.models import F, Window
+from django.db.models.functions import RowNumber
+
+from .indexes import RefreshingIndex
+from .models import Country, NameCountryProbability
+
+
+def build_adjacency():
+    adjacency = defaultdict(set)
+    for code in Country.objects.values_list("code", flat=True):
+        adjacency[code]
+    # The relation is symmetrical, so the through table already holds both directions.
+    for source, target in Country.borders.through.objects.values_list(
+        "from_country_id", "to_country_id"
+    ):
+        adjacency[source].add(target)
+    return {code: frozenset(neighbours) for code, neighbours in adjacency.items()}
+
+
+_adjacency = RefreshingIndex(build_adjacency, ttl=lambda: settings.BORDER_GRAPH_TTL)
+get_adjacency = _adjacency.get
+invalidate_adjacency = _adjacency.invalidate
+
+
+def neighbourhood(country_code, hops):
+    """Hop distance of every country reachable within `hops` borders, or None if unknown."""
+    adjacency = get_adjacency()
+    if country_code not in adjacency:
+        return None
+
+    distances = {country_code: 0}
+    frontier = [country_code]
+    for hop in range(1, hops + 1):
+        next_frontier = []
+        for code in frontier:
+            for neighbour in adjacency.get(code, ()):
+                if neighbour not in distances:
+                    distances[neighbour] = hop
+                    next_frontier.append(neighbour)
+        frontier = next_frontier
+    return distances
+
+
+def top_names_per_country(country_codes, per_country):
+    """The `per_country` most requested names of each country, in one query."""
+    ranked = (
+        NameCountryProbability.objects.filter(country_id__in=country_codes, count_of_requests__gt=0)
+        .annotate(
+            rank=Window(
+                RowNumber(),
+                partition_by=[F("country_id")],
+                order_by=[F("count_of_requests").desc(), F("name").asc()],
+            )
+        )
+        .filter(rank__lte=per_country)
+        .values_list("country_id", "name", "count_of_requests")
+    )
+    lists = defaultdict(list)
+    for code, name, count in ranked:
+        lists[code].append((name, count))
+    return lists
+
+
+def merge_top_lists(lists, limit):
+    """
+    Sum the per-country lists by name and keep the `limit` largest.
+
+    Names missing from a country's list contribute nothing for that country,
+    so totals are lower bounds once a list is cut off at its length.
+    """
+    totals = defaultdict(int)
+    for entries in lists.values():
+        for name, count in entries:
+            totals[name] += count
+    best = heapq.nsmallest(limit, totals.items(), key=lambda item: (-item[1], item[0]))
+    return [{"name": name, "total_requests": total} for name, total in best]
@@ -0,0 +1,121 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Sum
+from django.db.models.functions import TruncDay
+from django.utils import timezone
+
+from .models import NameRequestBucket
+
+WINDOWS = {
+    "24h": timedelta(hours=24),
+    "7d": timedelta(days=7),
+    "30d": timedelta(days=30),
+}
+
+
+def record_requests(name, country_codes, now=None, count=1):
+    """Count `count` requests of `name` in the current hourly bucket of every country."""
+    if not country_codes:
+        return
+    hour = (now or timezone.now()).replace(minute=0, second=0, microsecond=0)
+
+    # Creating the missing buckets first and then incrementing keeps it at two
+    # statements and loses no increments when workers race on a new bucket.
+    NameRequestBucket.objects.bulk_create(
+        [
+            NameRequestBucket(
+                name=name, country_id=code, granularity=NameRequestBucket.HOUR, bucket_start=hour
+            )
+            for code in country_codes
+        ],
+        ignore_conflicts=True,
+    )
+    NameRequestBucket.objects.filter(
+        name=name,
+        country_id__in=country_codes,
+        granularity=NameRequestBucket.HOUR,
+        bucket_start=hour,
+    ).update(count=F("count") + count)
+
+
+def window_totals(country_code, window):
+    """Requests per name for a country over the window, at bucket resolution."""
+    cutoff = timezone.now() - WINDOWS[window]
+    return (
+        NameRequestBucket.objects.filter(country_id=country_code, bucket_start__gte=cutoff)
+        .values("name")
+        .annotate(total_requests=Sum("count"))
+    )
+
+
+def _fold_into_days(hourly_ids):
+    days = (
+        NameRequestBucket.objects.filter(id__in=hourly_ids)
+        .annotate(day=TruncDay("bucket_start"))
+        .values("name", "country_id", "day")
+        .annotate(total=Sum("count"))
+        .order_by()
+    )
+    totals = {(row["name"], row["country_id"], row["day"]): row["total"] for row in days}
+    existing = {
+        (bucket.name, bucket.country_id, bucket.bucket_start): bucket.count
+        for bucket in NameRequestBucket.objects.filter(
+            granularity=NameRequestBucket.DAY,
+            bucket_start__in={day for _, _, day in totals},
+            name__in={name for name, _, _ in totals},
+        )
+    }
+    NameRequestBucket.objects.bulk_create(
+        [
+            NameRequestBucket(
+                name=name,
+                country_id=code,
+                granularity=NameRequestBucket.DAY,
+                bucket_start=day,
+                count=existing.get((name, code, day), 0) + total,
+            )
+            for (name, code, day), total in totals.items()
+        ],
+        update_conflicts=True,
+        unique_fields=["name", "country", "granularity", "bucket_start"],
+        update_fields=["count"],
+    )
+    NameRequestBucket.objects.filter(id__in=hourly_ids).delete()
+
+
+def compact_buckets(batch_size=1000, now=None):
+    """
+    Fold hourly buckets older than REQUEST_BUCKET_HOURLY_RETENTION into daily
+    ones and drop daily buckets older than REQUEST_BUCKET_DAILY_RETENTION.
+
+    Run it from a single process (cron); it does not guard against itself.
+    """
+    now = now or timezone.now()
+    hourly_cutoff = (now - timedelta(hours=settings.REQUEST_BUCKET_HOURLY_RETENTION)).replace(
+        hour=0, minute=0, second=0, microsecond=0
+    )
+    folded = 0
+    last_id = 0
+
+    while True:
+        hourly_ids = list(
+            NameRequestBucket.objects.filter(
+                granularity=NameRequestBucket.HOUR, bucket_start__lt=hourly_cutoff, id__gt=last_id
+            )
+            .order_by("id")
+            .values_list("id", flat=True)[:batch_size]
+        )
+        if not hourly_ids:
+            break
+        last_id = hourly_ids[-1]
+        with transaction.atomic():
+            _fold_into_days(hourly_ids)
+        folded += len(hourly_ids)
+
+    expired, _ = NameRequestBucket.objects.filter(
+        granularity=NameRequestBucket.DAY,
+        bucket_start__lt=now - timedelta(days=settings.REQUEST_BUCKET_DAILY_RETENTION),
+    ).delete()
+    return folded, expired
@@ -0,0 +1,49 @@
+import logging
+import threading
+
+from . import background
+
+logger = logging.getLogger(__name__)
+
+_lock = threading.RLock()
+_inflight = {}
+
+
+def enrich(code, fetch):
+    """
+    Run `fetch(code)` in the background pool and return its Future. Requests
+    that need the same country while it is being fetched share one call.
+    """
+    with _lock:
+        future = _inflight.get(code)
+        created = future is None
+        if created:
+            future = background.submit(fetch, code)
+            _inflight[code] = future
+
+    if created:
+        future.add_done_callback(lambda _: _forget(code, future))
+    return future
+
+
+def _forget(code, future):
+    with _lock:
+        if _inflight.get(code) is future:
+            del _inflight[code]
+
+
+def when_all_done(futures, fn, *args):
+    """Submit `fn(*args)` to the background pool once every future has finished."""
+    futures = list(futures)
+    remaining = [len(futures)]
+    lock = threading.Lock()
+
+    def done(_):
+        with lock:
+            remaining[0] -= 1
+            last = remaining[0] == 0
+        if last:
+            background.submit(fn, *args)
+
+    for future in futures:
+        future.add_done_callback(done)
@@ -0,0 +1,141 @@
+import csv
+import json
+import zlib
+from datetime import datetime, time
+
+from django.conf import settings
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+from .models import Country, NameCountryProbability, NameDistribution
+
+FIELDS = [
+    "name",
+    "country",
+    "country_name",
+    "region",
+    "subregion",
+    "probability",
+    "count_of_requests",
+    "last_accessed",
+]
+CHUNK_SIZE = 2000
+FLUSH_BYTES = 64 * 1024
+
+
+def export_rows(country=None, region=None, accessed_from=None, accessed_to=None):
+    """Yield one tuple per (name, country) in FIELDS order, reading in chunks."""
+    if settings.NAME_STORAGE == "compact":
+        yield from _compact_rows(country, region, accessed_from, accessed_to)
+        return
+
+    queryset = NameCountryProbability.objects.order_by()
+    if country:
+        queryset = queryset.filter(country_id=country)
+    if region:
+        queryset = queryset.filter(country__region=region)
+    if accessed_from:
+        queryset = queryset.filter(last_accessed__gte=accessed_from)
+    if accessed_to:
+        queryset = queryset.filter(last_accessed__lt=accessed_to)
+
+    yield from queryset.values_list(
+        "name",
+        "country_id",
+        "country__name",
+        "country__region",
+        "country__subregion",
+        "probability",
+        "count_of_requests",
+        "last_accessed",
+    ).iterator(chunk_size=CHUNK_SIZE)
+
+
+def _compact_rows(country, region, accessed_from, accessed_to):
+    countries = {
+        code: (name, country_region, subregion)
+        for code, name, country_region, subregion in Country.objects.values_list(
+            "code", "name", "region", "subregion"
+        )
+    }
+    queryset = NameDistribution.objects.order_by()
+    if country:
+        queryset = queryset.filter(countries__has_key=country)
+    if accessed_from:
+        queryset = queryset.filter(last_accessed__gte=accessed_from)
+    if accessed_to:
+        queryset = queryset.filter(last_accessed__lt=accessed_to)
+
+    for name, distribution, count, last_accessed in queryset.values_list(
+        "name", "countries", "count_of_requests", "last_accessed"
+    ).iterator(chunk_size=CHUNK_SIZE):
+        for code, probability in distribution.items():
+            details = countries.get(code, ("", "", ""))
+            if (country and code != country) or (region and details[1] != region):
+                continue
+            yield (name, code, *details, probability, count, last_accessed)
+
+
+def parse_timestamp(value):
+    parsed = parse_datetime(value)
+    if parsed is None:
+        parsed_date = parse_date(value)
+        if parsed_date is None:
+            raise ValueError(f"Invalid date: {value}")
+        parsed = datetime.combine(parsed_date, time.min)
+    if timezone.is_naive(parsed):
+        parsed = timezone.make_aware(parsed)
+    return parsed
+
+
+def _buffered(pieces):
+    buffer = []
+    size = 0
+    for piece in pieces:
+        buffer.append(piece)
+        size += len(piece)
+        if size >= FLUSH_BYTES:
+            yield "".join(buffer).encode()
+            buffer, size = [], 0
+    if buffer:
+        yield "".join(buffer).encode()
+
+
+def _ndjson_lines(rows):
+    for row in rows:
+        record = dict(zip(FIELDS, row))
+        if record["last_accessed"] is not None:
+            record["last_accessed"] = record["last_accessed"].isoformat()
+        yield json.dumps(record, ensure_ascii=False) + "\n"
+
+
+class _Line:
+    def write(self, value):
+        return value
+
+
+def _csv_lines(rows):
+    writer = csv.writer(_Line())
+    yield writer.writerow(FIELDS)
+    for row in rows:
+        yield writer.writerow(row)
+
+
+RENDERERS = {
+    "ndjson": (_ndjson_lines, "application/x-ndjson"),
+    "csv": (_csv_lines, "text/csv"),
+}
+
+
+def render(rows, output):
+    lines, content_type = RENDERERS[output]
+    return _buffered(lines(rows)), content_type
+
+
+def gzip_stream(chunks):
+    compressor = zlib.compressobj(wbits=zlib.MAX_WBITS | 16)
+    for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
@@ -0,0 +1,49 @@
+from datetime import timedelta
+
+from django.conf import settings
+
+from .metrics import REFRESH_DRIFT, REFRESH_TTL, TTL_ADJUSTMENTS
+
+
+def is_fresh(prediction, now):
+    """Whether a stored row or distribution can be served without refetching."""
+    if not settings.NAME_TTL_ADAPTIVE:
+        # TTLs stored while adaptive refresh was on may have grown up to
+        # NAME_TTL_MAX_HOURS; switching it off restores the fixed TTL at once.
+        return prediction.fetched_at + timedelta(hours=settings.NAME_TTL_DEFAULT_HOURS) >= now
+    return prediction.fetched_at + prediction.refresh_ttl >= now
+
+
+def total_variation(old, new):
+    """Total variation distance between two {country_code: probability} mappings."""
+    return sum(abs(old.get(code, 0.0) - new.get(code, 0.0)) for code in old.keys() | new.keys()) / 2
+
+
+def next_ttl(previous_ttl, old, new):
+    """
+    TTL for a distribution that has just been fetched.
+
+    Names whose predictions did not move since the last fetch are refetched
+    less and less often, names whose predictions changed more often, within
+    NAME_TTL_MIN_HOURS and NAME_TTL_MAX_HOURS.
+    """
+    default = timedelta(hours=settings.NAME_TTL_DEFAULT_HOURS)
+    if not settings.NAME_TTL_ADAPTIVE or not old or previous_ttl is None:
+        ttl = default
+    else:
+        drift = total_variation(old, new)
+        REFRESH_DRIFT.observe(drift)
+        if drift <= settings.NAME_TTL_STABLE_DRIFT:
+            direction, ttl = "grow", previous_ttl * settings.NAME_TTL_FACTOR
+        elif drift >= settings.NAME_TTL_UNSTABLE_DRIFT:
+            direction, ttl = "shrink", previous_ttl / settings.NAME_TTL_FACTOR
+        else:
+            direction, ttl = "keep", previous_ttl
+        ttl = min(
+            max(ttl, timedelta(hours=settings.NAME_TTL_MIN_HOURS)),
+            timedelta(hours=settings.NAME_TTL_MAX_HOURS),
+        )
+        TTL_ADJUSTMENTS.labels(direction=direction).inc()
+
+    REFRESH_TTL.observe(ttl.total_seconds())
+    return ttl
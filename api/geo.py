@@ -0,0 +1,108 @@
+import math
+from collections import defaultdict
+
+import numpy as np
+from django.conf import settings
+
+from .indexes import RefreshingIndex
+from .models import Country
+
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE = math.pi * EARTH_RADIUS_KM / 180
+
+
+def haversine_km(latitude, longitude, latitudes, longitudes):
+    """Distances from one point to arrays of points, in kilometres."""
+    lat1 = np.radians(latitude)
+    lat2 = np.radians(latitudes)
+    dlat = lat2 - lat1
+    dlon = np.radians(longitudes) - np.radians(longitude)
+    a = np.sin(dlat / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin(dlon / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0, 1)))
+
+
+class CapitalGrid:
+    """
+    Capitals bucketed into fixed latitude/longitude cells.
+
+    A radius query only computes distances for capitals in the cells that
+    overlap the search box, so its cost follows the density around the point
+    instead of the number of countries.
+    """
+
+    def __init__(self, codes, latitudes, longitudes, cell_degrees):
+        self.codes = np.asarray(codes)
+        self.latitudes = np.asarray(latitudes, dtype=np.float64)
+        self.longitudes = np.asarray(longitudes, dtype=np.float64)
+        self.cell_degrees = cell_degrees
+        self.lon_cells = math.ceil(360 / cell_degrees)
+
+        cells = defaultdict(list)
+        for i, (lat, lon) in enumerate(zip(self.latitudes, self.longitudes)):
+            cells[self._cell(lat, lon)].append(i)
+        self.cells = {cell: np.array(indices) for cell, indices in cells.items()}
+
+    @classmethod
+    def from_countries(cls, cell_degrees):
+        rows = list(
+            Country.objects.filter(
+                capital_latitude__isnull=False, capital_longitude__isnull=False
+            ).values_list("code", "capital_latitude", "capital_longitude")
+        )
+        codes, latitudes, longitudes = zip(*rows) if rows else ((), (), ())
+        return cls(codes, latitudes, longitudes, cell_degrees)
+
+    def _cell(self, latitude, longitude):
+        return (
+            math.floor((latitude + 90) / self.cell_degrees),
+            math.floor((longitude + 180) / self.cell_degrees) % self.lon_cells,
+        )
+
+    def _candidate_cells(self, latitude, longitude, radius_km):
+        lat_span = radius_km / KM_PER_DEGREE
+        low_lat, high_lat = max(latitude - lat_span, -90), min(latitude + lat_span, 90)
+        lat_rows = range(self._cell(low_lat, 0)[0], self._cell(high_lat, 0)[0] + 1)
+
+        # Longitude degrees shrink towards the poles; close to them every column is needed.
+        widest = max(abs(low_lat), abs(high_lat))
+        cos_lat = math.cos(math.radians(widest))
+        lon_span = radius_km / (KM_PER_DEGREE * cos_lat) if cos_lat > 1e-6 else 360
+        if lon_span >= 180:
+            lon_columns = range(self.lon_cells)
+        else:
+            first = self._cell(latitude, longitude - lon_span)[1]
+            count = math.ceil(2 * lon_span / self.cell_degrees) + 1
+            lon_columns = {(first + step) % self.lon_cells for step in range(count)}
+
+        return [(row, column) for row in lat_rows for column in lon_columns]
+
+    def within(self, latitude, longitude, radius_km):
+        """(code, distance in km) of capitals within the radius, nearest first."""
+        buckets = [
+            self.cells[cell]
+            for cell in self._candidate_cells(latitude, longitude, radius_km)
+            if cell in self.cells
+        ]
+        if not buckets:
+            return []
+
+        candidates = np.concatenate(buckets)
+        distances = haversine_km(
+            latitude, longitude, self.latitudes[candidates], self.longitudes[candidates]
+        )
+        inside = distances <= radius_km
+        order = np.argsort(distances[inside])
+        return [
+            (str(code), float(distance))
+            for code, distance in zip(
+                self.codes[candidates][inside][order], distances[inside][order]
+            )
+        ]
+
+
+_grid = RefreshingIndex(
+    lambda: CapitalGrid.from_countries(settings.GEO_GRID_CELL_DEGREES),
+    ttl=lambda: settings.GEO_INDEX_TTL,
+)
+get_grid = _grid.get
+invalidate_grid = _grid.invalidate
@@ -0,0 +1,200 @@
+import email.utils
+import hashlib
+import json
+import os
+import tempfile
+import threading
+
+import requests
+from requests.structures import CaseInsensitiveDict
+
+# The stored body is already decoded and complete, so these no longer apply.
+_DROPPED_HEADERS = {"connection", "content-encoding", "content-length", "transfer-encoding"}
+
+
+def parse_cache_control(value):
+    directives = {}
+    for part in (value or "").split(","):
+        key, _, argument = part.strip().partition("=")
+        if key:
+            directives[key.strip().lower()] = argument.strip().strip('"') or None
+    return directives
+
+
+def freshness_lifetime(headers, now, default_ttl):
+    """
+    Seconds a response may be served without revalidation, or None if it must
+    not be stored at all.
+    """
+    directives = parse_cache_control(headers.get("Cache-Control"))
+    if "no-store" in directives:
+        return None
+    if "no-cache" in directives:
+        return 0
+    for directive in ("s-maxage", "max-age"):
+        if directives.get(directive, "").isdigit():
+            return int(directives[directive])
+    if headers.get("Expires"):
+        try:
+            expires = email.utils.parsedate_to_datetime(headers["Expires"]).timestamp()
+        except (TypeError, ValueError):
+            return 0
+        return max(0, expires - now)
+    return default_ttl
+
+
+class CachedResponse:
+    def __init__(self, url, status, headers, body, stored_at, expires_at):
+        self.url = url
+        self.status = status
+        self.headers = CaseInsensitiveDict(headers)
+        self.body = body
+        self.stored_at = stored_at
+        self.expires_at = expires_at
+
+    def is_fresh(self, now):
+        return now < self.expires_at
+
+    def validators(self):
+        headers = {}
+        if self.headers.get("ETag"):
+            headers["If-None-Match"] = self.headers["ETag"]
+        if self.headers.get("Last-Modified"):
+            headers["If-Modified-Since"] = self.headers["Last-Modified"]
+        return headers
+
+    def to_response(self):
+        response = requests.Response()
+        response.url = self.url
+        response.status_code = self.status
+        response.headers = CaseInsensitiveDict(self.headers)
+        response._content = self.body
+        response.encoding = requests.utils.get_encoding_from_headers(response.headers)
+        response.from_cache = True
+        return response
+
+
+class ResponseCache:
+    """
+    Upstream responses on disk, one file per URL: a JSON metadata line followed
+    by the body. Files are replaced atomically, so several processes can share
+    the directory. When it grows past `max_bytes`, the least recently used
+    entries are removed.
+    """
+
+    def __init__(self, directory, max_bytes):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._size = None
+
+    def path(self, url):
+        key = hashlib.sha256(url.encode()).hexdigest()
+        return os.path.join(self.directory, key[:2], f"{key}.resp")
+
+    def load(self, url):
+        path = self.path(url)
+        try:
+            with open(path, "rb") as f:
+                meta = json.loads(f.readline())
+                body = f.read()
+            os.utime(path)
+        except (OSError, ValueError):
+            return None
+        if meta.get("url") != url:
+            return None
+        return CachedResponse(
+            url, meta["status"], meta["headers"], body, meta["stored_at"], meta["expires_at"]
+        )
+
+    def store(self, url, response, now, default_ttl):
+        lifetime = freshness_lifetime(response.headers, now, default_ttl)
+        if lifetime is None:
+            return
+        headers = {
+            key: value
+            for key, value in response.headers.items()
+            if key.lower() not in _DROPPED_HEADERS
+        }
+        self._write(
+            CachedResponse(
+                url, response.status_code, headers, response.content, now, now + lifetime
+            )
+        )
+
+    def revalidated(self, entry, not_modified, now, default_ttl):
+        """Refresh `entry` from a 304 response and return it."""
+        for key, value in not_modified.headers.items():
+            if key.lower() not in _DROPPED_HEADERS:
+                entry.headers[key] = value
+        lifetime = freshness_lifetime(entry.headers, now, default_ttl)
+        entry.stored_at, entry.expires_at = now, now + (lifetime or 0)
+        self._write(entry)
+        return entry
+
+    def _write(self, entry):
+        path = self.path(entry.url)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        meta = {
+            "url": entry.url,
+            "status": entry.status,
+            "headers": dict(entry.headers),
+            "stored_at": entry.stored_at,
+            "expires_at": entry.expires_at,
+        }
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            f.write(json.dumps(meta).encode() + b"\n")
+            f.write(entry.body)
+            size = f.tell()
+        try:
+            # Revalidations rewrite the same entry; only the difference counts.
+            replaced = os.path.getsize(path)
+        except OSError:
+            replaced = 0
+        os.replace(tmp_path, path)
+
+        with self._lock:
+            if self._size is None:
+                self._size = self.stats()[1]
+            else:
+                self._size += size - replaced
+            if self._size > self.max_bytes:
+                self._size = self._evict(int(self.max_bytes * 0.9))
+
+    def _entries(self):
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                if name.endswith(".resp"):
+                    path = os.path.join(root, name)
+                    try:
+                        stat = os.stat(path)
+                    except OSError:
+                        continue
+                    yield path, stat.st_size, stat.st_mtime
+
+    def _evict(self, target):
+        entries = sorted(self._entries(), key=lambda entry: entry[2])
+        total = sum(size for _, size, _ in entries)
+        for path, size, _ in entries:
+            if total <= target:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+        return total
+
+    def stats(self):
+        entries = list(self._entries())
+        return len(entries), sum(size for _, size, _ in entries)
+
+    def clear(self):
+        for path, _, _ in list(self._entries()):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+        with self._lock:
+            self._size = 0
@@ -0,0 +1,30 @@
+import threading
+import time
+
+
+class RefreshingIndex:
+    """
+    Lazily built in-memory structure shared by the threads of one process.
+
+    `invalidate` drops it right away (hooked to model signals, which only fire
+    in the process that made the change); other processes rebuild it once it
+    is older than `ttl` seconds.
+    """
+
+    def __init__(self, build, ttl):
+        self._build = build
+        self._ttl = ttl
+        self._lock = threading.Lock()
+        self._value = None
+        self._built_at = 0.0
+
+    def get(self):
+        with self._lock:
+            if self._value is None or time.monotonic() - self._built_at > self._ttl():
+                self._value = self._build()
+                self._built_at = time.monotonic()
+            return self._value
+
+    def invalidate(self, **kwargs):
+        with self._lock:
+            self._value = None
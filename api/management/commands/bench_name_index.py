@@ -0,0 +1,86 @@
+import random
+import statistics
+import string
+import tempfile
+import time
+from pathlib import Path
+
+from django.core.management.base import BaseCommand
+
+from api.name_index import NameIndex, write_index
+
+
+def memory_usage():
+    usage = {}
+    with open("/proc/self/status") as f:
+        for line in f:
+            key, _, value = line.partition(":")
+            if key in ("VmRSS", "RssAnon", "RssFile"):
+                usage[key] = int(value.split()[0])
+    return usage
+
+
+class Command(BaseCommand):
+    help = "Measure load time, lookup latency and resident memory of the name index"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--index", help="Existing index file; a synthetic one is built otherwise"
+        )
+        parser.add_argument("--names", type=int, default=200_000)
+        parser.add_argument("--lookups", type=int, default=100_000)
+
+    def handle(self, *args, **options):
+        rng = random.Random(0)
+        with tempfile.TemporaryDirectory() as directory:
+            path = options["index"]
+            names = []
+            if not path:
+                path = str(Path(directory) / "names.idx")
+                names = self.build_synthetic(path, options["names"], rng)
+
+            before = memory_usage()
+            start = time.perf_counter()
+            index = NameIndex(path)
+            load_ms = (time.perf_counter() - start) * 1000
+            after_load = memory_usage()
+
+            probes = [rng.choice(names) for _ in range(options["lookups"] // 2)] if names else []
+            probes += [
+                "".join(rng.choices(string.ascii_lowercase, k=9))
+                for _ in range(options["lookups"] - len(probes))
+            ]
+            rng.shuffle(probes)
+
+            timings = []
+            for probe in probes:
+                start = time.perf_counter_ns()
+                index.lookup(probe)
+                timings.append(time.perf_counter_ns() - start)
+            after_lookups = memory_usage()
+            index.close()
+
+        timings.sort()
+        self.stdout.write(f"index: {index.size} names, file {Path(path).name}")
+        self.stdout.write(f"open: {load_ms:.2f} ms")
+        self.stdout.write(
+            "lookup: mean {:.1f} us, p50 {:.1f} us, p99 {:.1f} us".format(
+                statistics.fmean(timings) / 1000,
+                timings[len(timings) // 2] / 1000,
+                timings[int(len(timings) * 0.99)] / 1000,
+            )
+        )
+        for label, usage in [("before", before), ("opened", after_load), ("probed", after_lookups)]:
+            self.stdout.write(
+                f"rss {label}: {usage['VmRSS']} kB "
+                f"(anon {usage['RssAnon']} kB, shared file pages {usage['RssFile']} kB)"
+            )
+
+    def build_synthetic(self, path, count, rng):
+        codes = [a + b for a in "ABCDEFGHIJ" for b in "KLMNOPQRST"]
+        distributions = {}
+        while len(distributions) < count:
+            name = "".join(rng.choices(string.ascii_lowercase, k=rng.randint(3, 10)))
+            distributions[name] = {code: rng.random() for code in rng.sample(codes, 5)}
+        write_index(path, distributions)
+        return list(distributions)
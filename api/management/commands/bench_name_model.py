@@ -0,0 +1,47 @@
+import random
+import string
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from api.ngram_model import NgramModel
+
+
+class Command(BaseCommand):
+    help = "Measure batch inference throughput of the n-gram model"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--model", default=settings.NGRAM_MODEL_PATH)
+        parser.add_argument("--names", type=int, default=20_000)
+        parser.add_argument("--batch-sizes", default="1,16,256,1024")
+
+    def handle(self, *args, **options):
+        rng = random.Random(0)
+        names = [
+            "".join(rng.choices(string.ascii_lowercase, k=rng.randint(3, 10)))
+            for _ in range(options["names"])
+        ]
+
+        if options["model"]:
+            model = NgramModel.load(options["model"])
+        else:
+            codes = [a + b for a in "ABCDEFGHIJ" for b in "KLMNOPQRST"]
+            distributions = [{code: rng.random() for code in rng.sample(codes, 5)} for _ in names]
+            start = time.perf_counter()
+            model = NgramModel.train(names, distributions)
+            self.stdout.write(
+                f"trained synthetic model on {len(names)} names "
+                f"in {time.perf_counter() - start:.2f} s"
+            )
+
+        for batch_size in [int(size) for size in options["batch_sizes"].split(",")]:
+            start = time.perf_counter()
+            for offset in range(0, len(names), batch_size):
+                end = offset + batch_size
+                model.predict(names[offset:end])
+            elapsed = time.perf_counter() - start
+            self.stdout.write(
+                f"batch {batch_size:>5}: {len(names) / elapsed:>10.0f} names/s, "
+                f"{elapsed / len(names) * 1e6:.1f} us/name"
+            )
@@ -0,0 +1,112 @@
+import random
+import string
+import time
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+
+from api.middleware import compress
+from api.models import Country, NameCountryProbability
+from api.renderers import MessagePackRenderer, ORJSONRenderer
+from api.serializers import NameCountryProbabilitySerializer, PopularNamesSerializer
+
+RENDERERS = {
+    "json": JSONRenderer(),
+    "orjson": ORJSONRenderer(),
+    "msgpack": MessagePackRenderer(),
+}
+
+
+def _country(rng, code):
+    name = "".join(rng.choices(string.ascii_lowercase, k=10)).title()
+    return Country(
+        code=code,
+        name=name,
+        official_name=f"Republic of {name}",
+        region="Europe",
+        subregion="Western Europe",
+        independent=True,
+        google_maps_url=f"https://goo.gl/maps/{code}{rng.randrange(10**8)}",
+        openstreetmap_url=f"https://www.openstreetmap.org/relation/{rng.randrange(10**7)}",
+        capital_name=name[:6],
+        capital_latitude=rng.uniform(-90, 90),
+        capital_longitude=rng.uniform(-180, 180),
+        flag_png_url=f"https://flagcdn.com/w320/{code.lower()}.png",
+        flag_svg_url=f"https://flagcdn.com/{code.lower()}.svg",
+        flag_alt=" ".join(rng.choices(["red", "white", "blue", "band", "star"], k=30)),
+        coat_of_arms_png_url=f"https://mainfacts.com/media/images/coats_of_arms/{code}.png",
+        coat_of_arms_svg_url=f"https://mainfacts.com/media/images/coats_of_arms/{code}.svg",
+    )
+
+
+def names_payload(rng, rows):
+    now = timezone.now()
+    countries = [_country(rng, a + b) for a in "ABCDE" for b in "FGHIJ"]
+    for country in countries:
+        # Serve `borders` from the prefetch cache so no database is needed.
+        country._prefetched_objects_cache = {"borders": rng.sample(countries, 4)}
+    return NameCountryProbabilitySerializer(
+        [
+            NameCountryProbability(
+                name="Jean",
+                country=rng.choice(countries),
+                probability=rng.random(),
+                count_of_requests=rng.randrange(1000),
+                last_accessed=now,
+            )
+            for _ in range(rows)
+        ],
+        many=True,
+    ).data
+
+
+def popular_payload(rng, rows):
+    return PopularNamesSerializer(
+        [
+            {
+                "name": "".join(rng.choices(string.ascii_lowercase, k=rng.randint(3, 10))),
+                "total_requests": rng.randrange(10**6),
+            }
+            for _ in range(rows)
+        ],
+        many=True,
+    ).data
+
+
+def timed(fn, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = fn()
+    return result, (time.perf_counter() - start) / repeat
+
+
+class Command(BaseCommand):
+    help = "Measure render time and bytes on the wire per renderer and compression"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", default="1,10,100,1000")
+        parser.add_argument("--repeat", type=int, default=50)
+
+    def handle(self, *args, **options):
+        rng = random.Random(0)
+        repeat = options["repeat"]
+        endpoints = {"names": names_payload, "popular-names": popular_payload}
+
+        for endpoint, build in endpoints.items():
+            self.stdout.write(f"{endpoint}")
+            for rows in [int(rows) for rows in options["rows"].split(",")]:
+                data = build(rng, rows)
+                for format, renderer in RENDERERS.items():
+                    body, render_time = timed(lambda: renderer.render(data), repeat)
+                    line = (
+                        f"  rows {rows:>5} {format:<8} {len(body):>9} B "
+                        f"{render_time * 1e6:>9.1f} us"
+                    )
+                    for encoding in ("gzip", "br"):
+                        compressed, compress_time = timed(lambda: compress(body, encoding), repeat)
+                        line += (
+                            f" | {encoding} {len(compressed):>8} B "
+                            f"{compress_time * 1e6:>8.1f} us"
+                        )
+                    self.stdout.write(line)
@@ -0,0 +1,96 @@
+import json
+import os
+import subprocess
+import sys
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+# Modules the API-only profile is expected to leave unloaded.
+OPTIONAL_MODULES = [
+    "drf_spectacular",
+    "api.admin",
+    "api.openapi",
+    "django.contrib.auth.models",
+    "django.contrib.sessions",
+]
+
+# Runs in a fresh interpreter per profile so imports are measured cold. The
+# request path answers with a 400 before any query, so only the framework
+# (middleware, DRF, rendering) is timed and no database is needed.
+PROBE = """
+import json, os, resource, sys, time
+
+start = time.perf_counter()
+import django
+from django.conf import settings
+from django.test import Client
+from django.urls import get_resolver
+
+django.setup()
+get_resolver().url_patterns
+startup = time.perf_counter() - start
+
+settings.ALLOWED_HOSTS = ["testserver"]
+client = Client()
+start = time.perf_counter()
+response = client.get(sys.argv[1])
+first_request = time.perf_counter() - start
+
+requests = int(sys.argv[2])
+start = time.perf_counter()
+for _ in range(requests):
+    client.get(sys.argv[1])
+per_request = (time.perf_counter() - start) / max(requests, 1)
+
+print(json.dumps({
+    "status": response.status_code,
+    "content_type": response["Content-Type"],
+    "startup": startup,
+    "first_request": first_request,
+    "per_request": per_request,
+    "max_rss_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+    "modules": len(sys.modules),
+    "loaded": [name for name in json.loads(sys.argv[3]) if name in sys.modules],
+}))
+"""
+
+
+def run_profile(settings_module, path="/api/names/", requests=1000):
+    env = {**os.environ, "DJANGO_SETTINGS_MODULE": settings_module}
+    result = subprocess.run(
+        [sys.executable, "-c", PROBE, path, str(requests), json.dumps(OPTIONAL_MODULES)],
+        env=env,
+        cwd=settings.BASE_DIR,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return json.loads(result.stdout.splitlines()[-1])
+
+
+class Command(BaseCommand):
+    help = "Compare startup time and per-request overhead of the settings profiles"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--profiles", default="app.settings,app.settings_api")
+        parser.add_argument("--path", default="/api/names/")
+        parser.add_argument("--requests", type=int, default=1000)
+        parser.add_argument("--repeat", type=int, default=3)
+
+    def handle(self, *args, **options):
+        for profile in options["profiles"].split(","):
+            runs = [
+                run_profile(profile, options["path"], options["requests"])
+                for _ in range(options["repeat"])
+            ]
+            best = min(runs, key=lambda run: run["startup"])
+            self.stdout.write(
+                f"{profile:<20} startup {best['startup'] * 1e3:>7.1f} ms"
+                f" | first request {best['first_request'] * 1e3:>6.1f} ms"
+                f" | per request {min(run['per_request'] for run in runs) * 1e6:>7.1f} us"
+                f" | {best['modules']:>5} modules"
+                f" | rss {best['max_rss_kb'] / 1024:>6.1f} MiB"
+            )
+            if best["loaded"]:
+                self.stdout.write(f"  {'':<18} loaded: {', '.join(best['loaded'])}")
@@ -0,0 +1,66 @@
+import csv
+import json
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from api.models import NameCountryProbability
+from api.name_index import write_index
+
+
+class Command(BaseCommand):
+    help = "Build the memory-mapped name index used before calling Nationalize"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "source",
+            nargs="?",
+            help="CSV with name,country,probability columns or JSON lines in Nationalize's "
+            "response format. Without it the index is built from stored predictions.",
+        )
+        parser.add_argument("--output", default=settings.NAME_INDEX_PATH)
+
+    def handle(self, *args, **options):
+        if not options["output"]:
+            raise CommandError("Pass --output or set NAME_INDEX_PATH")
+
+        source = options["source"]
+        if source is None:
+            distributions = self.read_database()
+        elif source.endswith(".csv"):
+            distributions = self.read_csv(Path(source))
+        else:
+            distributions = self.read_json_lines(Path(source))
+
+        count = write_index(options["output"], distributions)
+        self.stdout.write(self.style.SUCCESS(f"Indexed {count} names into {options['output']}"))
+
+    def read_database(self):
+        distributions = {}
+        for name, code, probability in NameCountryProbability.objects.values_list(
+            "name", "country_id", "probability"
+        ).iterator(chunk_size=5000):
+            distributions.setdefault(name, {})[code] = probability
+        return distributions
+
+    def read_csv(self, path):
+        distributions = {}
+        with path.open(newline="", encoding="utf-8") as f:
+            for row in csv.DictReader(f):
+                distributions.setdefault(row["name"], {})[row["country"]] = float(
+                    row["probability"]
+                )
+        return distributions
+
+    def read_json_lines(self, path):
+        distributions = {}
+        with path.open(encoding="utf-8") as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                entry = json.loads(line)
+                distributions[entry["name"]] = {
+                    country["country_id"]: country["probability"] for country in entry["country"]
+                }
+        return distributions
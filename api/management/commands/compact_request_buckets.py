@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from api.buckets import compact_buckets
+
+
+class Command(BaseCommand):
+    help = "Fold old hourly request buckets into daily ones and drop expired daily buckets"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        folded, expired = compact_buckets(batch_size=options["batch_size"])
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Folded {folded} hourly buckets, deleted {expired} expired daily buckets"
+            )
+        )
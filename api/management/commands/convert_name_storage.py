@@ -0,0 +1,100 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Max, Min
+
+from api.models import NameCountryProbability, NameDistribution
+
+
+class Command(BaseCommand):
+    help = "Copy name predictions between the row layout and the compact layout"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--to", choices=["compact", "rows"], required=True)
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        if options["to"] == "compact":
+            converted = self.to_compact(options["batch_size"])
+        else:
+            converted = self.to_rows(options["batch_size"])
+
+        self.stdout.write(self.style.SUCCESS(f"Converted {converted} names"))
+        self.stdout.write(f"Set NAME_STORAGE={options['to']} to serve from the new layout")
+
+    def to_compact(self, batch_size):
+        names = (
+            NameCountryProbability.objects.values("name")
+            .annotate(
+                count_of_requests=Max("count_of_requests"),
+                last_accessed=Max("last_accessed"),
+                fetched_at=Min("fetched_at"),
+                refresh_ttl=Min("refresh_ttl"),
+            )
+            .order_by("name")
+        )
+        converted = 0
+        last_name = ""
+
+        while True:
+            batch = list(names.filter(name__gt=last_name)[:batch_size])
+            if not batch:
+                return converted
+            last_name = batch[-1]["name"]
+
+            countries = {}
+            for name, country_id, probability in NameCountryProbability.objects.filter(
+                name__in=[entry["name"] for entry in batch]
+            ).values_list("name", "country_id", "probability"):
+                countries.setdefault(name, {})[country_id] = probability
+
+            NameDistribution.objects.bulk_create(
+                [NameDistribution(countries=countries[entry["name"]], **entry) for entry in batch],
+                update_conflicts=True,
+                unique_fields=["name"],
+                update_fields=[
+                    "countries",
+                    "count_of_requests",
+                    "last_accessed",
+                    "fetched_at",
+                    "refresh_ttl",
+                ],
+            )
+            converted += len(batch)
+
+    def to_rows(self, batch_size):
+        converted = 0
+        last_id = 0
+
+        while True:
+            batch = list(
+                NameDistribution.objects.filter(id__gt=last_id).order_by("id")[:batch_size]
+            )
+            if not batch:
+                return converted
+            last_id = batch[-1].id
+
+            rows = [
+                NameCountryProbability(
+                    name=distribution.name,
+                    country_id=code,
+                    probability=probability,
+                    count_of_requests=distribution.count_of_requests,
+                    last_accessed=distribution.last_accessed,
+                    fetched_at=distribution.fetched_at,
+                    refresh_ttl=distribution.refresh_ttl,
+                )
+                for distribution in batch
+                for code, probability in distribution.countries.items()
+            ]
+            NameCountryProbability.objects.bulk_create(
+                rows,
+                update_conflicts=True,
+                unique_fields=["name", "country"],
+                update_fields=[
+                    "probability",
+                    "count_of_requests",
+                    "last_accessed",
+                    "fetched_at",
+                    "refresh_ttl",
+                ],
+            )
+            converted += len(batch)
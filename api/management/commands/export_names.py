@@ -0,0 +1,45 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from api.export import RENDERERS, export_rows, gzip_stream, parse_timestamp, render
+
+
+class Command(BaseCommand):
+    help = "Stream name probabilities joined with their country as NDJSON or CSV"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--output", choices=list(RENDERERS), default="ndjson")
+        parser.add_argument("--file", help="Write to this file instead of stdout")
+        parser.add_argument("--country")
+        parser.add_argument("--region")
+        parser.add_argument("--accessed-from")
+        parser.add_argument("--accessed-to")
+        parser.add_argument("--gzip", action="store_true")
+
+    def handle(self, *args, **options):
+        try:
+            accessed_from, accessed_to = (
+                parse_timestamp(options[key]) if options[key] else None
+                for key in ("accessed_from", "accessed_to")
+            )
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        rows = export_rows(
+            country=options["country"].upper() if options["country"] else None,
+            region=options["region"],
+            accessed_from=accessed_from,
+            accessed_to=accessed_to,
+        )
+        chunks, _ = render(rows, options["output"])
+        if options["gzip"]:
+            chunks = gzip_stream(chunks)
+
+        target = open(options["file"], "wb") if options["file"] else sys.stdout.buffer
+        try:
+            for chunk in chunks:
+                target.write(chunk)
+        finally:
+            if options["file"]:
+                target.close()
@@ -0,0 +1,33 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from api.retention import purge_cold_rows
+
+
+class Command(BaseCommand):
+    help = "Delete rarely requested name probabilities that have not been accessed recently"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--days", type=int, default=settings.NAME_RETENTION_DAYS)
+        parser.add_argument(
+            "--max-requests",
+            type=int,
+            default=settings.NAME_RETENTION_MAX_REQUESTS,
+            help="Only rows with fewer requests than this are purged",
+        )
+        parser.add_argument("--batch-size", type=int, default=500)
+        parser.add_argument(
+            "--sleep", type=float, default=0.1, help="Pause between batches in seconds"
+        )
+        parser.add_argument("--dry-run", action="store_true")
+
+    def handle(self, *args, **options):
+        purged = purge_cold_rows(
+            days=options["days"],
+            max_requests=options["max_requests"],
+            batch_size=options["batch_size"],
+            pause=options["sleep"],
+            dry_run=options["dry_run"],
+        )
+        action = "Would purge" if options["dry_run"] else "Purged"
+        self.stdout.write(self.style.SUCCESS(f"{action} {purged} rows"))
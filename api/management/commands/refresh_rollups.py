@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from api.rollups import refresh_rollups
+
+
+class Command(BaseCommand):
+    help = "Update region and subregion popularity rollups for recently requested names"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--full", action="store_true", help="Rebuild all rollups, e.g. after a purge"
+        )
+
+    def handle(self, *args, **options):
+        refreshed = refresh_rollups(full=options["full"])
+        self.stdout.write(self.style.SUCCESS(f"Refreshed rollups for {refreshed} names"))
@@ -0,0 +1,38 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from api.models import NameCountryProbability
+from api.ngram_model import NgramModel
+
+
+class Command(BaseCommand):
+    help = "Train the character n-gram fallback model on stored name predictions"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--output", default=settings.NGRAM_MODEL_PATH)
+        parser.add_argument("--buckets", type=int, default=2**14)
+
+    def handle(self, *args, **options):
+        if not options["output"]:
+            raise CommandError("Pass --output or set NGRAM_MODEL_PATH")
+
+        distributions = {}
+        for name, code, probability in NameCountryProbability.objects.values_list(
+            "name", "country_id", "probability"
+        ).iterator(chunk_size=5000):
+            distributions.setdefault(name, {})[code] = probability
+
+        if not distributions:
+            raise CommandError("There are no stored predictions to train on")
+
+        names = list(distributions)
+        model = NgramModel.train(
+            names, [distributions[name] for name in names], buckets=options["buckets"]
+        )
+        model.save(options["output"])
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Trained on {len(names)} names, {len(model.countries)} countries "
+                f"-> {options['output']}"
+            )
+        )
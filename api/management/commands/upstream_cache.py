@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from api.upstream import get_cache
+
+
+class Command(BaseCommand):
+    help = "Show the size of the upstream response cache or empty it"
+
+    def add_arguments(self, parser):
+        parser.add_argument("action", choices=["stats", "clear"])
+
+    def handle(self, *args, **options):
+        cache = get_cache()
+        if cache is None:
+            raise CommandError("UPSTREAM_CACHE_DIR is not set")
+
+        if options["action"] == "clear":
+            cache.clear()
+            self.stdout.write(self.style.SUCCESS(f"Cleared {cache.directory}"))
+            return
+
+        entries, size = cache.stats()
+        self.stdout.write(
+            f"{entries} responses, {size / 1024 / 1024:.1f} MiB of "
+            f"{cache.max_bytes / 1024 / 1024:.0f} MiB in {cache.directory}"
+        )
@@ -0,0 +1,135 @@
+import os
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = (128, 512, 1024, 4096, 16384, 65536, 262144, 1048576)
+TTL_BUCKETS = tuple(hours * 3600 for hours in (1, 3, 6, 12, 24, 48, 96, 192, 384, 768))
+DRIFT_BUCKETS = (0.001, 0.005, 0.01, 0.02, 0.05, 0.1, 0.2, 0.5, 1.0)
+
+PROBABILITY_CACHE = Counter(
+    "name_probability_cache_total",
+    "Outcome of the freshness check for name lookups",
+    ["result"],
+)
+
+PREDICTION_SOURCE = Counter(
+    "name_prediction_source_total",
+    "Where predictions for names missing from the database came from",
+    ["source"],
+)
+
+REFRESH_DRIFT = Histogram(
+    "name_refresh_drift",
+    "Total variation distance between the old and new distribution of refreshed names",
+    buckets=DRIFT_BUCKETS,
+)
+
+REFRESH_TTL = Histogram(
+    "name_refresh_ttl_seconds",
+    "Freshness TTL assigned to names when they are fetched",
+    buckets=TTL_BUCKETS,
+)
+
+TTL_ADJUSTMENTS = Counter(
+    "name_refresh_ttl_adjustments_total",
+    "How refreshes changed the freshness TTL of names",
+    ["direction"],
+)
+
+PARTIAL_RESPONSES = Counter(
+    "name_partial_responses_total",
+    "Name lookups answered before all predicted countries were fetched",
+)
+
+STREAM_SUBSCRIBERS = Gauge(
+    "popular_names_stream_subscribers",
+    "Open popular names event streams",
+    multiprocess_mode="livesum",
+)
+
+STREAM_UPDATES = Counter(
+    "popular_names_stream_updates_total",
+    "Ranking updates for stream subscribers, by whether they were sent or replaced by a newer one",
+    ["result"],
+)
+
+ADMISSION = Counter(
+    "admission_decisions_total",
+    "Requests served with upstream calls skipped, rejected or throttled under overload",
+    ["view", "decision"],
+)
+
+ADMISSION_CACHE_ERRORS = Counter(
+    "admission_cache_errors_total",
+    "Requests admitted unchecked because the shared admission counters were unavailable",
+    ["operation"],
+)
+
+IN_FLIGHT = Gauge(
+    "admission_requests_in_flight",
+    "Requests under admission control currently being handled",
+    multiprocess_mode="livesum",
+)
+
+QUEUE_DELAY = Histogram(
+    "admission_queue_delay_seconds",
+    "Time requests waited between the proxy and the worker (X-Request-Start)",
+    buckets=LATENCY_BUCKETS,
+)
+
+UPSTREAM_CACHE = Counter(
+    "upstream_cache_total",
+    "Lookups in the on-disk cache of upstream responses",
+    ["host", "result"],
+)
+
+UPSTREAM_LATENCY = Histogram(
+    "upstream_request_duration_seconds",
+    "Latency of calls to external APIs",
+    ["host", "status"],
+    buckets=LATENCY_BUCKETS,
+)
+
+DB_TIME = Histogram(
+    "view_db_duration_seconds",
+    "Total time spent in database queries per request",
+    ["view"],
+    buckets=LATENCY_BUCKETS,
+)
+
+RESPONSE_SIZE = Histogram(
+    "view_response_size_bytes",
+    "Size of response bodies",
+    ["view"],
+    buckets=SIZE_BUCKETS,
+)
+
+VIEW_ERRORS = Counter(
+    "view_errors_total",
+    "Error responses returned by the API views",
+    ["view", "reason"],
+)
+
+
+def get_registry():
+    # With several gunicorn workers every process writes its samples to
+    # PROMETHEUS_MULTIPROC_DIR and the collector merges them on scrape.
+    if "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return registry
+    return REGISTRY
+
+
+def render_latest():
+    return generate_latest(get_registry()), CONTENT_TYPE_LATEST
@@ -0,0 +1,135 @@
+import gzip
+import time
+
+import brotli
+from django.conf import settings
+from django.db import connection
+from django.utils.cache import patch_vary_headers
+
+from .metrics import DB_TIME, RESPONSE_SIZE
+
+
+class QueryTimer:
+    def __init__(self):
+        self.elapsed = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.elapsed += time.perf_counter() - start
+
+
+class MetricsMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        timer = QueryTimer()
+        with connection.execute_wrapper(timer):
+            response = self.get_response(request)
+
+        match = request.resolver_match
+        view = match.view_name if match else "unmatched"
+        DB_TIME.labels(view=view).observe(timer.elapsed)
+        if not response.streaming:
+            RESPONSE_SIZE.labels(view=view).observe(len(response.content))
+        return response
+
+
+def accepted_encodings(header):
+    """Parse Accept-Encoding into {coding: q}, leaving out refused codings."""
+    encodings = {}
+    for item in header.split(","):
+        coding, _, params = item.strip().partition(";")
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        q = 1.0
+        for param in params.split(";"):
+            key, _, value = param.strip().partition("=")
+            if key.strip().lower() == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        if q > 0:
+            encodings[coding] = q
+    return encodings
+
+
+def choose_encoding(header):
+    encodings = accepted_encodings(header)
+    wildcard = encodings.get("*", 0)
+    candidates = [("br", 2), ("gzip", 1)]
+    # The highest q wins; on ties brotli is preferred because it compresses
+    # JSON better at a similar CPU cost at the configured quality.
+    best = max(
+        (
+            (encodings.get(coding, wildcard), preference, coding)
+            for coding, preference in candidates
+        ),
+        default=(0, 0, None),
+    )
+    return best[2] if best[0] > 0 else None
+
+
+def compress(body, encoding):
+    if encoding == "br":
+        return brotli.compress(
+            body, mode=brotli.MODE_TEXT, quality=settings.COMPRESSION_BROTLI_QUALITY
+        )
+    return gzip.compress(body, compresslevel=settings.COMPRESSION_GZIP_LEVEL, mtime=0)
+
+
+# Media types of the API renderers and the OpenAPI schema. HTML pages (admin,
+# browsable API, Swagger UI) can carry CSRF tokens next to reflected input, so
+# compressing them would expose the tokens to BREACH.
+COMPRESSIBLE_TYPES = {
+    "application/json",
+    "application/msgpack",
+    "application/vnd.oai.openapi",
+    "application/vnd.oai.openapi+json",
+}
+
+
+class CompressionMiddleware:
+    """
+    Compresses buffered API responses with brotli or gzip, as negotiated by
+    Accept-Encoding. Small bodies are left alone: below COMPRESSION_MIN_SIZE the
+    framing overhead outweighs the savings. Streaming responses (static files,
+    exports) handle their own encoding.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        if response.streaming or response.has_header("Content-Encoding"):
+            return response
+        content_type = response.get("Content-Type", "").partition(";")[0].strip().lower()
+        if content_type not in COMPRESSIBLE_TYPES:
+            return response
+
+        patch_vary_headers(response, ["Accept-Encoding"])
+        if len(response.content) < settings.COMPRESSION_MIN_SIZE:
+            return response
+
+        encoding = choose_encoding(request.META.get("HTTP_ACCEPT_ENCODING", ""))
+        if encoding is None:
+            return response
+
+        compressed = compress(response.content, encoding)
+        if len(compressed) >= len(response.content):
+            return response
+
+        response.content = compressed
+        response["Content-Length"] = str(len(compressed))
+        response["Content-Encoding"] = encoding
+        # The representation changed, so a strong validator no longer matches it.
+        etag = response.get("ETag")
+        if etag and etag.startswith('"'):
+            response["ETag"] = "W/" + etag
+        return response
@@ -0,0 +1,42 @@
+# Generated by Django 5.2.1 on 2026-10-19 08:31
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="NamePopularityArchive",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True, primary_key=True, serialize=False, verbose_name="ID"
+                    ),
+                ),
+                ("name", models.CharField(max_length=100)),
+                ("total_requests", models.BigIntegerField(default=0)),
+                ("purged_rows", models.IntegerField(default=0)),
+                ("last_purged_at", models.DateTimeField()),
+                (
+                    "country",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE, to="api.country"
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name_plural": "name popularity archive",
+                "indexes": [
+                    models.Index(fields=["country"], name="api_namepop_country_416c2f_idx")
+                ],
+                "unique_together": {("name", "country")},
+            },
+        ),
+    ]
@@ -0,0 +1,49 @@
+# Generated by Django 5.2.1 on 2026-10-19 08:32
+
+from django.db import migrations, models
+
+
+def create_countries_index(apps, schema_editor):
+    # Serves the `countries__has_key` lookup of the popular names query.
+    if schema_editor.connection.vendor == "postgresql":
+        schema_editor.execute(
+            "CREATE INDEX api_namedist_countries_gin "
+            "ON api_namedistribution USING gin (countries)"
+        )
+
+
+def drop_countries_index(apps, schema_editor):
+    if schema_editor.connection.vendor == "postgresql":
+        schema_editor.execute("DROP INDEX IF EXISTS api_namedist_countries_gin")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api", "0002_name_popularity_archive"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="NameDistribution",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("name", models.CharField(max_length=100, unique=True)),
+                ("countries", models.JSONField(default=dict)),
+                ("count_of_requests", models.IntegerField(default=0)),
+                ("last_accessed", models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                "verbose_name_plural": "name distributions",
+            },
+        ),
+        migrations.RunPython(create_countries_index, drop_countries_index),
+    ]
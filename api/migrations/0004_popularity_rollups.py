@@ -0,0 +1,90 @@
+# Generated by Django 5.2.1 on 2026-10-19 08:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api", "0003_name_distribution"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="RollupCheckpoint",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("key", models.CharField(max_length=50, unique=True)),
+                ("refreshed_until", models.DateTimeField(blank=True, null=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name="AreaRequestRollup",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "scope",
+                    models.CharField(
+                        choices=[("region", "Region"), ("subregion", "Subregion")],
+                        max_length=10,
+                    ),
+                ),
+                ("area", models.CharField(max_length=100)),
+                ("total_requests", models.BigIntegerField(default=0)),
+                ("names", models.IntegerField(default=0)),
+            ],
+            options={
+                "unique_together": {("scope", "area")},
+            },
+        ),
+        migrations.CreateModel(
+            name="NamePopularityRollup",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "scope",
+                    models.CharField(
+                        choices=[("region", "Region"), ("subregion", "Subregion")],
+                        max_length=10,
+                    ),
+                ),
+                ("area", models.CharField(max_length=100)),
+                ("name", models.CharField(max_length=100)),
+                ("total_requests", models.BigIntegerField(default=0)),
+            ],
+            options={
+                "indexes": [
+                    models.Index(
+                        fields=["scope", "area", "-total_requests"],
+                        name="api_namepop_scope_51a1b3_idx",
+                    ),
+                    models.Index(fields=["name"], name="api_namepop_name_055687_idx"),
+                ],
+                "unique_together": {("scope", "area", "name")},
+            },
+        ),
+    ]
@@ -0,0 +1,54 @@
+# Generated by Django 5.2.1 on 2026-10-19 08:40
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api", "0004_popularity_rollups"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="NameRequestBucket",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("name", models.CharField(max_length=100)),
+                (
+                    "granularity",
+                    models.CharField(choices=[("hour", "Hour"), ("day", "Day")], max_length=4),
+                ),
+                ("bucket_start", models.DateTimeField()),
+                ("count", models.IntegerField(default=0)),
+                (
+                    "country",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE, to="api.country"
+                    ),
+                ),
+            ],
+            options={
+                "indexes": [
+                    models.Index(
+                        fields=["country", "bucket_start"],
+                        name="api_namereq_country_dbca21_idx",
+                    ),
+                    models.Index(
+                        fields=["granularity", "bucket_start"],
+                        name="api_namereq_granula_36b623_idx",
+                    ),
+                ],
+                "unique_together": {("name", "country", "granularity", "bucket_start")},
+            },
+        ),
+    ]
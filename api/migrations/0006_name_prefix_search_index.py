@@ -0,0 +1,43 @@
+from django.db import migrations
+
+INDEX_NAME = "api_namecou_name_upper_prefix"
+
+
+def create_prefix_index(apps, schema_editor):
+    # Admin prefix search runs UPPER("name"::text) LIKE UPPER('x%'), which a plain
+    # btree index on name cannot serve. The index is built concurrently so writes
+    # to the table are not blocked while it builds.
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    with schema_editor.connection.cursor() as cursor:
+        # A failed concurrent build leaves an invalid index behind, which
+        # IF NOT EXISTS would keep.
+        cursor.execute(
+            "SELECT NOT indisvalid FROM pg_index WHERE indexrelid = to_regclass(%s)",
+            [INDEX_NAME],
+        )
+        row = cursor.fetchone()
+    if row and row[0]:
+        schema_editor.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {INDEX_NAME}")
+    schema_editor.execute(
+        f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {INDEX_NAME} "
+        "ON api_namecountryprobability (UPPER(name::text) text_pattern_ops)"
+    )
+
+
+def drop_prefix_index(apps, schema_editor):
+    if schema_editor.connection.vendor == "postgresql":
+        schema_editor.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {INDEX_NAME}")
+
+
+class Migration(migrations.Migration):
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction.
+    atomic = False
+
+    dependencies = [
+        ("api", "0005_name_request_buckets"),
+    ]
+
+    operations = [
+        migrations.RunPython(create_prefix_index, drop_prefix_index),
+    ]
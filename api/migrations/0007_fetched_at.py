@@ -0,0 +1,34 @@
+# Generated by Django 5.2.1 on 2026-10-19 08:48
+
+import django.utils.timezone
+from django.db import migrations, models
+from django.db.models import F
+
+
+def copy_last_accessed(apps, schema_editor):
+    # Until now the last access doubled as the fetch time, so it is the best
+    # estimate of when existing predictions were fetched.
+    for model_name in ["NameCountryProbability", "NameDistribution"]:
+        model = apps.get_model("api", model_name)
+        model.objects.filter(last_accessed__isnull=False).update(fetched_at=F("last_accessed"))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api", "0006_name_prefix_search_index"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="namecountryprobability",
+            name="fetched_at",
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+        migrations.AddField(
+            model_name="namedistribution",
+            name="fetched_at",
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+        migrations.RunPython(copy_last_accessed, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.2.1 on 2026-10-19 08:51
+
+import datetime
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api", "0007_fetched_at"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="namecountryprobability",
+            name="refresh_ttl",
+            field=models.DurationField(default=datetime.timedelta(days=1)),
+        ),
+        migrations.AddField(
+            model_name="namedistribution",
+            name="refresh_ttl",
+            field=models.DurationField(default=datetime.timedelta(days=1)),
+        ),
+    ]
@@ -0,0 +1,52 @@
+from django.db import migrations, models
+
+INDEXES = [
+    (
+        "namecountryprobability",
+        models.Index(fields=["last_accessed"], name="api_ncp_last_accessed_idx"),
+    ),
+    ("namedistribution", models.Index(fields=["last_accessed"], name="api_nd_last_accessed_idx")),
+]
+
+
+def add_indexes(apps, schema_editor):
+    # Built concurrently on PostgreSQL so writes to the tables are not blocked
+    # while the indexes build.
+    concurrently = schema_editor.connection.vendor == "postgresql"
+    for model_name, index in INDEXES:
+        model = apps.get_model("api", model_name)
+        if concurrently:
+            # A failed concurrent build leaves an invalid index behind.
+            schema_editor.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {index.name}")
+            schema_editor.add_index(model, index, concurrently=True)
+        else:
+            schema_editor.add_index(model, index)
+
+
+def remove_indexes(apps, schema_editor):
+    concurrently = schema_editor.connection.vendor == "postgresql"
+    for model_name, index in INDEXES:
+        model = apps.get_model("api", model_name)
+        if concurrently:
+            schema_editor.remove_index(model, index, concurrently=True)
+        else:
+            schema_editor.remove_index(model, index)
+
+
+class Migration(migrations.Migration):
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction.
+    atomic = False
+
+    dependencies = [
+        ("api", "0008_refresh_ttl"),
+    ]
+
+    operations = [
+        migrations.SeparateDatabaseAndState(
+            database_operations=[migrations.RunPython(add_indexes, remove_indexes)],
+            state_operations=[
+                migrations.AddIndex(model_name=model_name, index=index)
+                for model_name, index in INDEXES
+            ],
+        ),
+    ]
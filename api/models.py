@@ -1,4 +1,7 @@
+from datetime import timedelta
+
 from django.db import models
+from django.utils import timezone
 
 
 class Country(models.Model):
@@ -37,6 +40,8 @@ class NameCountryProbability(models.Model):
     probability = models.FloatField()
     count_of_requests = models.IntegerField(default=0)
     last_accessed = models.DateTimeField(null=True, blank=True)
+    fetched_at = models.DateTimeField(default=timezone.now)
+    refresh_ttl = models.DurationField(default=timedelta(days=1))
 
     class Meta:
         verbose_name_plural = "name country probabilities"
@@ -44,7 +49,109 @@ class NameCountryProbability(models.Model):
         indexes = [
             models.Index(fields=["name"]),
             models.Index(fields=["country"]),
+            # Incremental rollups read the names accessed since the checkpoint.
+            models.Index(fields=["last_accessed"], name="api_ncp_last_accessed_idx"),
         ]
 
     def __str__(self):
         return f"{self.name} - {self.country.code} ({self.probability})"
+
+
+class NamePopularityArchive(models.Model):
+    name = models.CharField(max_length=100)
+    country = models.ForeignKey(Country, on_delete=models.CASCADE)
+    total_requests = models.BigIntegerField(default=0)
+    purged_rows = models.IntegerField(default=0)
+    last_purged_at = models.DateTimeField()
+
+    class Meta:
+        verbose_name_plural = "name popularity archive"
+        unique_together = ["name", "country"]
+        indexes = [
+            models.Index(fields=["country"]),
+        ]
+
+    def __str__(self):
+        return f"{self.name} - {self.country_id} ({self.total_requests})"
+
+
+class NameDistribution(models.Model):
+    name = models.CharField(max_length=100, unique=True)
+    countries = models.JSONField(default=dict)
+    count_of_requests = models.IntegerField(default=0)
+    last_accessed = models.DateTimeField(null=True, blank=True)
+    fetched_at = models.DateTimeField(default=timezone.now)
+    refresh_ttl = models.DurationField(default=timedelta(days=1))
+
+    class Meta:
+        verbose_name_plural = "name distributions"
+        indexes = [
+            models.Index(fields=["last_accessed"], name="api_nd_last_accessed_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.name} ({len(self.countries)} countries)"
+
+
+class NamePopularityRollup(models.Model):
+    SCOPE_REGION = "region"
+    SCOPE_SUBREGION = "subregion"
+    SCOPE_CHOICES = [(SCOPE_REGION, "Region"), (SCOPE_SUBREGION, "Subregion")]
+
+    scope = models.CharField(max_length=10, choices=SCOPE_CHOICES)
+    area = models.CharField(max_length=100)
+    name = models.CharField(max_length=100)
+    total_requests = models.BigIntegerField(default=0)
+
+    class Meta:
+        unique_together = ["scope", "area", "name"]
+        indexes = [
+            models.Index(fields=["scope", "area", "-total_requests"]),
+            models.Index(fields=["name"]),
+        ]
+
+    def __str__(self):
+        return f"{self.area}: {self.name} ({self.total_requests})"
+
+
+class AreaRequestRollup(models.Model):
+    scope = models.CharField(max_length=10, choices=NamePopularityRollup.SCOPE_CHOICES)
+    area = models.CharField(max_length=100)
+    total_requests = models.BigIntegerField(default=0)
+    names = models.IntegerField(default=0)
+
+    class Meta:
+        unique_together = ["scope", "area"]
+
+    def __str__(self):
+        return f"{self.area} ({self.total_requests})"
+
+
+class RollupCheckpoint(models.Model):
+    key = models.CharField(max_length=50, unique=True)
+    refreshed_until = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"{self.key} @ {self.refreshed_until}"
+
+
+class NameRequestBucket(models.Model):
+    HOUR = "hour"
+    DAY = "day"
+    GRANULARITY_CHOICES = [(HOUR, "Hour"), (DAY, "Day")]
+
+    name = models.CharField(max_length=100)
+    country = models.ForeignKey(Country, on_delete=models.CASCADE)
+    granularity = models.CharField(max_length=4, choices=GRANULARITY_CHOICES)
+    bucket_start = models.DateTimeField()
+    count = models.IntegerField(default=0)
+
+    class Meta:
+        unique_together = ["name", "country", "granularity", "bucket_start"]
+        indexes = [
+            models.Index(fields=["country", "bucket_start"]),
+            models.Index(fields=["granularity", "bucket_start"]),
+        ]
+
+    def __str__(self):
+        return f"{self.name} - {self.country_id} @ {self.bucket_start} ({self.count})"
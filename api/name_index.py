@@ -0,0 +1,143 @@
+"""
+Read-only, memory-mapped index of name -> country distribution.
+
+Layout (little-endian)::
+
+    header   magic "NIDX", version u16, country count u16, name count u32
+    codes    two ASCII bytes per country
+    offsets  u32 per name, pointing at its record, sorted by name
+    records  name length u16, UTF-8 name, entry count u8,
+             then per entry country number u16 and probability u16 (scaled to 65535)
+
+Names are stored casefolded, so lookups are case-insensitive like Nationalize.
+The file is mapped rather than read, so startup does not depend on its size and
+the pages are shared between all worker processes through the page cache.
+"""
+
+import mmap
+import os
+import struct
+from functools import lru_cache
+
+from django.conf import settings
+
+MAGIC = b"NIDX"
+VERSION = 1
+HEADER = struct.Struct("<4sHHI")
+OFFSET = struct.Struct("<I")
+NAME_LENGTH = struct.Struct("<H")
+ENTRY = struct.Struct("<HH")
+PROBABILITY_SCALE = 65535
+MAX_ENTRIES = 255
+
+
+def normalize(name):
+    return name.strip().casefold()
+
+
+def write_index(path, distributions):
+    """Write `distributions`, a mapping of name -> {country code: probability}."""
+    merged = {}
+    for name, countries in distributions.items():
+        merged.setdefault(normalize(name).encode(), {}).update(countries)
+
+    codes = sorted({code for countries in merged.values() for code in countries})
+    invalid = [code for code in codes if len(code.encode("ascii")) != 2]
+    if invalid:
+        raise ValueError(f"Country codes must be ISO 3166-1 alpha-2, got {invalid[:5]}")
+    code_numbers = {code: number for number, code in enumerate(codes)}
+
+    records = []
+    for key in sorted(merged):
+        ranked = sorted(merged[key].items(), key=lambda item: -item[1])[:MAX_ENTRIES]
+        record = bytearray(NAME_LENGTH.pack(len(key)) + key + bytes([len(ranked)]))
+        for code, probability in ranked:
+            scaled = round(min(max(probability, 0.0), 1.0) * PROBABILITY_SCALE)
+            record += ENTRY.pack(code_numbers[code], scaled)
+        records.append(bytes(record))
+
+    position = HEADER.size + 2 * len(codes) + OFFSET.size * len(records)
+    offsets = []
+    for record in records:
+        offsets.append(position)
+        position += len(record)
+
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(HEADER.pack(MAGIC, VERSION, len(codes), len(records)))
+        f.write("".join(codes).encode("ascii"))
+        f.write(b"".join(OFFSET.pack(offset) for offset in offsets))
+        f.write(b"".join(records))
+    # Workers that already mapped the old file keep reading it until they reload.
+    os.replace(tmp_path, path)
+    return len(records)
+
+
+class NameIndex:
+    def __init__(self, path):
+        with open(path, "rb") as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, version, country_count, self.size = HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{path} is not a name index (version {VERSION})")
+
+        self._offsets_start = HEADER.size + 2 * country_count
+        (codes,) = struct.unpack_from(f"{2 * country_count}s", self._map, HEADER.size)
+        codes = codes.decode("ascii")
+        self._codes = [a + b for a, b in zip(codes[::2], codes[1::2])]
+
+    def _record_offset(self, position):
+        return OFFSET.unpack_from(self._map, self._offsets_start + OFFSET.size * position)[0]
+
+    def _key_at(self, offset):
+        (length,) = NAME_LENGTH.unpack_from(self._map, offset)
+        start = offset + NAME_LENGTH.size
+        end = start + length
+        return self._map[start:end], end
+
+    def lookup(self, name):
+        """Return the distribution in Nationalize's `country` shape, or None."""
+        key = normalize(name).encode()
+        low, high = 0, self.size
+
+        while low < high:
+            middle = (low + high) // 2
+            candidate, end = self._key_at(self._record_offset(middle))
+            if candidate < key:
+                low = middle + 1
+            elif candidate > key:
+                high = middle
+            else:
+                return self._read_entries(end)
+        return None
+
+    def _read_entries(self, offset):
+        count = self._map[offset]
+        entries = []
+        for i in range(count):
+            number, scaled = ENTRY.unpack_from(self._map, offset + 1 + ENTRY.size * i)
+            entries.append(
+                {"country_id": self._codes[number], "probability": scaled / PROBABILITY_SCALE}
+            )
+        return entries
+
+    def close(self):
+        self._map.close()
+
+
+@lru_cache(maxsize=2)
+def _load(path, mtime):
+    return NameIndex(path)
+
+
+def get_index():
+    """The configured index, reopened whenever the file is rebuilt, or None."""
+    path = settings.NAME_INDEX_PATH
+    if not path:
+        return None
+    try:
+        mtime = os.stat(path).st_mtime_ns
+    except FileNotFoundError:
+        return None
+    return _load(path, mtime)
@@ -0,0 +1,163 @@
+"""
+Character n-gram model that predicts country distributions for unseen names.
+
+Every name is wrapped in boundary markers and split into character n-grams,
+which are hashed into a fixed number of buckets. Training stores, per bucket,
+the mean country distribution of the names that contain it. A prediction
+averages the buckets of a name's n-grams, weighting longer n-grams higher.
+Hashing, training and inference all work on whole batches of names as NumPy
+arrays.
+"""
+
+import os
+from functools import lru_cache
+
+import numpy as np
+from django.conf import settings
+
+MAX_LENGTH = 32
+ORDERS = (1, 2, 3)
+HASH_MULTIPLIER = 1_000_003
+BATCH_SIZE = 1024
+TOP_K = 5
+
+
+def encode(names):
+    """Code points of `^name$`, padded with zeros, and the encoded lengths."""
+    wrapped = [f"^{name.strip().casefold()[:MAX_LENGTH]}$" for name in names]
+    codes = np.zeros((len(wrapped), MAX_LENGTH + 2), dtype=np.int64)
+    lengths = np.fromiter((len(name) for name in wrapped), dtype=np.int64, count=len(wrapped))
+    for row, name in enumerate(wrapped):
+        length = len(name)
+        codes[row, :length] = np.frombuffer(name.encode("utf-32-le"), dtype=np.uint32)
+    return codes, lengths
+
+
+def hash_features(names, buckets):
+    """Bucket of every n-gram as a (names, features) array, its validity mask and weights."""
+    codes, lengths = encode(names)
+    width = codes.shape[1]
+    hashes, valid, weights = [], [], []
+
+    for order in ORDERS:
+        positions = width - order + 1
+        h = np.full((len(names), positions), order, dtype=np.int64)
+        for offset in range(order):
+            end = offset + positions
+            h = (h * HASH_MULTIPLIER + codes[:, offset:end]) % buckets
+        hashes.append(h)
+        valid.append(np.arange(positions)[None, :] + order <= lengths[:, None])
+        weights.append(np.full(positions, order, dtype=np.float32))
+
+    return np.hstack(hashes), np.hstack(valid), np.concatenate(weights)
+
+
+class NgramModel:
+    def __init__(self, weights, seen, countries):
+        self.weights = weights
+        self.seen = seen
+        self.countries = np.asarray(countries)
+
+    @property
+    def buckets(self):
+        return self.weights.shape[0]
+
+    @classmethod
+    def train(cls, names, distributions, buckets=2**14):
+        """Fit on `names` and matching {country code: probability} `distributions`."""
+        countries = sorted({code for distribution in distributions for code in distribution})
+        column = {code: i for i, code in enumerate(countries)}
+        sums = np.zeros((buckets, len(countries)), dtype=np.float64)
+        counts = np.zeros(buckets, dtype=np.int64)
+
+        for start in range(0, len(names), BATCH_SIZE):
+            end = start + BATCH_SIZE
+            batch = distributions[start:end]
+            targets = np.zeros((len(batch), len(countries)), dtype=np.float64)
+            for row, distribution in enumerate(batch):
+                for code, probability in distribution.items():
+                    targets[row, column[code]] = probability
+
+            hashes, valid, _ = hash_features(names[start:end], buckets)
+            rows = np.broadcast_to(np.arange(len(batch))[:, None], hashes.shape)[valid]
+            np.add.at(sums, hashes[valid], targets[rows])
+            counts += np.bincount(hashes[valid], minlength=buckets)
+
+        weights = (sums / np.maximum(counts, 1)[:, None]).astype(np.float32)
+        return cls(weights, counts > 0, countries)
+
+    def predict(self, names, top_k=TOP_K):
+        """
+        Return Nationalize-shaped country lists and a confidence per name.
+
+        Confidence is the top probability scaled by the share of the name's
+        n-grams that occurred in training, so names made of unseen fragments
+        score low even if the few known ones agree.
+        """
+        results, confidences = [], []
+        for start in range(0, len(names), BATCH_SIZE):
+            end = start + BATCH_SIZE
+            batch_results, batch_confidence = self._predict_batch(names[start:end], top_k)
+            results.extend(batch_results)
+            confidences.append(batch_confidence)
+        return results, np.concatenate(confidences) if confidences else np.zeros(0)
+
+    def _predict_batch(self, names, top_k):
+        hashes, valid, order_weights = hash_features(names, self.buckets)
+        seen = self.seen[hashes] & valid
+        mix = seen * order_weights[None, :]
+
+        scores = np.einsum("bf,bfc->bc", mix, self.weights[hashes])
+        totals = scores.sum(axis=1, keepdims=True)
+        probabilities = np.divide(scores, totals, out=np.zeros_like(scores), where=totals > 0)
+
+        k = min(top_k, probabilities.shape[1])
+        top = np.argpartition(-probabilities, k - 1, axis=1)[:, :k]
+        top_probabilities = np.take_along_axis(probabilities, top, axis=1)
+        order = np.argsort(-top_probabilities, axis=1)
+        top = np.take_along_axis(top, order, axis=1)
+        top_probabilities = np.take_along_axis(top_probabilities, order, axis=1)
+
+        coverage = seen.sum(axis=1) / np.maximum(valid.sum(axis=1), 1)
+        confidence = top_probabilities[:, 0] * coverage
+
+        results = [
+            [
+                {"country_id": str(self.countries[c]), "probability": round(float(p), 4)}
+                for c, p in zip(row_countries, row_probabilities)
+                if p > 0
+            ]
+            for row_countries, row_probabilities in zip(top, top_probabilities)
+        ]
+        return results, confidence
+
+    def predict_one(self, name):
+        results, confidences = self.predict([name])
+        return results[0], float(confidences[0])
+
+    def save(self, path):
+        tmp_path = f"{path}.tmp.npz"
+        np.savez(tmp_path, weights=self.weights, seen=self.seen, countries=self.countries)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            return cls(data["weights"], data["seen"], data["countries"])
+
+
+@lru_cache(maxsize=2)
+def _load(path, mtime):
+    return NgramModel.load(path)
+
+
+def get_model():
+    """The configured model, reloaded whenever the file is retrained, or None."""
+    path = settings.NGRAM_MODEL_PATH
+    if not path:
+        return None
+    try:
+        mtime = os.stat(path).st_mtime_ns
+    except FileNotFoundError:
+        return None
+    return _load(path, mtime)
@@ -0,0 +1,84 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseNotModified
+from django.utils.cache import patch_cache_control
+from drf_spectacular.utils import extend_schema
+from drf_spectacular.views import SCHEMA_KWARGS, SpectacularAPIView
+
+logger = logging.getLogger(__name__)
+
+
+class CachedSchemaView(SpectacularAPIView):
+    """
+    Serves the schema written at build time by
+    `manage.py spectacular --format openapi-json --file $OPENAPI_SCHEMA_PATH`.
+
+    Each negotiated format is rendered once per artifact and then served from
+    memory with an ETag. With DEBUG the schema is generated on every request,
+    so code changes show up immediately.
+    """
+
+    _lock = threading.Lock()
+    _rendered = {}
+    _generated = None
+
+    @extend_schema(**SCHEMA_KWARGS)
+    def get(self, request, *args, **kwargs):
+        if settings.DEBUG:
+            return super().get(request, *args, **kwargs)
+
+        body, etag = self._render(request)
+        if etag in request.headers.get("If-None-Match", ""):
+            response = HttpResponseNotModified()
+        else:
+            renderer = request.accepted_renderer
+            content_type = renderer.media_type
+            if renderer.charset:
+                content_type = f"{content_type}; charset={renderer.charset}"
+            response = HttpResponse(body, content_type=content_type)
+            response["Content-Disposition"] = (
+                f'inline; filename="{self._get_filename(request, None)}"'
+            )
+        response["ETag"] = etag
+        patch_cache_control(response, public=True, no_cache=True)
+        return response
+
+    def _render(self, request):
+        renderer = request.accepted_renderer
+        path = settings.OPENAPI_SCHEMA_PATH
+        try:
+            version = os.stat(path).st_mtime_ns
+        except OSError:
+            version = None
+        key = (path, version, renderer.media_type)
+
+        with self._lock:
+            if key not in self._rendered:
+                schema = self._load_schema(path, version)
+                body = renderer.render(schema, renderer_context=self.get_renderer_context())
+                etag = '"%s"' % hashlib.sha256(body).hexdigest()[:32]
+                if len(self._rendered) >= 8:
+                    # Entries for replaced artifacts are never hit again.
+                    self._rendered.clear()
+                self._rendered[key] = (body, etag)
+            return self._rendered[key]
+
+    def _load_schema(self, path, version):
+        if version is not None:
+            with open(path, "rb") as f:
+                return json.load(f)
+
+        # A missing artifact means the build step was skipped: generate the
+        # schema once for this process rather than on every request.
+        if CachedSchemaView._generated is None:
+            logger.warning("OpenAPI schema artifact %s not found, generating it in-process", path)
+            generator = self.generator_class(urlconf=self.urlconf, patterns=self.patterns)
+            CachedSchemaView._generated = generator.get_schema(
+                request=None, public=self.serve_public
+            )
+        return CachedSchemaView._generated
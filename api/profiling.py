@@ -0,0 +1,77 @@
+import cProfile
+import os
+import random
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+
+from django.conf import settings
+from django.core import signing
+
+PROFILE_HEADER = "HTTP_X_PROFILE"
+TOKEN_SALT = "api.profiling"
+
+_lock = threading.Lock()
+
+
+def make_token():
+    return signing.dumps("profile", salt=TOKEN_SALT)
+
+
+def _token_is_valid(token):
+    try:
+        signing.loads(token, salt=TOKEN_SALT, max_age=settings.PROFILING_TOKEN_MAX_AGE)
+    except signing.BadSignature:
+        return False
+    return True
+
+
+def should_profile(request):
+    if not settings.PROFILING_ENABLED:
+        return False
+    token = request.META.get(PROFILE_HEADER)
+    if token:
+        return _token_is_valid(token)
+    return random.random() < settings.PROFILING_SAMPLE_RATE
+
+
+def _enforce_retention(directory):
+    files = sorted(directory.glob("*.prof"), key=lambda path: path.stat().st_mtime)
+    for path in files[: max(len(files) - settings.PROFILING_MAX_FILES, 0)]:
+        path.unlink(missing_ok=True)
+
+
+def save_profile(profiler, request, elapsed):
+    directory = Path(settings.PROFILING_DIR)
+    directory.mkdir(parents=True, exist_ok=True)
+    match = request.resolver_match
+    view = match.view_name if match else "unmatched"
+    stamp = datetime.now().strftime("%Y%m%dT%H%M%S%f")
+    filename = f"{stamp}-{os.getpid()}-{view}-{elapsed * 1000:.0f}ms.prof"
+    profiler.dump_stats(directory / filename)
+    _enforce_retention(directory)
+
+
+class ProfilingMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        # cProfile cannot run two profilers at once, so concurrent requests in a
+        # threaded worker are simply served unprofiled.
+        if not should_profile(request) or not _lock.acquire(blocking=False):
+            return self.get_response(request)
+
+        try:
+            profiler = cProfile.Profile()
+            start = time.perf_counter()
+            profiler.enable()
+            try:
+                response = self.get_response(request)
+            finally:
+                profiler.disable()
+            save_profile(profiler, request, time.perf_counter() - start)
+        finally:
+            _lock.release()
+        return response
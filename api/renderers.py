@@ -0,0 +1,34 @@
+import msgpack
+import orjson
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+# Fallback for the types orjson and msgpack do not know about (Decimal, lazy
+# translations, querysets...). Datetimes go through it too, so every renderer
+# formats them the same way as DRF's JSONRenderer.
+_encoder = JSONEncoder()
+
+
+class ORJSONRenderer(JSONRenderer):
+    """Drop-in replacement for `JSONRenderer` backed by orjson."""
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+
+        options = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS
+        if self.get_indent(accepted_media_type or "", renderer_context or {}):
+            options |= orjson.OPT_INDENT_2
+        return orjson.dumps(data, default=_encoder.default, option=options)
+
+
+class MessagePackRenderer(BaseRenderer):
+    media_type = "application/msgpack"
+    format = "msgpack"
+    charset = None
+    render_style = "binary"
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+        return msgpack.packb(data, default=_encoder.default, use_bin_type=True, datetime=False)
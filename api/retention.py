@@ -0,0 +1,92 @@
+import time
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import NameCountryProbability, NamePopularityArchive
+
+
+def cold_rows(days, max_requests):
+    cutoff = timezone.now() - timedelta(days=days)
+    return NameCountryProbability.objects.filter(
+        # Rows whose first accesses are not flushed yet have no last_accessed;
+        # they are only cold once they were fetched before the cutoff.
+        Q(last_accessed__lt=cutoff) | Q(last_accessed__isnull=True, fetched_at__lt=cutoff),
+        count_of_requests__lt=max_requests,
+    )
+
+
+def _archive(rows, now):
+    keys = {(name, country_id) for _, name, country_id, _ in rows}
+    archived = {
+        (entry.name, entry.country_id): entry
+        for entry in NamePopularityArchive.objects.filter(
+            name__in={name for name, _ in keys}, country_id__in={code for _, code in keys}
+        )
+        if (entry.name, entry.country_id) in keys
+    }
+
+    for _, name, country_id, count in rows:
+        entry = archived.get((name, country_id))
+        if entry is None:
+            entry = archived[(name, country_id)] = NamePopularityArchive(
+                name=name, country_id=country_id
+            )
+        entry.total_requests += count
+        entry.purged_rows += 1
+        entry.last_purged_at = now
+
+    NamePopularityArchive.objects.bulk_create(
+        archived.values(),
+        update_conflicts=True,
+        unique_fields=["name", "country"],
+        update_fields=["total_requests", "purged_rows", "last_purged_at"],
+    )
+
+
+def _purge_batch(ids, days, max_requests):
+    # Rows requested since the batch was selected are not cold any more, so
+    # the predicate is checked again under the row locks.
+    with transaction.atomic():
+        rows = list(
+            cold_rows(days, max_requests)
+            .filter(id__in=ids)
+            .select_for_update()
+            .values_list("id", "name", "country_id", "count_of_requests")
+        )
+        if rows:
+            _archive(rows, timezone.now())
+            cold_rows(days, max_requests).filter(id__in=[row[0] for row in rows]).delete()
+    return len(rows)
+
+
+def purge_cold_rows(days, max_requests, batch_size=500, pause=0.0, dry_run=False):
+    """
+    Delete cold rows in short transactions, walking the primary key so every
+    batch is an index range scan, and fold their counters into the archive.
+    """
+    queryset = cold_rows(days, max_requests).order_by("id")
+    last_id = 0
+    purged = 0
+
+    while True:
+        rows = list(
+            queryset.filter(id__gt=last_id).values_list(
+                "id", "name", "country_id", "count_of_requests"
+            )[:batch_size]
+        )
+        if not rows:
+            break
+        last_id = rows[-1][0]
+
+        if dry_run:
+            purged += len(rows)
+        else:
+            purged += _purge_batch([row[0] for row in rows], days, max_requests)
+
+        if pause:
+            time.sleep(pause)
+
+    return purged
@@ -0,0 +1,189 @@
+import operator
+from collections import defaultdict
+from functools import reduce
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Q, Sum
+from django.utils import timezone
+
+from .models import (
+    AreaRequestRollup,
+    Country,
+    NameCountryProbability,
+    NameDistribution,
+    NamePopularityRollup,
+    RollupCheckpoint,
+)
+
+CHECKPOINT_KEY = "name-popularity"
+BATCH_SIZE = 500
+SCOPES = [NamePopularityRollup.SCOPE_REGION, NamePopularityRollup.SCOPE_SUBREGION]
+
+
+def _changed_names(since):
+    model = NameDistribution if settings.NAME_STORAGE == "compact" else NameCountryProbability
+    queryset = model.objects.all()
+    if since is not None:
+        queryset = queryset.filter(last_accessed__gte=since)
+    return queryset.values_list("name", flat=True).distinct().order_by("name")
+
+
+def _name_batches(since):
+    names = _changed_names(since)
+    if since is not None:
+        # One range scan on the last_accessed index; the changed names are
+        # few compared to the table, so they are batched in memory.
+        changed = list(names)
+        for start in range(0, len(changed), BATCH_SIZE):
+            end = start + BATCH_SIZE
+            yield changed[start:end]
+        return
+
+    # A full rebuild walks every name in keyset batches along the name index.
+    last_name = None
+    while True:
+        batch = list((names.filter(name__gt=last_name) if last_name else names)[:BATCH_SIZE])
+        if not batch:
+            return
+        last_name = batch[-1]
+        yield batch
+
+
+def _contributions(names):
+    """Requests per (name, scope, area) for the given names."""
+    totals = defaultdict(int)
+
+    if settings.NAME_STORAGE == "compact":
+        areas = {
+            code: (region, subregion)
+            for code, region, subregion in Country.objects.values_list(
+                "code", "region", "subregion"
+            )
+        }
+        for name, countries, count in NameDistribution.objects.filter(name__in=names).values_list(
+            "name", "countries", "count_of_requests"
+        ):
+            for code in countries:
+                region, subregion = areas.get(code, ("", ""))
+                totals[(name, NamePopularityRollup.SCOPE_REGION, region)] += count
+                totals[(name, NamePopularityRollup.SCOPE_SUBREGION, subregion)] += count
+        return totals
+
+    rows = (
+        NameCountryProbability.objects.filter(name__in=names)
+        .values_list("name", "country__region", "country__subregion")
+        .annotate(total=Sum("count_of_requests"))
+        .order_by()
+    )
+    for name, region, subregion, total in rows:
+        totals[(name, NamePopularityRollup.SCOPE_REGION, region)] += total
+        totals[(name, NamePopularityRollup.SCOPE_SUBREGION, subregion)] += total
+    return totals
+
+
+def _refresh_names(names):
+    """Rebuild the rollups of `names`; returns the (scope, area) pairs they were or are in."""
+    rollups = [
+        NamePopularityRollup(scope=scope, area=area, name=name, total_requests=total)
+        for (name, scope, area), total in _contributions(names).items()
+        if area
+    ]
+    previous = NamePopularityRollup.objects.filter(name__in=names)
+    with transaction.atomic():
+        areas = set(previous.values_list("scope", "area").distinct().order_by())
+        previous.delete()
+        NamePopularityRollup.objects.bulk_create(rollups)
+    return areas | {(rollup.scope, rollup.area) for rollup in rollups}
+
+
+def _refresh_areas(areas=None):
+    """Recompute area totals, only for the given (scope, area) pairs unless None."""
+    rollups = NamePopularityRollup.objects.all()
+    stored = AreaRequestRollup.objects.all()
+    if areas is not None:
+        if not areas:
+            return
+        condition = reduce(operator.or_, (Q(scope=scope, area=area) for scope, area in areas))
+        rollups = rollups.filter(condition)
+        stored = stored.filter(condition)
+
+    totals = (
+        rollups.values("scope", "area")
+        .annotate(total_requests=Sum("total_requests"), names=Count("name"))
+        .order_by()
+    )
+    with transaction.atomic():
+        stored.delete()
+        AreaRequestRollup.objects.bulk_create(AreaRequestRollup(**row) for row in totals)
+
+
+def refresh_rollups(full=False):
+    """
+    Recompute rollups for names accessed since the previous refresh.
+
+    Only names touched since the checkpoint are re-aggregated, so the cost
+    follows recent traffic rather than table size. `full` rebuilds everything,
+    which is needed after rows were purged.
+    """
+    checkpoint, _ = RollupCheckpoint.objects.get_or_create(key=CHECKPOINT_KEY)
+    started = timezone.now()
+    since = None if full else checkpoint.refreshed_until
+
+    if full:
+        NamePopularityRollup.objects.all().delete()
+
+    refreshed = 0
+    areas = set()
+    for batch in _name_batches(since):
+        areas |= _refresh_names(batch)
+        refreshed += len(batch)
+
+    _refresh_areas(None if full else areas)
+    checkpoint.refreshed_until = started
+    checkpoint.save()
+    return refreshed
+
+
+def top_names(scope, area, limit):
+    return (
+        NamePopularityRollup.objects.filter(scope=scope, area=area, total_requests__gt=0)
+        .order_by("-total_requests", "name")
+        .values("name", "total_requests")[:limit]
+    )
+
+
+def area_volume(scope):
+    return (
+        AreaRequestRollup.objects.filter(scope=scope)
+        .order_by("-total_requests", "area")
+        .values("area", "total_requests", "names")
+    )
+
+
+def country_distribution(names):
+    """How many of `names` predict each country, and the mean probability."""
+    if settings.NAME_STORAGE == "compact":
+        summary = defaultdict(lambda: [0, 0.0])
+        for countries in NameDistribution.objects.filter(name__in=names).values_list(
+            "countries", flat=True
+        ):
+            for code, probability in countries.items():
+                summary[code][0] += 1
+                summary[code][1] += probability
+        rows = [
+            {"country": code, "names": count, "probability_sum": total}
+            for code, (count, total) in summary.items()
+        ]
+    else:
+        rows = [
+            {"country": row["country_id"], "names": row["names"], "probability_sum": row["total"]}
+            for row in NameCountryProbability.objects.filter(name__in=names)
+            .values("country_id")
+            .annotate(names=Count("name"), total=Sum("probability"))
+            .order_by()
+        ]
+
+    for row in rows:
+        row["mean_probability"] = row.pop("probability_sum") / len(names)
+    return sorted(rows, key=lambda row: (-row["mean_probability"], row["country"]))
@@ -1,6 +1,30 @@
-from drf_spectacular.utils import OpenApiExample, OpenApiParameter, extend_schema
+from django.conf import settings
+
+from .serializers import (
+    AreaVolumeSerializer,
+    CountryDistributionSerializer,
+    NameCountryProbabilitySerializer,
+    PopularNamesSerializer,
+    TrendingNamesSerializer,
+)
+
+if "drf_spectacular" in settings.INSTALLED_APPS:
+    from drf_spectacular.utils import OpenApiExample, OpenApiParameter, extend_schema
+else:
+    # The API-only profile (app.settings_api) serves no schema: keep the
+    # declarations below but skip importing drf_spectacular.
+
+    class OpenApiParameter:
+        HEADER = "header"
+
+        def __init__(self, *args, **kwargs):
+            pass
+
+    OpenApiExample = OpenApiParameter
+
+    def extend_schema(**kwargs):
+        return lambda view: view
 
-from .serializers import NameCountryProbabilitySerializer, PopularNamesSerializer
 
 name_probability_schema = extend_schema(
     summary="Получить вероятность происхождения имени",
@@ -18,13 +42,42 @@ name_probability_schema = extend_schema(
                     description="Имя должно содержать только буквы и быть не длиннее 100 символов",
                 )
             ],
-        )
+        ),
+        OpenApiParameter(
+            name="X-Partial-Response",
+            description=(
+                "Присутствует, если данные о некоторых странах еще загружаются: для них "
+                "country_details содержит только code. Повторный запрос вернет полный ответ"
+            ),
+            type=str,
+            location=OpenApiParameter.HEADER,
+            response=[200],
+        ),
+        OpenApiParameter(
+            name="X-Stale-Response",
+            description=(
+                "Присутствует, если сервер перегружен и вернул сохраненные данные, "
+                "срок актуальности которых истек, без обращения к внешним API"
+            ),
+            type=str,
+            location=OpenApiParameter.HEADER,
+            response=[200],
+        ),
     ],
     responses={
         200: NameCountryProbabilitySerializer(many=True),
         400: OpenApiExample("Ошибка валидации", value={"error": "Name parameter is required"}),
         404: OpenApiExample("Данные не найдены", value={"error": "No data found for this name"}),
+        429: OpenApiExample(
+            "Слишком много запросов",
+            value={"error": "Too many requests, retry later"},
+        ),
         500: OpenApiExample("Внутренняя ошибка", value={"error": "Internal server error"}),
+        503: OpenApiExample(
+            "Сервер перегружен",
+            value={"error": "Service is overloaded, retry later"},
+            description="Имени нет в базе, а сервер перегружен. Повторите после Retry-After",
+        ),
     },
 )
 
@@ -42,12 +95,219 @@ popular_names_schema = extend_schema(
                     "Пример", value="US", description="Код страны должен состоять из 2 букв"
                 )
             ],
-        )
+        ),
+        OpenApiParameter(
+            name="window",
+            description="Учитывать только запросы за последний период (по умолчанию за все время)",
+            required=False,
+            type=str,
+            enum=["24h", "7d", "30d"],
+        ),
     ],
     responses={
         200: PopularNamesSerializer(many=True),
         400: OpenApiExample("Ошибка валидации", value={"error": "Country parameter is required"}),
         404: OpenApiExample("Данные не найдены", value={"error": "No data found for this country"}),
+        429: OpenApiExample(
+            "Слишком много запросов",
+            value={"error": "Too many requests, retry later"},
+        ),
         500: OpenApiExample("Внутренняя ошибка", value={"error": "Internal server error"}),
     },
 )
+
+export_schema = extend_schema(
+    summary="Выгрузить вероятности имен",
+    description=(
+        "Потоковая выгрузка всех пар имя-страна в формате NDJSON или CSV. "
+        "При заголовке Accept-Encoding: gzip ответ сжимается на лету"
+    ),
+    parameters=[
+        OpenApiParameter(
+            name="output",
+            description="Формат выгрузки",
+            required=False,
+            type=str,
+            enum=["ndjson", "csv"],
+        ),
+        OpenApiParameter(
+            name="country",
+            description="Двухбуквенный код страны (ISO 3166-1 alpha-2)",
+            required=False,
+            type=str,
+        ),
+        OpenApiParameter(name="region", description="Регион мира", required=False, type=str),
+        OpenApiParameter(
+            name="accessed_from",
+            description="Начало интервала последнего запроса (ISO 8601)",
+            required=False,
+            type=str,
+        ),
+        OpenApiParameter(
+            name="accessed_to",
+            description="Конец интервала последнего запроса, не включая (ISO 8601)",
+            required=False,
+            type=str,
+        ),
+    ],
+    responses={
+        (200, "application/x-ndjson"): str,
+        (200, "text/csv"): str,
+        400: OpenApiExample("Ошибка валидации", value={"error": "Invalid date: yesterday"}),
+    },
+)
+
+area_top_names_schema = extend_schema(
+    summary="Получить популярные имена для региона",
+    description=(
+        "Возвращает самые часто запрашиваемые имена для региона или субрегиона. "
+        "Данные берутся из агрегатов, которые обновляются командой refresh_rollups"
+    ),
+    parameters=[
+        OpenApiParameter(name="region", description="Регион мира", required=False, type=str),
+        OpenApiParameter(name="subregion", description="Субрегион", required=False, type=str),
+        OpenApiParameter(
+            name="limit", description="Количество имен (1-100)", required=False, type=int
+        ),
+    ],
+    responses={
+        200: PopularNamesSerializer(many=True),
+        400: OpenApiExample(
+            "Ошибка валидации", value={"error": "Exactly one of region or subregion is required"}
+        ),
+        404: OpenApiExample("Данные не найдены", value={"error": "No data found for this region"}),
+    },
+)
+
+area_volume_schema = extend_schema(
+    summary="Получить объем запросов по регионам",
+    description="Возвращает суммарное количество запросов по регионам или субрегионам",
+    parameters=[
+        OpenApiParameter(
+            name="scope",
+            description="Уровень агрегации",
+            required=False,
+            type=str,
+            enum=["region", "subregion"],
+        ),
+    ],
+    responses={
+        200: AreaVolumeSerializer(many=True),
+        400: OpenApiExample(
+            "Ошибка валидации", value={"error": "Scope must be region or subregion"}
+        ),
+    },
+)
+
+country_distribution_schema = extend_schema(
+    summary="Получить распределение стран для списка имен",
+    description="Возвращает, какие страны предсказываются для списка имен и с какой вероятностью",
+    parameters=[
+        OpenApiParameter(
+            name="names",
+            description="Имена через запятую, не более 100",
+            required=True,
+            type=str,
+            examples=[OpenApiExample("Пример", value="Ivan,Anna,John")],
+        ),
+    ],
+    responses={
+        200: CountryDistributionSerializer(many=True),
+        400: OpenApiExample("Ошибка валидации", value={"error": "Names parameter is required"}),
+        404: OpenApiExample("Данные не найдены", value={"error": "No data found for these names"}),
+    },
+)
+
+nearby_names_schema = extend_schema(
+    summary="Получить популярные имена рядом с точкой",
+    description=(
+        "Возвращает самые часто запрашиваемые имена для стран, столицы которых находятся "
+        "в заданном радиусе от точки или от столицы указанной страны"
+    ),
+    parameters=[
+        OpenApiParameter(name="lat", description="Широта точки", required=False, type=float),
+        OpenApiParameter(name="lon", description="Долгота точки", required=False, type=float),
+        OpenApiParameter(
+            name="country",
+            description="Код страны, от столицы которой считается радиус (вместо lat/lon)",
+            required=False,
+            type=str,
+        ),
+        OpenApiParameter(
+            name="radius_km",
+            description="Радиус в километрах (до 5000)",
+            required=False,
+            type=float,
+        ),
+        OpenApiParameter(
+            name="limit", description="Количество имен (1-100)", required=False, type=int
+        ),
+    ],
+    responses={
+        200: PopularNamesSerializer(many=True),
+        400: OpenApiExample(
+            "Ошибка валидации",
+            value={"error": "Either country or numeric lat and lon are required"},
+        ),
+        404: OpenApiExample(
+            "Данные не найдены", value={"error": "No data found within this radius"}
+        ),
+    },
+)
+
+neighbour_names_schema = extend_schema(
+    summary="Получить популярные имена страны и ее соседей",
+    description=(
+        "Возвращает самые часто запрашиваемые имена для страны и всех стран, "
+        "достижимых не более чем через hops сухопутных границ"
+    ),
+    parameters=[
+        OpenApiParameter(
+            name="country",
+            description="Двухбуквенный код страны (ISO 3166-1 alpha-2)",
+            required=True,
+            type=str,
+            examples=[OpenApiExample("Пример", value="DE")],
+        ),
+        OpenApiParameter(
+            name="hops", description="Количество границ (0-5)", required=False, type=int
+        ),
+        OpenApiParameter(
+            name="limit", description="Количество имен (1-100)", required=False, type=int
+        ),
+    ],
+    responses={
+        200: PopularNamesSerializer(many=True),
+        400: OpenApiExample(
+            "Ошибка валидации", value={"error": "hops must be in [0, 5], limit in [1, 100]"}
+        ),
+        404: OpenApiExample("Данные не найдены", value={"error": "No data found for this country"}),
+    },
+)
+
+trending_names_schema = extend_schema(
+    summary="Получить имена, популярные прямо сейчас",
+    description=(
+        "Приблизительный топ имен страны за текущее окно времени (Space-Saving). "
+        "Оценка count завышает истинное число запросов не более чем на error, "
+        "а error не превышает max_error = total / TRENDING_CAPACITY. "
+        "Имя, запрошенное больше max_error раз, гарантированно попадает в список"
+    ),
+    parameters=[
+        OpenApiParameter(
+            name="country",
+            description="Двухбуквенный код страны (ISO 3166-1 alpha-2)",
+            required=True,
+            type=str,
+        ),
+        OpenApiParameter(
+            name="limit", description="Количество имен (1-100)", required=False, type=int
+        ),
+    ],
+    responses={
+        200: TrendingNamesSerializer,
+        400: OpenApiExample(
+            "Ошибка валидации", value={"error": "Country code must be 2 characters long"}
+        ),
+    },
+)
@@ -1,11 +1,22 @@
-from datetime import timedelta
+import logging
+import time
+from concurrent.futures import wait
+from functools import partial
 
 import requests
-from django.db.models import Sum
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Sum
 from django.utils import timezone
 from rest_framework import serializers
 
-from .models import Country, NameCountryProbability
+from . import access, admission, enrichment, name_index, ngram_model, trending, upstream
+from .buckets import window_totals
+from .freshness import is_fresh, next_ttl
+from .metrics import PARTIAL_RESPONSES, PREDICTION_SOURCE, PROBABILITY_CACHE
+from .models import Country, NameCountryProbability, NameDistribution
+
+logger = logging.getLogger(__name__)
 
 
 class CountrySerializer(serializers.ModelSerializer):
@@ -27,6 +38,11 @@ class CountrySerializer(serializers.ModelSerializer):
             "flag_alt": "Текстовое описание флага",
         }
 
+    def to_representation(self, instance):
+        if getattr(instance, "enrichment_pending", False):
+            return {"code": instance.code}
+        return super().to_representation(instance)
+
 
 class NameCountryProbabilitySerializer(serializers.ModelSerializer):
     country_details = CountrySerializer(
@@ -44,21 +60,258 @@ class NameCountryProbabilitySerializer(serializers.ModelSerializer):
         fields = ["name", "probability", "count_of_requests", "last_accessed", "country_details"]
 
     @classmethod
-    def get_or_fetch_probabilities(cls, name):
-        one_day_ago = timezone.now() - timedelta(days=1)
-        probabilities = NameCountryProbability.objects.filter(
-            name=name, last_accessed__gte=one_day_ago
-        ).select_related("country")
+    def get_or_fetch_probabilities(cls, name, deadline=None, allow_upstream=True):
+        """
+        Without `allow_upstream` nothing is fetched: stale predictions are
+        returned with `stale` set on every row, and a name without any raises
+        admission.Overloaded.
 
-        if probabilities.exists():
+        With a `deadline` (a time.monotonic() value), countries missing from the
+        database are fetched in the background and only waited for until then.
+        Rows of countries still being fetched are returned unsaved, with
+        `enrichment_pending` set on the country; they are stored, and the
+        request counted, once every country is known.
+        """
+        if settings.NAME_STORAGE == "compact":
+            probabilities = cls._get_or_fetch_compact(name, deadline, allow_upstream)
+        else:
+            probabilities = cls._get_or_fetch_rows(name, deadline, allow_upstream)
+
+        if probabilities:
+            # Counters are written by the access recorder; report this request
+            # in the response straight away.
+            now = timezone.now()
             for prob in probabilities:
                 prob.count_of_requests += 1
-                prob.last_accessed = timezone.now()
-                prob.save()
+                prob.last_accessed = now
+            country_codes = [prob.country_id for prob in probabilities]
+            if not cls.is_partial(probabilities):
+                access.recorder.record(name, country_codes)
+            trending.tracker.record(name, country_codes)
+        return probabilities
+
+    @staticmethod
+    def is_partial(probabilities):
+        return any(getattr(prob.country, "enrichment_pending", False) for prob in probabilities)
+
+    @staticmethod
+    def is_stale(probabilities):
+        return any(getattr(prob, "stale", False) for prob in probabilities)
+
+    @staticmethod
+    def _without_upstream(probabilities):
+        if not probabilities:
+            raise admission.Overloaded()
+        for prob in probabilities:
+            prob.stale = True
+        return probabilities
+
+    @classmethod
+    def _get_or_fetch_rows(cls, name, deadline=None, allow_upstream=True):
+        probabilities = list(
+            NameCountryProbability.objects.filter(name=name).select_related("country")
+        )
+
+        # All rows of a name are written together, so they share fetched_at
+        # and refresh_ttl.
+        if probabilities and is_fresh(probabilities[0], timezone.now()):
+            PROBABILITY_CACHE.labels(result="hit").inc()
             return probabilities
 
+        PROBABILITY_CACHE.labels(result="stale" if probabilities else "miss").inc()
+
+        if not allow_upstream:
+            return cls._without_upstream(probabilities)
+        stored = {
+            prob.country_id: (prob.count_of_requests, prob.last_accessed) for prob in probabilities
+        }
+        return cls._refresh(
+            name,
+            cls._replace_probabilities,
+            deadline,
+            counters=lambda code: stored.get(code, (0, None)),
+        )
+
+    @classmethod
+    def refresh_probabilities(cls, name):
+        """Fetch a new distribution for `name` whatever its age, without counting a request."""
+        if settings.NAME_STORAGE == "compact":
+            return cls._refresh(name, cls._store_compact)
+        return cls._refresh(name, cls._replace_probabilities)
+
+    @classmethod
+    def _refresh(cls, name, store, deadline=None, counters=None):
+        """
+        `counters(code)` gives the stored (count_of_requests, last_accessed) of
+        a country, to fill the rows returned before the new ones are stored.
+        """
+        country_list = cls._predict(name)
+        if not country_list:
+            return None
+
+        resolved, pending = cls._resolve_countries(country_list, deadline)
+        if not pending:
+            return store(name, resolved)
+
+        PARTIAL_RESPONSES.inc()
+        enrichment.when_all_done(
+            pending.values(), cls._finish_refresh, name, store, resolved, pending
+        )
+        now = timezone.now()
+        probabilities = []
+        for country, probability in resolved:
+            count, last_accessed = counters(country.code) if counters else (0, None)
+            probabilities.append(
+                NameCountryProbability(
+                    name=name,
+                    country=country,
+                    probability=probability,
+                    count_of_requests=count,
+                    last_accessed=last_accessed,
+                    fetched_at=now,
+                )
+            )
+        return probabilities
+
+    @classmethod
+    def _finish_refresh(cls, name, store, resolved, pending):
+        try:
+            countries = {code: future.result() for code, future in pending.items()}
+        except Exception:
+            # Nothing was stored, so the next request for the name tries again.
+            logger.exception("Could not fetch countries for %s", name)
+            return
+
+        resolved = [
+            (countries.get(country.code, country), probability) for country, probability in resolved
+        ]
+        store(name, resolved)
+        access.recorder.record(name, [country.code for country, _ in resolved])
+
+    @classmethod
+    def _get_or_fetch_compact(cls, name, deadline=None, allow_upstream=True):
+        distribution = NameDistribution.objects.filter(name=name).first()
+
+        if distribution and is_fresh(distribution, timezone.now()):
+            PROBABILITY_CACHE.labels(result="hit").inc()
+            return cls._expand_distribution(distribution)
+
+        PROBABILITY_CACHE.labels(result="stale" if distribution else "miss").inc()
+
+        if not allow_upstream:
+            return cls._without_upstream(distribution and cls._expand_distribution(distribution))
+
+        def counters(code):
+            # Compact storage counts requests per name, not per country.
+            return distribution.count_of_requests, distribution.last_accessed
+
+        return cls._refresh(
+            name,
+            partial(cls._store_compact, previous=distribution),
+            deadline,
+            counters=counters if distribution else None,
+        )
+
+    @classmethod
+    def _store_compact(cls, name, resolved, previous=None):
+        countries = {country.code: probability for country, probability in resolved}
+        if previous is None:
+            previous = NameDistribution.objects.filter(name=name).first()
+
+        distribution, created = NameDistribution.objects.update_or_create(
+            name=name,
+            defaults={
+                "countries": countries,
+                "fetched_at": timezone.now(),
+                "refresh_ttl": next_ttl(
+                    previous and previous.refresh_ttl,
+                    previous.countries if previous else {},
+                    countries,
+                ),
+            },
+        )
+        return cls._expand_distribution(distribution)
+
+    @staticmethod
+    def _expand_distribution(distribution):
+        countries = Country.objects.in_bulk(list(distribution.countries))
+        ranked = sorted(distribution.countries.items(), key=lambda item: -item[1])
+        return [
+            NameCountryProbability(
+                name=distribution.name,
+                country=countries[code],
+                probability=probability,
+                count_of_requests=distribution.count_of_requests,
+                last_accessed=distribution.last_accessed,
+            )
+            for code, probability in ranked
+            if code in countries
+        ]
+
+    @classmethod
+    def _resolve_countries(cls, country_list, deadline=None):
+        """
+        Return [(country, probability)] for a prediction and {code: Future} of
+        the countries that were still being fetched when the deadline passed.
+        Those are represented by code-only placeholders in the list.
+        """
+        codes = [country_data["country_id"] for country_data in country_list]
+        countries = Country.objects.in_bulk(codes)
+        missing = [code for code in dict.fromkeys(codes) if code not in countries]
+        pending = {}
+
+        if deadline is None:
+            for code in missing:
+                countries[code] = cls._fetch_country(code)
+        elif missing:
+            futures = {
+                code: enrichment.enrich(code, cls._get_or_create_country) for code in missing
+            }
+            wait(futures.values(), timeout=max(0.0, deadline - time.monotonic()))
+            for code, future in futures.items():
+                if future.done():
+                    countries[code] = cls._fetch_country(code, future)
+                else:
+                    pending[code] = future
+                    countries[code] = Country(code=code)
+                    countries[code].enrichment_pending = True
+
+        resolved = [
+            (countries[country_data["country_id"]], country_data["probability"])
+            for country_data in country_list
+        ]
+        return resolved, pending
+
+    @classmethod
+    def _fetch_country(cls, code, future=None):
         try:
-            response = requests.get(f"https://api.nationalize.io/?name={name}")
+            return future.result() if future else cls._get_or_create_country(code)
+        except Exception as e:
+            raise serializers.ValidationError({"error": f"Error processing country data: {str(e)}"})
+
+    @classmethod
+    def _predict(cls, name):
+        index = name_index.get_index()
+        if index is not None:
+            country_list = index.lookup(name)
+            if country_list:
+                PREDICTION_SOURCE.labels(source="local_index").inc()
+                return country_list
+
+        model = ngram_model.get_model()
+        if model is not None:
+            country_list, confidence = model.predict_one(name)
+            if country_list and confidence >= settings.NGRAM_MIN_CONFIDENCE:
+                PREDICTION_SOURCE.labels(source="ngram_model").inc()
+                return country_list
+
+        PREDICTION_SOURCE.labels(source="nationalize").inc()
+        return cls._fetch_nationalize(name)
+
+    @staticmethod
+    def _fetch_nationalize(name):
+        try:
+            response = upstream.get(f"https://api.nationalize.io/?name={name}")
             response.raise_for_status()
             nationalize_response = response.json()
         except (requests.RequestException, ValueError) as e:
@@ -66,21 +319,7 @@ class NameCountryProbabilitySerializer(serializers.ModelSerializer):
                 {"error": f"Error fetching data from external API: {str(e)}"}
             )
 
-        if not nationalize_response.get("country"):
-            return None
-
-        results = []
-        for country_data in nationalize_response["country"]:
-            try:
-                country = cls._get_or_create_country(country_data["country_id"])
-                prob = cls._create_or_update_probability(name, country, country_data["probability"])
-                results.append(prob)
-            except Exception as e:
-                raise serializers.ValidationError(
-                    {"error": f"Error processing country data: {str(e)}"}
-                )
-
-        return results
+        return nationalize_response.get("country")
 
     @staticmethod
     def _get_or_create_country(country_code):
@@ -100,7 +339,7 @@ class NameCountryProbabilitySerializer(serializers.ModelSerializer):
                     "coatOfArms",
                     "borders",
                 ]
-                response = requests.get(
+                response = upstream.get(
                     f"https://restcountries.com/v3.1/alpha/{country_code}"
                     f"?fields={','.join(fields)}"
                 )
@@ -117,26 +356,36 @@ class NameCountryProbabilitySerializer(serializers.ModelSerializer):
                     else ""
                 )
 
-                country = Country.objects.create(
+                # Parallel enrichments of the same country (or of neighbours
+                # through their borders) race here; the loser reads the winner's row.
+                country, created = Country.objects.get_or_create(
                     code=country_code,
-                    name=country_response.get("name", {}).get("common", ""),
-                    official_name=country_response.get("name", {}).get("official", ""),
-                    region=country_response.get("region", ""),
-                    subregion=country_response.get("subregion", ""),
-                    independent=country_response.get("independent", False),
-                    google_maps_url=country_response.get("maps", {}).get("googleMaps", ""),
-                    openstreetmap_url=country_response.get("maps", {}).get("openStreetMaps", ""),
-                    capital_name=capital_name,
-                    capital_latitude=capital_coords[0] if capital_coords else None,
-                    capital_longitude=capital_coords[1] if capital_coords else None,
-                    flag_png_url=country_response.get("flags", {}).get("png", ""),
-                    flag_svg_url=country_response.get("flags", {}).get("svg", ""),
-                    flag_alt=country_response.get("flags", {}).get("alt", ""),
-                    coat_of_arms_png_url=country_response.get("coatOfArms", {}).get("png", ""),
-                    coat_of_arms_svg_url=country_response.get("coatOfArms", {}).get("svg", ""),
+                    defaults={
+                        "name": country_response.get("name", {}).get("common", ""),
+                        "official_name": country_response.get("name", {}).get("official", ""),
+                        "region": country_response.get("region", ""),
+                        "subregion": country_response.get("subregion", ""),
+                        "independent": country_response.get("independent", False),
+                        "google_maps_url": country_response.get("maps", {}).get("googleMaps", ""),
+                        "openstreetmap_url": country_response.get("maps", {}).get(
+                            "openStreetMaps", ""
+                        ),
+                        "capital_name": capital_name,
+                        "capital_latitude": capital_coords[0] if capital_coords else None,
+                        "capital_longitude": capital_coords[1] if capital_coords else None,
+                        "flag_png_url": country_response.get("flags", {}).get("png", ""),
+                        "flag_svg_url": country_response.get("flags", {}).get("svg", ""),
+                        "flag_alt": country_response.get("flags", {}).get("alt", ""),
+                        "coat_of_arms_png_url": country_response.get("coatOfArms", {}).get(
+                            "png", ""
+                        ),
+                        "coat_of_arms_svg_url": country_response.get("coatOfArms", {}).get(
+                            "svg", ""
+                        ),
+                    },
                 )
-
-                country.save()
+                if not created:
+                    return country
 
                 if country_response.get("borders"):
                     for border_code in country_response["borders"]:
@@ -149,8 +398,8 @@ class NameCountryProbabilitySerializer(serializers.ModelSerializer):
                                     )
                                 )
                             country.borders.add(border_country)
-                        except Exception as e:
-                            print(f"Error processing border country {border_code}: {str(e)}")
+                        except Exception:
+                            logger.exception("Error processing border country %s", border_code)
                             continue
 
             except requests.RequestException as e:
@@ -161,24 +410,52 @@ class NameCountryProbabilitySerializer(serializers.ModelSerializer):
         return country
 
     @staticmethod
-    def _create_or_update_probability(name, country, probability):
-        prob, created = NameCountryProbability.objects.get_or_create(
-            name=name,
-            country=country,
-            defaults={
-                "probability": probability,
-                "count_of_requests": 1,
-                "last_accessed": timezone.now(),
-            },
-        )
+    def _replace_probabilities(name, resolved):
+        """
+        Replace the stored distribution of a name with a fresh one.
+
+        Runs a fixed number of statements regardless of how many countries are
+        predicted: a read of the current rows, one upsert and one delete of
+        countries that are no longer predicted. The upsert leaves the counters
+        to the access recorder; they are only read to fill the returned rows.
+        """
+        now = timezone.now()
 
-        if not created:
-            prob.probability = probability
-            prob.count_of_requests += 1
-            prob.last_accessed = timezone.now()
-            prob.save()
+        with transaction.atomic():
+            rows = NameCountryProbability.objects.filter(name=name).values_list(
+                "country_id", "probability", "count_of_requests", "last_accessed", "refresh_ttl"
+            )
+            previous, counters, previous_ttl = {}, {}, None
+            for code, probability, count, last_accessed, previous_ttl in rows:
+                previous[code] = probability
+                counters[code] = (count, last_accessed)
+            refresh_ttl = next_ttl(
+                previous_ttl,
+                previous,
+                {country.code: probability for country, probability in resolved},
+            )
+            probabilities = NameCountryProbability.objects.bulk_create(
+                [
+                    NameCountryProbability(
+                        name=name,
+                        country=country,
+                        probability=probability,
+                        count_of_requests=counters.get(country.code, (0, None))[0],
+                        last_accessed=counters.get(country.code, (0, None))[1],
+                        fetched_at=now,
+                        refresh_ttl=refresh_ttl,
+                    )
+                    for country, probability in resolved
+                ],
+                update_conflicts=True,
+                unique_fields=["name", "country"],
+                update_fields=["probability", "fetched_at", "refresh_ttl"],
+            )
+            NameCountryProbability.objects.filter(name=name).exclude(
+                country__in=[country for country, _ in resolved]
+            ).delete()
 
-        return prob
+        return probabilities
 
 
 class PopularNamesSerializer(serializers.Serializer):
@@ -186,10 +463,83 @@ class PopularNamesSerializer(serializers.Serializer):
     total_requests = serializers.IntegerField(help_text="Общее количество запросов для этого имени")
 
     @classmethod
-    def get_popular_names(cls, country_code):
+    def ranking(cls, country_code, window=None):
+        """Top names of a country in the order the API returns them."""
+        top_names = [
+            name
+            for name in cls.get_popular_names(country_code, window)
+            if name["total_requests"] > 0
+        ]
+        top_names.sort(key=lambda x: (-x["total_requests"], x["name"]))
+        return top_names
+
+    @classmethod
+    def get_popular_names(cls, country_code, window=None):
+        if window is not None:
+            return window_totals(country_code, window).order_by("-total_requests")[:5]
+
+        if settings.NAME_STORAGE == "compact":
+            # A compact row carries one counter for the whole distribution, which
+            # is what the per-country Sum adds up to in the row layout.
+            return (
+                NameDistribution.objects.filter(countries__has_key=country_code)
+                .values("name")
+                .annotate(total_requests=F("count_of_requests"))
+                .order_by("-total_requests")[:5]
+            )
+
         return (
             NameCountryProbability.objects.filter(country__code=country_code)
             .values("name")
             .annotate(total_requests=Sum("count_of_requests"))
             .order_by("-total_requests")[:5]
         )
+
+    @classmethod
+    def get_popular_names_for_countries(cls, country_codes, limit=5):
+        if settings.NAME_STORAGE == "compact":
+            return (
+                NameDistribution.objects.filter(countries__has_any_keys=country_codes)
+                .values("name")
+                .annotate(total_requests=F("count_of_requests"))
+                .order_by("-total_requests", "name")[:limit]
+            )
+
+        return (
+            NameCountryProbability.objects.filter(country_id__in=country_codes)
+            .values("name")
+            .annotate(total_requests=Sum("count_of_requests"))
+            .order_by("-total_requests", "name")[:limit]
+        )
+
+
+class AreaVolumeSerializer(serializers.Serializer):
+    area = serializers.CharField(help_text="Регион или субрегион")
+    total_requests = serializers.IntegerField(
+        help_text="Сумма запросов имен, предсказанных для стран этой области"
+    )
+    names = serializers.IntegerField(help_text="Количество различных имен")
+
+
+class CountryDistributionSerializer(serializers.Serializer):
+    country = serializers.CharField(help_text="Двухбуквенный код страны (ISO 3166-1 alpha-2)")
+    names = serializers.IntegerField(help_text="Сколько имен из списка предсказывают эту страну")
+    mean_probability = serializers.FloatField(
+        help_text="Средняя вероятность страны по всем именам из списка"
+    )
+
+
+class TrendingNameSerializer(serializers.Serializer):
+    name = serializers.CharField(help_text="Имя")
+    count = serializers.IntegerField(help_text="Оценка количества запросов (не меньше истинного)")
+    error = serializers.IntegerField(help_text="Максимальное завышение оценки")
+
+
+class TrendingNamesSerializer(serializers.Serializer):
+    country = serializers.CharField(help_text="Двухбуквенный код страны (ISO 3166-1 alpha-2)")
+    window_seconds = serializers.IntegerField(help_text="Длина окна в секундах")
+    total = serializers.IntegerField(help_text="Всего запросов страны в текущем окне")
+    max_error = serializers.IntegerField(
+        help_text="Верхняя граница ошибки любой оценки: total / количество счетчиков"
+    )
+    names = TrendingNameSerializer(many=True)
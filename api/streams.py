@@ -0,0 +1,125 @@
+import asyncio
+import json
+import logging
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+
+from .metrics import STREAM_SUBSCRIBERS, STREAM_UPDATES
+from .serializers import PopularNamesSerializer
+
+logger = logging.getLogger(__name__)
+
+
+def format_event(event, data):
+    return f"event: {event}\ndata: {json.dumps(data, separators=(',', ':'))}\n\n".encode()
+
+
+class Subscriber:
+    """
+    Holds at most one undelivered update per country: a newer ranking replaces
+    the one a slow client has not read yet, so memory stays bounded however
+    far behind it is.
+    """
+
+    def __init__(self):
+        self._pending = {}
+        self._ready = asyncio.Event()
+
+    def offer(self, code, payload):
+        if code in self._pending:
+            STREAM_UPDATES.labels(result="coalesced").inc()
+        self._pending[code] = payload
+        self._ready.set()
+
+    async def next_batch(self, timeout):
+        try:
+            await asyncio.wait_for(self._ready.wait(), timeout)
+        except asyncio.TimeoutError:
+            return []
+        self._ready.clear()
+        batch, self._pending = list(self._pending.values()), {}
+        STREAM_UPDATES.labels(result="sent").inc(len(batch))
+        return batch
+
+
+class CountryFeed:
+    """Polls the ranking of one country for all its subscribers."""
+
+    def __init__(self, code):
+        self.code = code
+        self.subscribers = set()
+        self.names = None
+        self.payload = None
+        self.task = None
+
+    async def run(self):
+        while True:
+            try:
+                ranking = await sync_to_async(PopularNamesSerializer.ranking)(self.code)
+            except Exception:
+                logger.exception("Could not compute the ranking of %s", self.code)
+            else:
+                self.publish(ranking)
+            await asyncio.sleep(settings.POPULAR_STREAM_POLL_SECONDS)
+
+    def publish(self, ranking):
+        names = [entry["name"] for entry in ranking]
+        if names == self.names:
+            return
+        self.names = names
+        self.payload = format_event(
+            "ranking",
+            {"country": self.code, "names": PopularNamesSerializer(ranking, many=True).data},
+        )
+        for subscriber in self.subscribers:
+            subscriber.offer(self.code, self.payload)
+
+
+class PopularNamesHub:
+    """One feed per watched country, shared by every stream of the process."""
+
+    def __init__(self):
+        self.feeds = {}
+
+    def subscribe(self, codes):
+        subscriber = Subscriber()
+        for code in codes:
+            feed = self.feeds.get(code)
+            if feed is None:
+                feed = self.feeds[code] = CountryFeed(code)
+                feed.task = asyncio.ensure_future(feed.run())
+            feed.subscribers.add(subscriber)
+            if feed.payload is not None:
+                subscriber.offer(code, feed.payload)
+        STREAM_SUBSCRIBERS.inc()
+        return subscriber
+
+    def unsubscribe(self, subscriber, codes):
+        for code in codes:
+            feed = self.feeds.get(code)
+            if feed is None:
+                continue
+            feed.subscribers.discard(subscriber)
+            if not feed.subscribers:
+                feed.task.cancel()
+                del self.feeds[code]
+        STREAM_SUBSCRIBERS.dec()
+
+
+hub = PopularNamesHub()
+
+
+async def popular_names_events(codes):
+    subscriber = hub.subscribe(codes)
+    try:
+        yield f"retry: {settings.POPULAR_STREAM_RETRY_MS}\n\n".encode()
+        while True:
+            batch = await subscriber.next_batch(settings.POPULAR_STREAM_HEARTBEAT_SECONDS)
+            if not batch:
+                # Keeps proxies from closing an idle connection.
+                yield b": keepalive\n\n"
+            for payload in batch:
+                yield payload
+    finally:
+        hub.unsubscribe(subscriber, codes)
@@ -0,0 +1,192 @@
+"""
+Approximate "trending now" names per country.
+
+Every worker keeps one Space-Saving summary with TRENDING_CAPACITY counters per
+country and time window, fed from the lookup path without touching the
+database. Workers publish their summaries to TRENDING_DIR every few seconds,
+and the trending endpoint merges the files of all workers.
+
+Error bounds: for a summary over N requests with k counters, every reported
+count overestimates the true count by at most its `error`, and `error` never
+exceeds N / k. Any name requested more than N / k times in the window is
+guaranteed to be reported. Merging summaries keeps both properties, with N the
+total over all merged workers.
+"""
+
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+
+class SpaceSaving:
+    def __init__(self, capacity, counters=None):
+        self.capacity = capacity
+        self.counters = counters or {}
+        self.total = sum(count for count, _ in self.counters.values())
+
+    def offer(self, item, weight=1):
+        self.total += weight
+        if item in self.counters:
+            self.counters[item][0] += weight
+        elif len(self.counters) < self.capacity:
+            self.counters[item] = [weight, 0]
+        else:
+            evicted = min(self.counters, key=lambda key: self.counters[key][0])
+            floor, _ = self.counters.pop(evicted)
+            self.counters[item] = [floor + weight, floor]
+
+    def floor(self):
+        """Upper bound on the count of any item that is not tracked."""
+        if len(self.counters) < self.capacity:
+            return 0
+        return min(count for count, _ in self.counters.values())
+
+    @classmethod
+    def merge(cls, summaries, capacity):
+        merged = {}
+        floors = [summary.floor() for summary in summaries]
+        items = {item for summary in summaries for item in summary.counters}
+        for item in items:
+            count = error = 0
+            for summary, floor in zip(summaries, floors):
+                if item in summary.counters:
+                    item_count, item_error = summary.counters[item]
+                    count += item_count
+                    error += item_error
+                else:
+                    count += floor
+                    error += floor
+            merged[item] = [count, error]
+
+        kept = sorted(merged.items(), key=lambda entry: -entry[1][0])[:capacity]
+        result = cls(capacity, dict(kept))
+        result.total = sum(summary.total for summary in summaries)
+        return result
+
+    def top(self, limit):
+        ranked = sorted(self.counters.items(), key=lambda entry: (-entry[1][0], entry[0]))
+        return [
+            {"name": name, "count": count, "error": error}
+            for name, (count, error) in ranked[:limit]
+        ]
+
+    def to_dict(self):
+        return {"total": self.total, "counters": self.counters}
+
+    @classmethod
+    def from_dict(cls, data, capacity):
+        summary = cls(capacity, {name: list(entry) for name, entry in data["counters"].items()})
+        summary.total = data["total"]
+        return summary
+
+
+def current_window(now=None):
+    return int((now or time.time()) // settings.TRENDING_WINDOW_SECONDS)
+
+
+def trending_dir():
+    return Path(settings.TRENDING_DIR or Path(tempfile.gettempdir()) / "name-trending")
+
+
+class TrendingTracker:
+    def __init__(self):
+        self._lock = threading.Lock()
+        # Serialises publishing so an older snapshot never replaces a newer one.
+        self._publish_lock = threading.Lock()
+        self._window = None
+        self._summaries = {}
+        self._published_at = 0.0
+
+    def record(self, name, country_codes):
+        window = current_window()
+        now = time.monotonic()
+        with self._lock:
+            if window != self._window:
+                self._window = window
+                self._summaries = {}
+            for code in country_codes:
+                summary = self._summaries.get(code)
+                if summary is None:
+                    summary = self._summaries[code] = SpaceSaving(settings.TRENDING_CAPACITY)
+                summary.offer(name)
+            # Only the thread that claims the interval publishes.
+            due = now - self._published_at >= settings.TRENDING_PUBLISH_SECONDS
+            if due:
+                self._published_at = now
+
+        if due:
+            try:
+                self.publish()
+            except Exception:
+                # Trending is best effort and must never fail a lookup.
+                logger.exception("Could not publish trending names")
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                "window": self._window,
+                "countries": {code: s.to_dict() for code, s in self._summaries.items()},
+            }
+
+    def publish(self):
+        directory = trending_dir()
+        directory.mkdir(parents=True, exist_ok=True)
+        path = directory / f"{os.getpid()}.json"
+
+        with self._publish_lock:
+            snapshot = self.snapshot()
+            fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+            try:
+                with os.fdopen(fd, "w") as f:
+                    json.dump(snapshot, f)
+                os.replace(tmp_path, path)
+            except BaseException:
+                Path(tmp_path).unlink(missing_ok=True)
+                raise
+
+
+tracker = TrendingTracker()
+
+
+def trending_names(country_code, limit):
+    """Merge the current window of every worker for one country."""
+    window = current_window()
+    summaries = []
+    # This worker's counters are read from memory, the others' from their files.
+    own_path = f"{os.getpid()}.json"
+    paths = [path for path in trending_dir().glob("*.json") if path.name != own_path]
+
+    for path in [None, *paths]:
+        if path is None:
+            snapshot = tracker.snapshot()
+        else:
+            try:
+                snapshot = json.loads(path.read_text())
+            except (OSError, ValueError):
+                continue
+        if snapshot["window"] != window:
+            # Left behind by a worker that has exited or has been idle since.
+            stale = snapshot["window"] is None or snapshot["window"] < window - 1
+            if path is not None and stale:
+                path.unlink(missing_ok=True)
+            continue
+        data = snapshot["countries"].get(country_code)
+        if data:
+            summaries.append(SpaceSaving.from_dict(data, settings.TRENDING_CAPACITY))
+
+    merged = SpaceSaving.merge(summaries, settings.TRENDING_CAPACITY)
+    return {
+        "country": country_code,
+        "window_seconds": settings.TRENDING_WINDOW_SECONDS,
+        "total": merged.total,
+        "max_error": merged.total // settings.TRENDING_CAPACITY,
+        "names": merged.top(limit),
+    }
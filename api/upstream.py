@@ -0,0 +1,82 @@
+import functools
+import logging
+import time
+from urllib.parse import urlsplit
+
+import requests
+from django.conf import settings
+
+from .http_cache import ResponseCache
+from .metrics import UPSTREAM_CACHE, UPSTREAM_LATENCY
+
+logger = logging.getLogger(__name__)
+
+
+@functools.lru_cache(maxsize=None)
+def _cache_for(directory, max_bytes):
+    return ResponseCache(directory, max_bytes)
+
+
+def get_cache():
+    if not settings.UPSTREAM_CACHE_DIR:
+        return None
+    return _cache_for(settings.UPSTREAM_CACHE_DIR, settings.UPSTREAM_CACHE_MAX_BYTES)
+
+
+def _fetch(url, host, **kwargs):
+    status = "error"
+    start = time.perf_counter()
+    try:
+        response = requests.get(url, **kwargs)
+        status = str(response.status_code)
+        return response
+    finally:
+        UPSTREAM_LATENCY.labels(host=host, status=status).observe(time.perf_counter() - start)
+
+
+def get(url, **kwargs):
+    """
+    GET an upstream URL through the on-disk response cache when
+    UPSTREAM_CACHE_DIR is set. Fresh entries are served without a request,
+    stale ones are revalidated with their ETag/Last-Modified, and with
+    UPSTREAM_CACHE_OFFLINE the network is never used.
+    """
+    host = urlsplit(url).hostname or "unknown"
+    cache = get_cache()
+    if cache is None:
+        return _fetch(url, host, **kwargs)
+
+    now = time.time()
+    entry = cache.load(url)
+
+    if settings.UPSTREAM_CACHE_OFFLINE:
+        if entry is None:
+            UPSTREAM_CACHE.labels(host=host, result="offline_miss").inc()
+            raise requests.ConnectionError(f"{url} is not in the upstream cache (offline mode)")
+        UPSTREAM_CACHE.labels(host=host, result="offline_hit").inc()
+        return entry.to_response()
+
+    if entry is not None and entry.is_fresh(now):
+        UPSTREAM_CACHE.labels(host=host, result="hit").inc()
+        return entry.to_response()
+
+    if entry is not None:
+        kwargs["headers"] = {**entry.validators(), **(kwargs.get("headers") or {})}
+    try:
+        response = _fetch(url, host, **kwargs)
+    except requests.RequestException:
+        if entry is None:
+            raise
+        logger.warning("Serving stale cached response for %s", url, exc_info=True)
+        UPSTREAM_CACHE.labels(host=host, result="stale").inc()
+        return entry.to_response()
+
+    default_ttl = settings.UPSTREAM_CACHE_DEFAULT_TTL
+    if response.status_code == 304 and entry is not None:
+        UPSTREAM_CACHE.labels(host=host, result="revalidated").inc()
+        return cache.revalidated(entry, response, now, default_ttl).to_response()
+
+    UPSTREAM_CACHE.labels(host=host, result="miss").inc()
+    if response.status_code == 200:
+        cache.store(url, response, now, default_ttl)
+    return response
@@ -1,8 +1,33 @@
 from django.urls import path
 
-from .views import NameProbabilityView, PopularNamesView
+from .views import (
+    AreaTopNamesView,
+    AreaVolumeView,
+    CountryDistributionView,
+    NameProbabilityExportView,
+    NameProbabilityView,
+    NearbyNamesView,
+    NeighbourNamesView,
+    PopularNamesView,
+    TrendingNamesView,
+    metrics_view,
+    popular_names_stream,
+)
 
 urlpatterns = [
     path("names/", NameProbabilityView.as_view(), name="name-probability"),
     path("popular-names/", PopularNamesView.as_view(), name="popular-names"),
+    path("popular-names/nearby/", NearbyNamesView.as_view(), name="popular-names-nearby"),
+    path("popular-names/stream/", popular_names_stream, name="popular-names-stream"),
+    path("popular-names/trending/", TrendingNamesView.as_view(), name="popular-names-trending"),
+    path(
+        "popular-names/neighbours/",
+        NeighbourNamesView.as_view(),
+        name="popular-names-neighbours",
+    ),
+    path("analytics/top-names/", AreaTopNamesView.as_view(), name="area-top-names"),
+    path("analytics/volume/", AreaVolumeView.as_view(), name="area-volume"),
+    path("analytics/countries/", CountryDistributionView.as_view(), name="country-distribution"),
+    path("export/", NameProbabilityExportView.as_view(), name="name-probability-export"),
+    path("metrics/", metrics_view, name="metrics"),
 ]
@@ -1,15 +1,50 @@
+import time
+
+from django.conf import settings
 from django.core.exceptions import ValidationError as DjangoValidationError
+from django.core.handlers.asgi import ASGIRequest
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
+from django.utils.cache import patch_vary_headers
 from rest_framework import status
 from rest_framework.exceptions import ValidationError
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
-from .schemas import name_probability_schema, popular_names_schema
-from .serializers import NameCountryProbabilitySerializer, PopularNamesSerializer
+from .admission import AdmissionControlMixin, Overloaded
+from .borders import merge_top_lists, neighbourhood, top_names_per_country
+from .buckets import WINDOWS
+from .export import RENDERERS, export_rows, gzip_stream, parse_timestamp, render
+from .geo import get_grid
+from .metrics import ADMISSION, VIEW_ERRORS, render_latest
+from .middleware import accepted_encodings
+from .models import Country
+from .rollups import SCOPES, area_volume, country_distribution, top_names
+from .schemas import (
+    area_top_names_schema,
+    area_volume_schema,
+    country_distribution_schema,
+    export_schema,
+    name_probability_schema,
+    nearby_names_schema,
+    neighbour_names_schema,
+    popular_names_schema,
+    trending_names_schema,
+)
+from .serializers import (
+    AreaVolumeSerializer,
+    CountryDistributionSerializer,
+    NameCountryProbabilitySerializer,
+    PopularNamesSerializer,
+    TrendingNamesSerializer,
+)
+from .streams import popular_names_events
+from .trending import trending_names
 
 
 @name_probability_schema
-class NameProbabilityView(APIView):
+class NameProbabilityView(AdmissionControlMixin, APIView):
+    admission_name = "name-probability"
+
     def get(self, request):
         name = request.query_params.get("name", "").strip()
         if not name:
@@ -20,11 +55,26 @@ class NameProbabilityView(APIView):
         if len(name) > 100:
             return Response({"error": "Name is too long"}, status=status.HTTP_400_BAD_REQUEST)
 
+        deadline = None
+        if settings.NAME_LATENCY_BUDGET > 0:
+            deadline = time.monotonic() + settings.NAME_LATENCY_BUDGET
+
         try:
-            probabilities = NameCountryProbabilitySerializer.get_or_fetch_probabilities(name)
+            probabilities = NameCountryProbabilitySerializer.get_or_fetch_probabilities(
+                name, deadline, allow_upstream=not request.overloaded
+            )
+        except Overloaded:
+            ADMISSION.labels(view=self.admission_name, decision="rejected").inc()
+            return Response(
+                {"error": "Service is overloaded, retry later"},
+                status=status.HTTP_503_SERVICE_UNAVAILABLE,
+                headers={"Retry-After": str(settings.ADMISSION_RETRY_AFTER)},
+            )
         except ValidationError as e:
+            VIEW_ERRORS.labels(view="name-probability", reason="validation").inc()
             return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
         except Exception as e:
+            VIEW_ERRORS.labels(view="name-probability", reason="unexpected").inc()
             return Response(
                 {"error": f"Internal server error: {str(e)}"},
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -36,11 +86,21 @@ class NameProbabilityView(APIView):
             )
 
         serializer = NameCountryProbabilitySerializer(probabilities, many=True)
-        return Response(serializer.data)
+        response = Response(serializer.data)
+        if NameCountryProbabilitySerializer.is_partial(probabilities):
+            response["X-Partial-Response"] = "country_details"
+        if NameCountryProbabilitySerializer.is_stale(probabilities):
+            ADMISSION.labels(view=self.admission_name, decision="stale").inc()
+            response["X-Stale-Response"] = "overload"
+        return response
 
 
 @popular_names_schema
-class PopularNamesView(APIView):
+class PopularNamesView(AdmissionControlMixin, APIView):
+    # Rankings are read from the database only, so they are served under
+    # overload; the view still counts towards concurrency and fair share.
+    admission_name = "popular-names"
+
     def get(self, request):
         country_code = request.query_params.get("country", "").strip().upper()
         if not country_code:
@@ -54,24 +114,314 @@ class PopularNamesView(APIView):
                 status=status.HTTP_400_BAD_REQUEST,
             )
 
+        window = request.query_params.get("window", "").strip().lower() or None
+        if window is not None and window not in WINDOWS:
+            return Response(
+                {"error": f"Window must be one of: {', '.join(WINDOWS)}"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
         try:
-            top_names = PopularNamesSerializer.get_popular_names(country_code)
-            top_names = [name for name in top_names if name["total_requests"] > 0]
+            top_names = PopularNamesSerializer.ranking(country_code, window)
 
             if not top_names:
                 return Response(
                     {"error": "No data found for this country"}, status=status.HTTP_404_NOT_FOUND
                 )
 
-            top_names.sort(key=lambda x: (-x["total_requests"], x["name"]))
-
             serializer = PopularNamesSerializer(top_names, many=True)
             return Response(serializer.data)
 
         except DjangoValidationError as e:
+            VIEW_ERRORS.labels(view="popular-names", reason="validation").inc()
             return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
         except Exception as e:
+            VIEW_ERRORS.labels(view="popular-names", reason="unexpected").inc()
             return Response(
                 {"error": f"Internal server error: {str(e)}"},
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR,
             )
+
+
+@export_schema
+class NameProbabilityExportView(APIView):
+    def perform_content_negotiation(self, request, force=False):
+        # The body is CSV or NDJSON whatever the Accept header says, so only
+        # error responses go through the regular renderers.
+        return super().perform_content_negotiation(request, force=True)
+
+    def get(self, request):
+        output = request.query_params.get("output", "ndjson").strip().lower()
+        if output not in RENDERERS:
+            return Response(
+                {"error": f"Output must be one of: {', '.join(RENDERERS)}"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        country_code = request.query_params.get("country", "").strip().upper() or None
+        if country_code and len(country_code) != 2:
+            return Response(
+                {"error": "Country code must be 2 characters long"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        try:
+            accessed_from, accessed_to = (
+                (
+                    parse_timestamp(request.query_params[param])
+                    if request.query_params.get(param)
+                    else None
+                )
+                for param in ("accessed_from", "accessed_to")
+            )
+        except ValueError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        rows = export_rows(
+            country=country_code,
+            region=request.query_params.get("region", "").strip() or None,
+            accessed_from=accessed_from,
+            accessed_to=accessed_to,
+        )
+        chunks, content_type = render(rows, output)
+
+        # Only gzip is streamed; brotli would need a streaming encoder.
+        encodings = accepted_encodings(request.META.get("HTTP_ACCEPT_ENCODING", ""))
+        gzipped = encodings.get("gzip", encodings.get("*", 0)) > 0
+        response = StreamingHttpResponse(
+            gzip_stream(chunks) if gzipped else chunks, content_type=content_type
+        )
+        if gzipped:
+            response["Content-Encoding"] = "gzip"
+        patch_vary_headers(response, ["Accept-Encoding"])
+        response["Content-Disposition"] = f'attachment; filename="name-probabilities.{output}"'
+        return response
+
+
+@area_top_names_schema
+class AreaTopNamesView(APIView):
+    def get(self, request):
+        scopes = [scope for scope in SCOPES if request.query_params.get(scope, "").strip()]
+        if len(scopes) != 1:
+            return Response(
+                {"error": "Exactly one of region or subregion is required"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        scope = scopes[0]
+
+        try:
+            limit = int(request.query_params.get("limit", 5))
+        except ValueError:
+            limit = 0
+        if not 1 <= limit <= 100:
+            return Response(
+                {"error": "Limit must be between 1 and 100"}, status=status.HTTP_400_BAD_REQUEST
+            )
+
+        names = list(top_names(scope, request.query_params[scope].strip(), limit))
+        if not names:
+            return Response(
+                {"error": f"No data found for this {scope}"}, status=status.HTTP_404_NOT_FOUND
+            )
+
+        return Response(PopularNamesSerializer(names, many=True).data)
+
+
+@area_volume_schema
+class AreaVolumeView(APIView):
+    def get(self, request):
+        scope = request.query_params.get("scope", "region").strip().lower()
+        if scope not in SCOPES:
+            return Response(
+                {"error": "Scope must be region or subregion"}, status=status.HTTP_400_BAD_REQUEST
+            )
+
+        return Response(AreaVolumeSerializer(area_volume(scope), many=True).data)
+
+
+@country_distribution_schema
+class CountryDistributionView(APIView):
+    def get(self, request):
+        names = list(
+            dict.fromkeys(name.strip() for name in request.query_params.get("names", "").split(","))
+        )
+        names = [name for name in names if name]
+        if not names:
+            return Response(
+                {"error": "Names parameter is required"}, status=status.HTTP_400_BAD_REQUEST
+            )
+        if len(names) > 100 or any(len(name) > 100 for name in names):
+            return Response(
+                {"error": "At most 100 names of up to 100 characters are allowed"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        distribution = country_distribution(names)
+        if not distribution:
+            return Response(
+                {"error": "No data found for these names"}, status=status.HTTP_404_NOT_FOUND
+            )
+
+        return Response(CountryDistributionSerializer(distribution, many=True).data)
+
+
+@nearby_names_schema
+class NearbyNamesView(APIView):
+    MAX_RADIUS_KM = 5000
+
+    def get(self, request):
+        params = request.query_params
+        try:
+            radius_km = float(params.get("radius_km", 500))
+            limit = int(params.get("limit", 5))
+        except ValueError:
+            return Response(
+                {"error": "radius_km and limit must be numbers"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        if not 0 < radius_km <= self.MAX_RADIUS_KM or not 1 <= limit <= 100:
+            return Response(
+                {"error": f"radius_km must be in (0, {self.MAX_RADIUS_KM}], limit in [1, 100]"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        country_code = params.get("country", "").strip().upper()
+        if country_code:
+            capital = (
+                Country.objects.filter(code=country_code)
+                .values_list("capital_latitude", "capital_longitude")
+                .first()
+            )
+            if capital is None or None in capital:
+                return Response(
+                    {"error": "No capital coordinates found for this country"},
+                    status=status.HTTP_404_NOT_FOUND,
+                )
+            latitude, longitude = capital
+        else:
+            try:
+                latitude, longitude = float(params["lat"]), float(params["lon"])
+            except (KeyError, ValueError):
+                return Response(
+                    {"error": "Either country or numeric lat and lon are required"},
+                    status=status.HTTP_400_BAD_REQUEST,
+                )
+            if not (-90 <= latitude <= 90 and -180 <= longitude <= 180):
+                return Response(
+                    {"error": "Coordinates are out of range"}, status=status.HTTP_400_BAD_REQUEST
+                )
+
+        nearby = [code for code, _ in get_grid().within(latitude, longitude, radius_km)]
+        top_names = (
+            list(PopularNamesSerializer.get_popular_names_for_countries(nearby, limit))
+            if nearby
+            else []
+        )
+        top_names = [name for name in top_names if name["total_requests"] > 0]
+        if not top_names:
+            return Response(
+                {"error": "No data found within this radius"}, status=status.HTTP_404_NOT_FOUND
+            )
+
+        return Response(PopularNamesSerializer(top_names, many=True).data)
+
+
+@neighbour_names_schema
+class NeighbourNamesView(APIView):
+    MAX_HOPS = 5
+
+    def get(self, request):
+        country_code = request.query_params.get("country", "").strip().upper()
+        if len(country_code) != 2:
+            return Response(
+                {"error": "Country code must be 2 characters long"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        try:
+            hops = int(request.query_params.get("hops", 1))
+            limit = int(request.query_params.get("limit", 5))
+        except ValueError:
+            hops = limit = -1
+        if not 0 <= hops <= self.MAX_HOPS or not 1 <= limit <= 100:
+            return Response(
+                {"error": f"hops must be in [0, {self.MAX_HOPS}], limit in [1, 100]"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        distances = neighbourhood(country_code, hops)
+        if distances is None:
+            return Response(
+                {"error": "No data found for this country"}, status=status.HTTP_404_NOT_FOUND
+            )
+
+        if settings.NAME_STORAGE == "compact":
+            top_names = list(
+                PopularNamesSerializer.get_popular_names_for_countries(list(distances), limit)
+            )
+        else:
+            lists = top_names_per_country(list(distances), max(limit, settings.BORDER_TOP_NAMES))
+            top_names = merge_top_lists(lists, limit)
+
+        top_names = [name for name in top_names if name["total_requests"] > 0]
+        if not top_names:
+            return Response(
+                {"error": "No data found for this country"}, status=status.HTTP_404_NOT_FOUND
+            )
+
+        return Response(PopularNamesSerializer(top_names, many=True).data)
+
+
+@trending_names_schema
+class TrendingNamesView(APIView):
+    def get(self, request):
+        country_code = request.query_params.get("country", "").strip().upper()
+        if len(country_code) != 2:
+            return Response(
+                {"error": "Country code must be 2 characters long"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        try:
+            limit = int(request.query_params.get("limit", 10))
+        except ValueError:
+            limit = 0
+        if not 1 <= limit <= 100:
+            return Response(
+                {"error": "Limit must be between 1 and 100"}, status=status.HTTP_400_BAD_REQUEST
+            )
+
+        return Response(TrendingNamesSerializer(trending_names(country_code, limit)).data)
+
+
+def metrics_view(request):
+    body, content_type = render_latest()
+    return HttpResponse(body, content_type=content_type)
+
+
+async def popular_names_stream(request):
+    """
+    Server-Sent Events with the top names of one or more countries, pushed
+    when their ranking changes. Only served by an ASGI server: a WSGI worker
+    would consume the endless stream synchronously and never be freed.
+    """
+    codes = [
+        code.strip().upper() for code in request.GET.get("country", "").split(",") if code.strip()
+    ]
+    if not codes:
+        return JsonResponse({"error": "Country parameter is required"}, status=400)
+    if any(len(code) != 2 for code in codes):
+        return JsonResponse({"error": "Country code must be 2 characters long"}, status=400)
+    codes = list(dict.fromkeys(codes))
+    if len(codes) > settings.POPULAR_STREAM_MAX_COUNTRIES:
+        return JsonResponse(
+            {"error": f"At most {settings.POPULAR_STREAM_MAX_COUNTRIES} countries per stream"},
+            status=400,
+        )
+    if not isinstance(request, ASGIRequest):
+        return JsonResponse({"error": "The stream is only served over ASGI"}, status=501)
+
+    response = StreamingHttpResponse(popular_names_events(codes), content_type="text/event-stream")
+    response["Cache-Control"] = "no-cache"
+    response["X-Accel-Buffering"] = "no"
+    return response
@@ -6,13 +6,17 @@ from dotenv import load_dotenv
 load_dotenv()
 
 
+def env_bool(name, default=False):
+    return os.getenv(name, str(default)).lower() in ("1", "true", "yes")
+
+
 BASE_DIR = Path(__file__).resolve().parent.parent
 
 # SECURITY WARNING: keep the secret key used in production secret!
 SECRET_KEY = os.getenv("SECRET_KEY")
 
 # SECURITY WARNING: don't run with debug turned on in production!
-DEBUG = os.getenv("DEBUG")
+DEBUG = env_bool("DEBUG")
 
 ALLOWED_HOSTS = os.getenv("ALLOWED_HOSTS").split(",")
 
@@ -32,6 +36,9 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    "api.middleware.MetricsMiddleware",
+    "api.profiling.ProfilingMiddleware",
+    "api.middleware.CompressionMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "whitenoise.middleware.WhiteNoiseMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
@@ -120,8 +127,18 @@ STATICFILES_STORAGE = "whitenoise.storage.CompressedManifestStaticFilesStorage"
 
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 
+# Throttles identify clients by REMOTE_ADDR. Behind NUM_PROXIES reverse proxies
+# the client is read from X-Forwarded-For instead, counting that many addresses
+# from the right, so addresses the client put in the header are ignored.
+
 REST_FRAMEWORK = {
+    "NUM_PROXIES": int(os.getenv("NUM_PROXIES", "0")),
     "DEFAULT_SCHEMA_CLASS": "drf_spectacular.openapi.AutoSchema",
+    "DEFAULT_RENDERER_CLASSES": [
+        "api.renderers.ORJSONRenderer",
+        "rest_framework.renderers.BrowsableAPIRenderer",
+        "api.renderers.MessagePackRenderer",
+    ],
 }
 
 SPECTACULAR_SETTINGS = {
@@ -141,3 +158,165 @@ SPECTACULAR_SETTINGS = {
     },
     "COMPONENT_SPLIT_REQUEST": True,
 }
+
+# Profiling
+# Requests are profiled when PROFILING_ENABLED is set and either carry a signed
+# X-Profile header (see `manage.py profile_token`) or are picked by sampling.
+
+PROFILING_ENABLED = env_bool("PROFILING_ENABLED")
+PROFILING_SAMPLE_RATE = float(os.getenv("PROFILING_SAMPLE_RATE", "0"))
+PROFILING_DIR = os.getenv("PROFILING_DIR", os.path.join(BASE_DIR, "profiles"))
+PROFILING_MAX_FILES = int(os.getenv("PROFILING_MAX_FILES", "100"))
+PROFILING_TOKEN_MAX_AGE = int(os.getenv("PROFILING_TOKEN_MAX_AGE", "3600"))
+
+# Retention of cold name probabilities (see `manage.py purge_cold_names`)
+
+NAME_RETENTION_DAYS = int(os.getenv("NAME_RETENTION_DAYS", "90"))
+NAME_RETENTION_MAX_REQUESTS = int(os.getenv("NAME_RETENTION_MAX_REQUESTS", "2"))
+
+# Storage layout of name predictions: "rows" keeps one NameCountryProbability per
+# predicted country, "compact" keeps the whole distribution in one NameDistribution.
+# Switch with `manage.py convert_name_storage`.
+
+NAME_STORAGE = os.getenv("NAME_STORAGE", "rows")
+
+# Local prediction source consulted before Nationalize (see `manage.py build_name_index`)
+
+NAME_INDEX_PATH = os.getenv("NAME_INDEX_PATH", "")
+
+# N-gram fallback model for names unknown to the index (see `manage.py train_name_model`).
+# Predictions below NGRAM_MIN_CONFIDENCE are still sent to Nationalize.
+
+NGRAM_MODEL_PATH = os.getenv("NGRAM_MODEL_PATH", "")
+NGRAM_MIN_CONFIDENCE = float(os.getenv("NGRAM_MIN_CONFIDENCE", "0.6"))
+
+# In-memory grid over capital coordinates for the nearby names endpoint. Other
+# workers pick up country changes after GEO_INDEX_TTL seconds.
+
+GEO_GRID_CELL_DEGREES = float(os.getenv("GEO_GRID_CELL_DEGREES", "5"))
+GEO_INDEX_TTL = int(os.getenv("GEO_INDEX_TTL", "300"))
+
+# In-memory border graph for the neighbour names endpoint, refreshed the same way.
+# BORDER_TOP_NAMES is the length of each per-country list that gets merged.
+
+BORDER_GRAPH_TTL = int(os.getenv("BORDER_GRAPH_TTL", "300"))
+BORDER_TOP_NAMES = int(os.getenv("BORDER_TOP_NAMES", "50"))
+
+# Time-windowed request counters (see `manage.py compact_request_buckets`). Hourly
+# buckets are kept for REQUEST_BUCKET_HOURLY_RETENTION hours, daily ones for
+# REQUEST_BUCKET_DAILY_RETENTION days, which bounds the longest window.
+
+REQUEST_BUCKET_HOURLY_RETENTION = int(os.getenv("REQUEST_BUCKET_HOURLY_RETENTION", "48"))
+REQUEST_BUCKET_DAILY_RETENTION = int(os.getenv("REQUEST_BUCKET_DAILY_RETENTION", "35"))
+
+# Approximate trending names. Every worker keeps TRENDING_CAPACITY counters per
+# country for the current TRENDING_WINDOW_SECONDS window and publishes them to
+# TRENDING_DIR at most every TRENDING_PUBLISH_SECONDS.
+
+TRENDING_DIR = os.getenv("TRENDING_DIR", "")
+TRENDING_CAPACITY = int(os.getenv("TRENDING_CAPACITY", "100"))
+TRENDING_WINDOW_SECONDS = int(os.getenv("TRENDING_WINDOW_SECONDS", "900"))
+TRENDING_PUBLISH_SECONDS = int(os.getenv("TRENDING_PUBLISH_SECONDS", "5"))
+
+# In-process thread pool for work taken off the request path. EAGER runs tasks
+# inline, which tests rely on.
+
+BACKGROUND_WORKERS = int(os.getenv("BACKGROUND_WORKERS", "4"))
+BACKGROUND_TASKS_EAGER = env_bool("BACKGROUND_TASKS_EAGER")
+
+# Most names the admin "Refresh selected names" action queues at once; larger
+# selections are refused so "select all" cannot flood the thread pool.
+
+ADMIN_REFRESH_MAX_NAMES = int(os.getenv("ADMIN_REFRESH_MAX_NAMES", "500"))
+
+# OpenAPI schema generated at build time (see Dockerfile). Served from memory
+# unless DEBUG is set.
+
+OPENAPI_SCHEMA_PATH = os.getenv("OPENAPI_SCHEMA_PATH", os.path.join(BASE_DIR, "openapi.json"))
+
+# Response compression. Bodies shorter than COMPRESSION_MIN_SIZE bytes are sent
+# as is; brotli is preferred over gzip when the client accepts both.
+
+COMPRESSION_MIN_SIZE = int(os.getenv("COMPRESSION_MIN_SIZE", "1024"))
+COMPRESSION_GZIP_LEVEL = int(os.getenv("COMPRESSION_GZIP_LEVEL", "6"))
+COMPRESSION_BROTLI_QUALITY = int(os.getenv("COMPRESSION_BROTLI_QUALITY", "5"))
+
+# Name lookups are counted apart from the freshness check. 0 writes every
+# lookup immediately; a positive interval (seconds) aggregates lookups in
+# memory and writes them in the background, so cache hits do no writes.
+
+ACCESS_FLUSH_INTERVAL = float(os.getenv("ACCESS_FLUSH_INTERVAL", "0"))
+
+# Freshness of stored predictions. With NAME_TTL_ADAPTIVE every refresh compares
+# the new distribution with the stored one: a total variation distance up to
+# NAME_TTL_STABLE_DRIFT multiplies the name's TTL by NAME_TTL_FACTOR, one of at
+# least NAME_TTL_UNSTABLE_DRIFT divides it, within the min/max bounds. Without
+# it every name is refetched after NAME_TTL_DEFAULT_HOURS.
+
+NAME_TTL_ADAPTIVE = env_bool("NAME_TTL_ADAPTIVE", True)
+NAME_TTL_DEFAULT_HOURS = float(os.getenv("NAME_TTL_DEFAULT_HOURS", "24"))
+NAME_TTL_MIN_HOURS = float(os.getenv("NAME_TTL_MIN_HOURS", "6"))
+NAME_TTL_MAX_HOURS = float(os.getenv("NAME_TTL_MAX_HOURS", "720"))
+NAME_TTL_FACTOR = float(os.getenv("NAME_TTL_FACTOR", "2"))
+NAME_TTL_STABLE_DRIFT = float(os.getenv("NAME_TTL_STABLE_DRIFT", "0.02"))
+NAME_TTL_UNSTABLE_DRIFT = float(os.getenv("NAME_TTL_UNSTABLE_DRIFT", "0.1"))
+
+# Seconds a name lookup may wait for countries missing from the database. When
+# it runs out, the response is returned with code-only country_details and an
+# X-Partial-Response header, and the countries are stored in the background.
+# 0 waits for every country.
+
+NAME_LATENCY_BUDGET = float(os.getenv("NAME_LATENCY_BUDGET", "0"))
+
+# Popular names event stream (/api/popular-names/stream/). Each process polls
+# the ranking of every watched country once per interval, whatever the number
+# of subscribers.
+
+POPULAR_STREAM_POLL_SECONDS = float(os.getenv("POPULAR_STREAM_POLL_SECONDS", "2"))
+POPULAR_STREAM_HEARTBEAT_SECONDS = float(os.getenv("POPULAR_STREAM_HEARTBEAT_SECONDS", "15"))
+POPULAR_STREAM_RETRY_MS = int(os.getenv("POPULAR_STREAM_RETRY_MS", "3000"))
+POPULAR_STREAM_MAX_COUNTRIES = int(os.getenv("POPULAR_STREAM_MAX_COUNTRIES", "50"))
+
+# On-disk cache of raw Nationalize/restcountries responses. Disabled when
+# UPSTREAM_CACHE_DIR is empty. Responses without cache headers are considered
+# fresh for UPSTREAM_CACHE_DEFAULT_TTL seconds; with the default of 0 they are
+# revalidated (or refetched) on every use, so name refreshes still see new
+# predictions, and the cache serves offline replay and upstream outages. With
+# UPSTREAM_CACHE_OFFLINE only cached responses are used, e.g. to rebuild tables
+# or run benchmarks without network access.
+
+UPSTREAM_CACHE_DIR = os.getenv("UPSTREAM_CACHE_DIR", "")
+UPSTREAM_CACHE_MAX_BYTES = int(os.getenv("UPSTREAM_CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
+UPSTREAM_CACHE_DEFAULT_TTL = int(os.getenv("UPSTREAM_CACHE_DEFAULT_TTL", "0"))
+UPSTREAM_CACHE_OFFLINE = env_bool("UPSTREAM_CACHE_OFFLINE")
+
+# Shared cache for counters every worker has to agree on (admission throttling).
+# Redis when REDIS_URL is set, otherwise each process counts on its own.
+
+REDIS_URL = os.getenv("REDIS_URL", "")
+if REDIS_URL:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": REDIS_URL,
+        }
+    }
+else:
+    CACHES = {"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
+
+# Admission control for the name and popular names endpoints. The service is
+# overloaded with more than ADMISSION_MAX_CONCURRENCY requests in flight across
+# all workers, or when a request waited more than ADMISSION_MAX_QUEUE_DELAY
+# seconds behind the proxy (X-Request-Start). Overloaded name lookups skip
+# upstream calls: stale predictions are served, unknown names get a 503 with
+# Retry-After. Past ADMISSION_RATE requests per ADMISSION_WINDOW_SECONDS across
+# all workers, every client is limited to an equal share of the rate. 0
+# disables a limit. In-flight counters are kept per slot of
+# ADMISSION_IN_FLIGHT_SLOT_SECONDS, which must exceed the worker timeout.
+
+ADMISSION_MAX_CONCURRENCY = int(os.getenv("ADMISSION_MAX_CONCURRENCY", "0"))
+ADMISSION_IN_FLIGHT_SLOT_SECONDS = int(os.getenv("ADMISSION_IN_FLIGHT_SLOT_SECONDS", "60"))
+ADMISSION_MAX_QUEUE_DELAY = float(os.getenv("ADMISSION_MAX_QUEUE_DELAY", "0"))
+ADMISSION_RATE = int(os.getenv("ADMISSION_RATE", "0"))
+ADMISSION_WINDOW_SECONDS = int(os.getenv("ADMISSION_WINDOW_SECONDS", "1"))
+ADMISSION_RETRY_AFTER = int(os.getenv("ADMISSION_RETRY_AFTER", "1"))
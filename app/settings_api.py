@@ -0,0 +1,52 @@
+"""API-only settings profile.
+
+Serves the ``/api/`` endpoints without the admin, sessions, auth, messages,
+static files and the OpenAPI documentation, so workers import less at startup
+and every request runs through a shorter middleware and DRF stack. Use it for
+the public API workers, e.g.::
+
+    DJANGO_SETTINGS_MODULE=app.settings_api gunicorn app.wsgi:application
+
+Management commands, migrations, the admin and the documentation still need
+``app.settings``.
+"""
+
+from .settings import *  # noqa: F401,F403
+from .settings import PROFILING_ENABLED, REST_FRAMEWORK
+
+INSTALLED_APPS = [
+    "rest_framework",
+    "api",
+]
+
+MIDDLEWARE = [
+    "api.middleware.MetricsMiddleware",
+    "api.middleware.CompressionMiddleware",
+    "django.middleware.security.SecurityMiddleware",
+    # APPEND_SLASH: /api/names?name=x redirects to /api/names/ as with app.settings.
+    "django.middleware.common.CommonMiddleware",
+]
+if PROFILING_ENABLED:
+    MIDDLEWARE.insert(1, "api.profiling.ProfilingMiddleware")
+
+ROOT_URLCONF = "app.urls_api"
+
+TEMPLATES = []
+
+AUTH_PASSWORD_VALIDATORS = []
+
+# Every endpoint is public and read-only: no authentication, permission checks
+# or browsable API, and request.user stays None instead of importing
+# django.contrib.auth for AnonymousUser.
+REST_FRAMEWORK = {
+    **REST_FRAMEWORK,
+    "DEFAULT_SCHEMA_CLASS": "rest_framework.schemas.openapi.AutoSchema",
+    "DEFAULT_RENDERER_CLASSES": [
+        "api.renderers.ORJSONRenderer",
+        "api.renderers.MessagePackRenderer",
+    ],
+    "DEFAULT_PARSER_CLASSES": ["rest_framework.parsers.JSONParser"],
+    "DEFAULT_AUTHENTICATION_CLASSES": [],
+    "DEFAULT_PERMISSION_CLASSES": [],
+    "UNAUTHENTICATED_USER": None,
+}
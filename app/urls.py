@@ -1,11 +1,13 @@
 from django.contrib import admin
 from django.urls import include, path
-from drf_spectacular.views import SpectacularAPIView, SpectacularRedocView, SpectacularSwaggerView
+from drf_spectacular.views import SpectacularRedocView, SpectacularSwaggerView
+
+from api.openapi import CachedSchemaView
 
 urlpatterns = [
     path("admin/", admin.site.urls),
     path("api/", include("api.urls")),
-    path("api/documentation/", SpectacularAPIView.as_view(), name="schema"),
+    path("api/documentation/", CachedSchemaView.as_view(), name="schema"),
     path(
         "api/documentation/swagger-ui/",
         SpectacularSwaggerView.as_view(url_name="schema"),
@@ -0,0 +1,28 @@
+import os
+import shutil
+
+bind = "0.0.0.0:8000"
+
+# Threaded workers: under load, requests wait inside the workers where the
+# admission controller counts them against ADMISSION_MAX_CONCURRENCY, instead
+# of in the listen backlog where nothing sees them. The timeout has to stay
+# below ADMISSION_IN_FLIGHT_SLOT_SECONDS.
+worker_class = "gthread"
+workers = int(os.environ.get("GUNICORN_WORKERS", "4"))
+threads = int(os.environ.get("GUNICORN_THREADS", "8"))
+timeout = 30
+
+
+def on_starting(server):
+    # Samples left over from a previous run would be merged into the new one.
+    path = os.environ.get("PROMETHEUS_MULTIPROC_DIR")
+    if path:
+        shutil.rmtree(path, ignore_errors=True)
+        os.makedirs(path, exist_ok=True)
+
+
+def child_exit(server, worker):
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        from prometheus_client import multiprocess
+
+        multiprocess.mark_process_dead(worker.pid)
@@ -0,0 +1,109 @@
+from datetime import timedelta
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from api.access import AccessRecorder
+from api.models import Country, NameCountryProbability, NameRequestBucket
+from api.serializers import NameCountryProbabilitySerializer
+
+
+@pytest.fixture
+def country():
+    return Country.objects.create(
+        code="FR",
+        name="France",
+        official_name="French Republic",
+        region="Europe",
+        subregion="Western Europe",
+    )
+
+
+@pytest.fixture
+def probability(country):
+    fetched_at = timezone.now() - timedelta(hours=1)
+    return NameCountryProbability.objects.create(
+        name="Jean",
+        country=country,
+        probability=0.9,
+        count_of_requests=5,
+        last_accessed=fetched_at,
+        fetched_at=fetched_at,
+    )
+
+
+@pytest.fixture
+def recorder(mocker):
+    recorder = AccessRecorder()
+    mocker.patch("api.access.recorder", recorder)
+    return recorder
+
+
+def writes(queries):
+    return [
+        query["sql"]
+        for query in queries.captured_queries
+        if query["sql"].split()[0] in ("INSERT", "UPDATE", "DELETE")
+    ]
+
+
+@pytest.mark.django_db
+class TestAccessRecorder:
+    def test_write_through_by_default(self, probability, recorder):
+        results = NameCountryProbabilitySerializer.get_or_fetch_probabilities("Jean")
+
+        probability.refresh_from_db()
+        assert results[0].count_of_requests == 6
+        assert probability.count_of_requests == 6
+        assert NameRequestBucket.objects.get(name="Jean").count == 1
+
+    def test_hits_do_not_move_fetched_at(self, probability, recorder):
+        fetched_at = probability.fetched_at
+
+        NameCountryProbabilitySerializer.get_or_fetch_probabilities("Jean")
+
+        probability.refresh_from_db()
+        assert probability.fetched_at == fetched_at
+        assert probability.last_accessed > fetched_at
+
+    def test_batched_hits_do_not_write(self, probability, recorder, settings):
+        settings.ACCESS_FLUSH_INTERVAL = 3600
+
+        with CaptureQueriesContext(connection) as queries:
+            for _ in range(3):
+                results = NameCountryProbabilitySerializer.get_or_fetch_probabilities("Jean")
+
+        assert writes(queries) == []
+        assert results[0].count_of_requests == 6
+
+        recorder.flush()
+
+        probability.refresh_from_db()
+        assert probability.count_of_requests == 8
+        assert NameRequestBucket.objects.get(name="Jean").count == 3
+
+    def test_batch_written_once_interval_elapsed(self, probability, recorder, settings):
+        settings.ACCESS_FLUSH_INTERVAL = 3600
+        settings.BACKGROUND_TASKS_EAGER = True
+
+        NameCountryProbabilitySerializer.get_or_fetch_probabilities("Jean")
+        recorder._last_flush -= 3600
+        NameCountryProbabilitySerializer.get_or_fetch_probabilities("Jean")
+
+        probability.refresh_from_db()
+        assert probability.count_of_requests == 7
+        assert recorder._pending == {}
+
+    def test_batch_stamped_at_flush(self, probability, recorder, settings):
+        settings.ACCESS_FLUSH_INTERVAL = 3600
+        NameCountryProbabilitySerializer.get_or_fetch_probabilities("Jean")
+        # An incremental rollup starting here must see the flushed lookup.
+        checkpoint = timezone.now()
+
+        recorder.flush()
+
+        probability.refresh_from_db()
+        assert probability.last_accessed >= checkpoint
+        assert NameRequestBucket.objects.get(name="Jean").count == 1
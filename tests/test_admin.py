@@ -0,0 +1,141 @@
+import pytest
+import responses
+from django.contrib.admin.sites import site
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from api.admin import EstimatedCountPaginator
+from api.models import Country, NameCountryProbability
+
+
+@pytest.fixture
+def countries():
+    return [
+        Country.objects.create(
+            code=code,
+            name=name,
+            official_name=name,
+            region="Europe",
+            subregion="Western Europe",
+        )
+        for code, name in [("FR", "France"), ("DE", "Germany"), ("PL", "Poland")]
+    ]
+
+
+def create_rows(countries, count, prefix="Name"):
+    NameCountryProbability.objects.bulk_create(
+        NameCountryProbability(
+            name=f"{prefix}{i}",
+            country=countries[i % len(countries)],
+            probability=0.5,
+            count_of_requests=1,
+            last_accessed=timezone.now(),
+        )
+        for i in range(count)
+    )
+
+
+def changelist_queries(client):
+    url = reverse("admin:api_namecountryprobability_changelist")
+    with CaptureQueriesContext(connection) as ctx:
+        response = client.get(url)
+    assert response.status_code == 200
+    return len(ctx.captured_queries)
+
+
+@pytest.mark.django_db
+class TestNameCountryProbabilityAdmin:
+    def test_changelist_queries_do_not_grow_with_rows(self, admin_client, countries):
+        create_rows(countries, 3)
+        few = changelist_queries(admin_client)
+
+        create_rows(countries, 60, prefix="More")
+        many = changelist_queries(admin_client)
+
+        assert many == few
+
+    def test_prefix_search(self, admin_client, countries):
+        create_rows(countries, 3, prefix="Anna")
+        create_rows(countries, 2, prefix="Hanna")
+
+        url = reverse("admin:api_namecountryprobability_changelist")
+        response = admin_client.get(url, {"q": "ann"})
+
+        names = {row.name for row in response.context["cl"].result_list}
+        assert names == {"Anna0", "Anna1", "Anna2"}
+
+    @responses.activate
+    def test_refresh_action(self, admin_client, countries, settings):
+        settings.BACKGROUND_TASKS_EAGER = True
+        old = NameCountryProbability.objects.create(
+            name="Louis",
+            country=countries[0],
+            probability=0.8,
+            count_of_requests=7,
+            last_accessed=timezone.now(),
+        )
+        responses.add(
+            responses.GET,
+            "https://api.nationalize.io/?name=Louis",
+            json={"name": "Louis", "country": [{"country_id": "FR", "probability": 0.85}]},
+            status=200,
+        )
+
+        url = reverse("admin:api_namecountryprobability_changelist")
+        response = admin_client.post(
+            url, {"action": "refresh_names", "_selected_action": [old.pk]}, follow=True
+        )
+
+        assert response.status_code == 200
+        rows = list(NameCountryProbability.objects.filter(name="Louis"))
+        assert [(row.country.code, row.probability) for row in rows] == [("FR", 0.85)]
+        # An admin refresh is not a user request.
+        assert rows[0].count_of_requests == 7
+
+    def test_refresh_action_refuses_large_selection(
+        self, admin_client, countries, settings, mocker
+    ):
+        settings.ADMIN_REFRESH_MAX_NAMES = 2
+        create_rows(countries, 3)
+        submit = mocker.patch("api.admin.background.submit")
+
+        url = reverse("admin:api_namecountryprobability_changelist")
+        pks = NameCountryProbability.objects.values_list("pk", flat=True)
+        response = admin_client.post(
+            url, {"action": "refresh_names", "_selected_action": list(pks)}, follow=True
+        )
+
+        assert [str(m) for m in response.context["messages"]] == [
+            "Select at most 2 names to refresh; nothing was queued"
+        ]
+        submit.assert_not_called()
+
+    def test_country_autocomplete(self, admin_client, countries):
+        response = admin_client.get(
+            reverse("admin:autocomplete"),
+            {
+                "term": "fra",
+                "app_label": "api",
+                "model_name": "namecountryprobability",
+                "field_name": "country",
+            },
+        )
+
+        assert response.status_code == 200
+        assert [item["text"] for item in response.json()["results"]] == ["FR - France"]
+
+
+@pytest.mark.django_db
+class TestEstimatedCountPaginator:
+    def test_exact_count_outside_postgres(self, countries):
+        create_rows(countries, 5)
+        paginator = EstimatedCountPaginator(NameCountryProbability.objects.order_by("id"), 2)
+
+        assert paginator.count == 5
+        assert paginator.num_pages == 3
+
+    def test_registered_on_admin(self):
+        model_admin = site._registry[NameCountryProbability]
+        assert model_admin.paginator is EstimatedCountPaginator
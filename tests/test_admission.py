@@ -0,0 +1,198 @@
+import time
+from datetime import timedelta
+
+import pytest
+import responses
+from django.core.cache import cache
+from django.test import Client
+from django.utils import timezone
+
+from api.admission import AdmissionController, controller, queue_delay
+from api.models import Country, NameCountryProbability, NameDistribution
+
+
+@pytest.fixture(autouse=True)
+def clear_counters():
+    cache.clear()
+    yield
+    cache.clear()
+
+
+@pytest.fixture
+def country():
+    return Country.objects.create(
+        code="FR", name="France", official_name="French Republic", region="Europe"
+    )
+
+
+@pytest.fixture
+def overloaded(settings):
+    settings.ADMISSION_MAX_QUEUE_DELAY = 1
+    return {"HTTP_X_REQUEST_START": f"t={time.time() - 5:.3f}"}
+
+
+def store(name, country, age):
+    return NameCountryProbability.objects.create(
+        name=name,
+        country=country,
+        probability=0.9,
+        count_of_requests=1,
+        fetched_at=timezone.now() - age,
+    )
+
+
+class TestQueueDelay:
+    @pytest.mark.parametrize("header", ["t=1700000000.250", "1700000000250", "t=1700000000250000"])
+    def test_units(self, rf, header):
+        request = rf.get("/", HTTP_X_REQUEST_START=header)
+        assert queue_delay(request, now=1700000001.0) == pytest.approx(0.75)
+
+    @pytest.mark.parametrize("header", [None, "", "t=", "garbage", "t=0"])
+    def test_missing_or_invalid(self, rf, header):
+        extra = {} if header is None else {"HTTP_X_REQUEST_START": header}
+        assert queue_delay(rf.get("/", **extra)) is None
+
+    def test_clock_skew_is_not_negative(self, rf):
+        request = rf.get("/", HTTP_X_REQUEST_START="t=1700000002")
+        assert queue_delay(request, now=1700000001.0) == 0
+
+
+class TestController:
+    def test_concurrency_limit_across_workers(self, rf, settings):
+        settings.ADMISSION_MAX_CONCURRENCY = 1
+        # Each worker process has its own controller; they share the cache.
+        worker, other_worker = AdmissionController(), AdmissionController()
+        request = rf.get("/")
+
+        with worker.admit(request) as first:
+            with other_worker.admit(request) as second:
+                assert worker.in_flight() == 2
+        assert (first, second) == (False, True)
+        assert worker.in_flight() == 0
+
+    def test_requests_from_previous_slot_still_count(self, rf, settings, mocker):
+        settings.ADMISSION_MAX_CONCURRENCY = 1
+        settings.ADMISSION_IN_FLIGHT_SLOT_SECONDS = 60
+        clock = mocker.patch("api.admission.time.time", return_value=6000.0)
+
+        with controller.admit(rf.get("/")):
+            clock.return_value = 6061.0
+            with controller.admit(rf.get("/")) as overloaded:
+                assert overloaded
+        assert controller.in_flight() == 0
+
+    def test_cache_outage_admits(self, rf, settings, mocker):
+        settings.ADMISSION_MAX_CONCURRENCY = 1
+        mocker.patch.object(cache, "add", side_effect=ConnectionError("cache down"))
+        mocker.patch.object(cache, "decr", side_effect=ConnectionError("cache down"))
+
+        with controller.admit(rf.get("/")) as first:
+            with controller.admit(rf.get("/")) as second:
+                assert not first and not second
+
+    def test_queue_delay_limit(self, rf, settings):
+        settings.ADMISSION_MAX_QUEUE_DELAY = 1
+
+        late = rf.get("/", HTTP_X_REQUEST_START=f"t={time.time() - 2}")
+        with controller.admit(late) as overloaded:
+            assert overloaded
+        with controller.admit(rf.get("/")) as overloaded:
+            assert not overloaded
+
+
+@pytest.mark.django_db
+class TestLoadShedding:
+    @responses.activate
+    def test_stale_name_is_served_without_upstream(self, country, overloaded):
+        store("Jean", country, timedelta(days=3))
+
+        response = Client().get("/api/names/?name=Jean", **overloaded)
+
+        assert response.status_code == 200
+        assert response["X-Stale-Response"] == "overload"
+        assert response.json()[0]["country_details"]["code"] == "FR"
+        assert len(responses.calls) == 0
+
+    @responses.activate
+    def test_stale_compact_name_is_served_without_upstream(self, country, overloaded, settings):
+        settings.NAME_STORAGE = "compact"
+        NameDistribution.objects.create(
+            name="Jean", countries={"FR": 0.9}, fetched_at=timezone.now() - timedelta(days=3)
+        )
+
+        response = Client().get("/api/names/?name=Jean", **overloaded)
+
+        assert response.status_code == 200
+        assert response["X-Stale-Response"] == "overload"
+        assert len(responses.calls) == 0
+
+    @responses.activate
+    def test_unknown_name_is_rejected(self, overloaded, settings):
+        settings.ADMISSION_RETRY_AFTER = 3
+
+        response = Client().get("/api/names/?name=Jean", **overloaded)
+
+        assert response.status_code == 503
+        assert response["Retry-After"] == "3"
+        assert len(responses.calls) == 0
+
+    def test_fresh_name_is_served_as_usual(self, country, overloaded):
+        store("Jean", country, timedelta(0))
+
+        response = Client().get("/api/names/?name=Jean", **overloaded)
+
+        assert response.status_code == 200
+        assert "X-Stale-Response" not in response
+        assert NameCountryProbability.objects.get(name="Jean").count_of_requests == 2
+
+
+@pytest.mark.django_db
+class TestFairShare:
+    @pytest.fixture(autouse=True)
+    def rate(self, settings):
+        settings.ADMISSION_RATE = 4
+        settings.ADMISSION_WINDOW_SECONDS = 60
+
+    def get(self, address, **extra):
+        return Client().get("/api/popular-names/?country=FR", REMOTE_ADDR=address, **extra)
+
+    def test_busy_client_does_not_starve_others(self):
+        busy = [self.get("10.0.0.1").status_code for _ in range(5)]
+        assert busy == [404, 404, 404, 404, 429]
+
+        # Two clients now share the rate of 4.
+        other = [self.get("10.0.0.2").status_code for _ in range(3)]
+        assert other == [404, 404, 429]
+
+        throttled = self.get("10.0.0.1")
+        assert throttled.status_code == 429
+        assert throttled.json() == {"error": "Too many requests, retry later"}
+        assert 0 < int(throttled["Retry-After"]) <= 60
+
+    def test_forwarded_for_is_not_trusted_by_default(self):
+        statuses = [
+            self.get("10.0.0.1", HTTP_X_FORWARDED_FOR=f"192.0.2.{i}").status_code for i in range(5)
+        ]
+        assert statuses[-1] == 429
+
+    def test_client_behind_proxy(self, settings):
+        settings.REST_FRAMEWORK = {**settings.REST_FRAMEWORK, "NUM_PROXIES": 1}
+        statuses = [
+            self.get("10.0.0.1", HTTP_X_FORWARDED_FOR=f"192.0.2.{i}, 198.51.100.7").status_code
+            for i in range(5)
+        ]
+        # Only the address added by the proxy counts.
+        assert statuses[-1] == 429
+
+    def test_cache_outage_fails_open(self, mocker):
+        mocker.patch.object(cache, "add", side_effect=ConnectionError("cache down"))
+
+        assert all(self.get("10.0.0.1").status_code == 404 for _ in range(10))
+
+    def test_no_throttling_within_rate(self):
+        statuses = [self.get(f"10.0.0.{i}").status_code for i in range(4)]
+        assert 429 not in statuses
+
+    def test_disabled(self, settings):
+        settings.ADMISSION_RATE = 0
+        assert all(self.get("10.0.0.1").status_code == 404 for _ in range(10))
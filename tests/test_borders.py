@@ -0,0 +1,99 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from api.borders import merge_top_lists, neighbourhood
+from api.models import Country, NameCountryProbability
+
+
+@pytest.fixture
+def countries():
+    # FR - DE - PL - UA, plus an island
+    created = {
+        code: Country.objects.create(
+            code=code, name=code, official_name=code, region="Europe", subregion="Europe"
+        )
+        for code in ["FR", "DE", "PL", "UA", "IS"]
+    }
+    created["FR"].borders.add(created["DE"])
+    created["DE"].borders.add(created["PL"])
+    created["PL"].borders.add(created["UA"])
+    return created
+
+
+def request_counts(country, counts):
+    for name, count in counts.items():
+        NameCountryProbability.objects.create(
+            name=name,
+            country=country,
+            probability=0.5,
+            count_of_requests=count,
+            last_accessed=timezone.now(),
+        )
+
+
+@pytest.mark.django_db
+class TestNeighbourhood:
+    def test_hops(self, countries):
+        assert neighbourhood("DE", 0) == {"DE": 0}
+        assert neighbourhood("DE", 1) == {"DE": 0, "FR": 1, "PL": 1}
+        assert neighbourhood("FR", 3) == {"FR": 0, "DE": 1, "PL": 2, "UA": 3}
+        assert neighbourhood("IS", 2) == {"IS": 0}
+        assert neighbourhood("XX", 1) is None
+
+    def test_border_change_refreshes_graph(self, countries):
+        assert "IS" not in neighbourhood("FR", 1)
+
+        countries["FR"].borders.add(countries["IS"])
+
+        assert neighbourhood("FR", 1)["IS"] == 1
+        assert neighbourhood("IS", 1)["FR"] == 1
+
+    def test_graph_is_not_queried_again(self, countries):
+        neighbourhood("FR", 2)
+
+        with CaptureQueriesContext(connection) as queries:
+            neighbourhood("UA", 3)
+
+        assert len(queries) == 0
+
+
+def test_merge_top_lists():
+    lists = {"DE": [("Anna", 5), ("Max", 3)], "PL": [("Anna", 2), ("Jan", 4)]}
+
+    assert merge_top_lists(lists, 2) == [
+        {"name": "Anna", "total_requests": 7},
+        {"name": "Jan", "total_requests": 4},
+    ]
+
+
+@pytest.mark.django_db
+class TestNeighbourNamesView:
+    def test_merges_neighbours(self, client, countries):
+        request_counts(countries["DE"], {"Max": 5, "Anna": 2})
+        request_counts(countries["PL"], {"Anna": 4, "Jan": 3})
+        request_counts(countries["UA"], {"Olena": 50})
+
+        response = client.get(reverse("popular-names-neighbours"), {"country": "DE", "hops": 1})
+
+        assert response.status_code == 200
+        assert response.json() == [
+            {"name": "Anna", "total_requests": 6},
+            {"name": "Max", "total_requests": 5},
+            {"name": "Jan", "total_requests": 3},
+        ]
+
+    def test_two_hops_reaches_further(self, client, countries):
+        request_counts(countries["UA"], {"Olena": 50})
+
+        response = client.get(reverse("popular-names-neighbours"), {"country": "DE", "hops": 2})
+
+        assert response.json()[0]["name"] == "Olena"
+
+    def test_validation(self, client, countries):
+        url = reverse("popular-names-neighbours")
+        assert client.get(url, {"country": "DEU"}).status_code == 400
+        assert client.get(url, {"country": "DE", "hops": 9}).status_code == 400
+        assert client.get(url, {"country": "XX"}).status_code == 404
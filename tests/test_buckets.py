@@ -0,0 +1,101 @@
+from datetime import timedelta
+
+import pytest
+from django.urls import reverse
+from django.utils import timezone
+
+from api.buckets import compact_buckets, record_requests
+from api.models import Country, NameCountryProbability, NameRequestBucket
+from api.serializers import NameCountryProbabilitySerializer
+
+
+@pytest.fixture
+def country():
+    return Country.objects.create(
+        code="NO",
+        name="Norway",
+        official_name="Kingdom of Norway",
+        region="Europe",
+        subregion="Northern Europe",
+    )
+
+
+def bucket(name, country, start, count, granularity=NameRequestBucket.HOUR):
+    return NameRequestBucket.objects.create(
+        name=name, country=country, granularity=granularity, bucket_start=start, count=count
+    )
+
+
+@pytest.mark.django_db
+class TestRecordRequests:
+    def test_increments_current_hour(self, country):
+        record_requests("Ola", ["NO"])
+        record_requests("Ola", ["NO"])
+
+        only = NameRequestBucket.objects.get()
+        assert only.count == 2
+        assert only.granularity == NameRequestBucket.HOUR
+        assert only.bucket_start.minute == 0
+
+    def test_hit_is_recorded(self, country):
+        NameCountryProbability.objects.create(
+            name="Kari", country=country, probability=0.8, last_accessed=timezone.now()
+        )
+
+        NameCountryProbabilitySerializer.get_or_fetch_probabilities("Kari")
+
+        assert NameRequestBucket.objects.get(name="Kari").count == 1
+
+
+@pytest.mark.django_db
+class TestCompactBuckets:
+    def test_folds_old_hours_into_days(self, country):
+        now = timezone.now()
+        old_day = (now - timedelta(days=5)).replace(hour=0, minute=0, second=0, microsecond=0)
+        bucket("Ola", country, old_day + timedelta(hours=3), 2)
+        bucket("Ola", country, old_day + timedelta(hours=7), 5)
+        bucket("Ola", country, old_day, 1, granularity=NameRequestBucket.DAY)
+        recent = bucket("Ola", country, now.replace(minute=0, second=0, microsecond=0), 4)
+
+        folded, _ = compact_buckets(batch_size=1, now=now)
+
+        assert folded == 2
+        daily = NameRequestBucket.objects.get(granularity=NameRequestBucket.DAY)
+        assert daily.count == 8
+        assert list(NameRequestBucket.objects.filter(granularity=NameRequestBucket.HOUR)) == [
+            recent
+        ]
+
+    def test_drops_expired_days(self, country, settings):
+        settings.REQUEST_BUCKET_DAILY_RETENTION = 35
+        bucket("Ola", country, timezone.now() - timedelta(days=40), 3, NameRequestBucket.DAY)
+
+        _, expired = compact_buckets()
+
+        assert expired == 1
+        assert not NameRequestBucket.objects.exists()
+
+
+@pytest.mark.django_db
+class TestPopularNamesWindow:
+    def test_window_only_counts_recent_buckets(self, client, country):
+        now = timezone.now()
+        NameCountryProbability.objects.create(
+            name="Old", country=country, probability=0.5, count_of_requests=100
+        )
+        bucket("Old", country, now - timedelta(days=3), 100, NameRequestBucket.DAY)
+        bucket("Fresh", country, now - timedelta(hours=2), 3)
+        bucket("Fresh", country, now - timedelta(hours=1), 4)
+
+        day = client.get(reverse("popular-names"), {"country": "NO", "window": "24h"})
+        week = client.get(reverse("popular-names"), {"country": "NO", "window": "7d"})
+        lifetime = client.get(reverse("popular-names"), {"country": "NO"})
+
+        assert day.json() == [{"name": "Fresh", "total_requests": 7}]
+        assert week.json()[0] == {"name": "Old", "total_requests": 100}
+        assert lifetime.json() == [{"name": "Old", "total_requests": 100}]
+
+    def test_invalid_window(self, client, country):
+        response = client.get(reverse("popular-names"), {"country": "NO", "window": "1y"})
+
+        assert response.status_code == 400
@@ -0,0 +1,98 @@
+import pytest
+import responses
+from django.core.management import call_command
+from django.utils import timezone
+
+from api.models import Country, NameCountryProbability, NameDistribution
+from api.serializers import NameCountryProbabilitySerializer, PopularNamesSerializer
+
+
+@pytest.fixture
+def compact(settings):
+    settings.NAME_STORAGE = "compact"
+
+
+@pytest.fixture
+def countries():
+    return [
+        Country.objects.create(
+            code=code, name=name, official_name=name, region="Europe", subregion="Europe"
+        )
+        for code, name in [("IT", "Italy"), ("ES", "Spain")]
+    ]
+
+
+@pytest.mark.django_db
+class TestCompactStorage:
+    def test_hit_is_one_read_and_one_update(self, compact, countries, django_assert_num_queries):
+        NameDistribution.objects.create(
+            name="Marco",
+            countries={"IT": 0.8, "ES": 0.1},
+            count_of_requests=1,
+            last_accessed=timezone.now(),
+        )
+
+        # distribution read, counter update, country lookup and the two statements
+        # of the hourly request bucket
+        with django_assert_num_queries(5):
+            results = NameCountryProbabilitySerializer.get_or_fetch_probabilities("Marco")
+
+        assert [(r.country.code, r.probability) for r in results] == [("IT", 0.8), ("ES", 0.1)]
+        assert NameDistribution.objects.get(name="Marco").count_of_requests == 2
+
+    @responses.activate
+    def test_miss_stores_single_row(self, compact, countries):
+        responses.add(
+            responses.GET,
+            "https://api.nationalize.io/?name=Lucia",
+            json={
+                "name": "Lucia",
+                "country": [
+                    {"country_id": "ES", "probability": 0.5},
+                    {"country_id": "IT", "probability": 0.3},
+                ],
+            },
+        )
+
+        results = NameCountryProbabilitySerializer.get_or_fetch_probabilities("Lucia")
+
+        assert len(results) == 2
+        assert NameDistribution.objects.get(name="Lucia").countries == {"ES": 0.5, "IT": 0.3}
+        assert not NameCountryProbability.objects.exists()
+
+    def test_popular_names(self, compact, countries):
+        for name, count in [("Marco", 5), ("Lucia", 9)]:
+            NameDistribution.objects.create(
+                name=name, countries={"IT": 0.5}, count_of_requests=count
+            )
+        NameDistribution.objects.create(name="Pablo", countries={"ES": 0.9}, count_of_requests=20)
+
+        results = list(PopularNamesSerializer.get_popular_names("IT"))
+
+        assert results == [
+            {"name": "Lucia", "total_requests": 9},
+            {"name": "Marco", "total_requests": 5},
+        ]
+
+    def test_convert_round_trip(self, countries):
+        italy, spain = countries
+        now = timezone.now()
+        for country, probability in [(italy, 0.7), (spain, 0.2)]:
+            NameCountryProbability.objects.create(
+                name="Sofia",
+                country=country,
+                probability=probability,
+                count_of_requests=4,
+                last_accessed=now,
+            )
+
+        call_command("convert_name_storage", to="compact")
+
+        distribution = NameDistribution.objects.get(name="Sofia")
+        assert distribution.countries == {"IT": 0.7, "ES": 0.2}
+        assert distribution.count_of_requests == 4
+
+        NameCountryProbability.objects.all().delete()
+        call_command("convert_name_storage", to="rows")
+
+        assert NameCountryProbability.objects.filter(name="Sofia").count() == 2
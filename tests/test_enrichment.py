@@ -0,0 +1,179 @@
+from concurrent.futures import Future
+from datetime import timedelta
+
+import pytest
+import responses
+from django.urls import reverse
+from django.utils import timezone
+
+from api import background, enrichment
+from api.models import Country, NameCountryProbability, NameDistribution
+
+RESTCOUNTRIES_FR = [
+    {
+        "name": {"common": "France", "official": "French Republic"},
+        "region": "Europe",
+        "subregion": "Western Europe",
+        "capital": ["Paris"],
+        "capitalInfo": {"latlng": [48.8566, 2.3522]},
+        "independent": True,
+        "maps": {},
+        "flags": {},
+        "coatOfArms": {},
+    }
+]
+
+
+class DeferredTasks:
+    """Stands in for the background pool; tasks run only when drained."""
+
+    def __init__(self):
+        self.queue = []
+
+    def submit(self, fn, *args, **kwargs):
+        future = Future()
+        self.queue.append((fn, args, kwargs, future))
+        return future
+
+    def drain(self):
+        while self.queue:
+            fn, args, kwargs, future = self.queue.pop(0)
+            try:
+                future.set_result(fn(*args, **kwargs))
+            except Exception as e:
+                future.set_exception(e)
+
+
+@pytest.fixture
+def tasks(mocker, settings):
+    settings.NAME_LATENCY_BUDGET = 0.01
+    tasks = DeferredTasks()
+    mocker.patch.object(background, "submit", tasks.submit)
+    return tasks
+
+
+def mock_nationalize(name, country_id="FR"):
+    responses.add(
+        responses.GET,
+        f"https://api.nationalize.io/?name={name}",
+        json={"name": name, "country": [{"country_id": country_id, "probability": 0.8}]},
+        status=200,
+    )
+
+
+@pytest.mark.django_db
+class TestLatencyBudget:
+    @responses.activate
+    def test_partial_response_then_complete(self, client, tasks):
+        mock_nationalize("Jean")
+        responses.add(
+            responses.GET,
+            "https://restcountries.com/v3.1/alpha/FR",
+            json=RESTCOUNTRIES_FR,
+            status=200,
+        )
+        url = reverse("name-probability")
+
+        response = client.get(url, {"name": "Jean"})
+
+        assert response.status_code == 200
+        assert response["X-Partial-Response"] == "country_details"
+        assert response.json()[0]["probability"] == 0.8
+        assert response.json()[0]["country_details"] == {"code": "FR"}
+        assert not NameCountryProbability.objects.exists()
+
+        tasks.drain()
+
+        stored = NameCountryProbability.objects.get(name="Jean")
+        assert stored.country.name == "France"
+        assert stored.count_of_requests == 1
+
+        response = client.get(url, {"name": "Jean"})
+        assert not response.has_header("X-Partial-Response")
+        assert response.json()[0]["country_details"]["name"] == "France"
+        assert response.json()[0]["count_of_requests"] == 2
+
+    @pytest.mark.parametrize("storage", ["rows", "compact"])
+    @responses.activate
+    def test_partial_refresh_keeps_stored_counters(self, client, tasks, settings, storage):
+        settings.NAME_STORAGE = storage
+        france = Country.objects.create(
+            code="FR", name="France", official_name="French Republic", region="Europe"
+        )
+        fetched_at = timezone.now() - timedelta(days=3)
+        if storage == "compact":
+            NameDistribution.objects.create(
+                name="Jean", countries={"FR": 0.9}, count_of_requests=5, fetched_at=fetched_at
+            )
+        else:
+            NameCountryProbability.objects.create(
+                name="Jean",
+                country=france,
+                probability=0.9,
+                count_of_requests=5,
+                fetched_at=fetched_at,
+            )
+        responses.add(
+            responses.GET,
+            "https://api.nationalize.io/?name=Jean",
+            json={
+                "name": "Jean",
+                "country": [
+                    {"country_id": "FR", "probability": 0.6},
+                    {"country_id": "BE", "probability": 0.3},
+                ],
+            },
+            status=200,
+        )
+
+        response = client.get(reverse("name-probability"), {"name": "Jean"})
+
+        assert response["X-Partial-Response"] == "country_details"
+        counts = {
+            row["country_details"]["code"]: row["count_of_requests"] for row in response.json()
+        }
+        assert counts == ({"FR": 6, "BE": 6} if storage == "compact" else {"FR": 6, "BE": 1})
+        tasks.drain()
+
+    @responses.activate
+    def test_known_countries_are_not_waited_for(self, client, tasks):
+        Country.objects.create(
+            code="FR",
+            name="France",
+            official_name="French Republic",
+            region="Europe",
+            subregion="Western Europe",
+        )
+        mock_nationalize("Jean")
+
+        response = client.get(reverse("name-probability"), {"name": "Jean"})
+
+        assert not response.has_header("X-Partial-Response")
+        assert tasks.queue == []
+        assert NameCountryProbability.objects.filter(name="Jean").exists()
+
+    @responses.activate
+    def test_failed_enrichment_stores_nothing(self, client, tasks):
+        mock_nationalize("Jean")
+        responses.add(responses.GET, "https://restcountries.com/v3.1/alpha/FR", status=503)
+
+        response = client.get(reverse("name-probability"), {"name": "Jean"})
+        tasks.drain()
+
+        assert response["X-Partial-Response"] == "country_details"
+        assert not NameCountryProbability.objects.exists()
+
+    def test_concurrent_lookups_share_one_fetch(self, tasks):
+        calls = []
+
+        def fetch(code):
+            calls.append(code)
+            return Country(code=code)
+
+        first = enrichment.enrich("FR", fetch)
+        second = enrichment.enrich("FR", fetch)
+        tasks.drain()
+
+        assert first is second
+        assert calls == ["FR"]
+        assert enrichment._inflight == {}
@@ -0,0 +1,112 @@
+import csv
+import gzip
+import io
+import json
+from datetime import timedelta
+
+import pytest
+from django.core.management import call_command
+from django.urls import reverse
+from django.utils import timezone
+
+from api.models import Country, NameCountryProbability
+
+
+@pytest.fixture
+def probabilities():
+    now = timezone.now()
+    france = Country.objects.create(
+        code="FR",
+        name="France",
+        official_name="French Republic",
+        region="Europe",
+        subregion="Western Europe",
+    )
+    japan = Country.objects.create(
+        code="JP", name="Japan", official_name="Japan", region="Asia", subregion="Eastern Asia"
+    )
+    NameCountryProbability.objects.create(
+        name="Camille", country=france, probability=0.7, count_of_requests=3, last_accessed=now
+    )
+    NameCountryProbability.objects.create(
+        name="Haruto",
+        country=japan,
+        probability=0.9,
+        count_of_requests=1,
+        last_accessed=now - timedelta(days=10),
+    )
+
+
+def read(response):
+    return b"".join(response.streaming_content)
+
+
+@pytest.mark.django_db
+class TestExportView:
+    def test_ndjson(self, client, probabilities):
+        response = client.get(reverse("name-probability-export"))
+
+        assert response.status_code == 200
+        assert response["Content-Type"] == "application/x-ndjson"
+        records = [json.loads(line) for line in read(response).decode().splitlines()]
+        assert {r["name"] for r in records} == {"Camille", "Haruto"}
+        assert {r["region"] for r in records} == {"Europe", "Asia"}
+
+    def test_csv_filtered_by_region(self, client, probabilities):
+        response = client.get(
+            reverse("name-probability-export"), {"output": "csv", "region": "Asia"}
+        )
+
+        rows = list(csv.DictReader(io.StringIO(read(response).decode())))
+        assert [row["name"] for row in rows] == ["Haruto"]
+        assert rows[0]["country"] == "JP"
+
+    def test_filtered_by_country_and_access_range(self, client, probabilities):
+        since = (timezone.now() - timedelta(days=1)).date().isoformat()
+        response = client.get(
+            reverse("name-probability-export"), {"accessed_from": since, "country": "fr"}
+        )
+
+        lines = read(response).decode().splitlines()
+        assert [json.loads(line)["name"] for line in lines] == ["Camille"]
+
+    def test_gzip(self, client, probabilities):
+        response = client.get(reverse("name-probability-export"), HTTP_ACCEPT_ENCODING="gzip")
+
+        assert response["Content-Encoding"] == "gzip"
+        assert len(gzip.decompress(read(response)).decode().splitlines()) == 2
+
+    @pytest.mark.parametrize("header", ["gzip;q=0", "br", "identity", "*;q=0"])
+    def test_gzip_refused(self, client, probabilities, header):
+        response = client.get(reverse("name-probability-export"), HTTP_ACCEPT_ENCODING=header)
+
+        assert not response.has_header("Content-Encoding")
+        assert len(read(response).decode().splitlines()) == 2
+
+    def test_gzip_by_wildcard(self, client, probabilities):
+        response = client.get(
+            reverse("name-probability-export"), HTTP_ACCEPT_ENCODING="br, *;q=0.5"
+        )
+
+        assert response["Content-Encoding"] == "gzip"
+
+    def test_invalid_date(self, client):
+        response = client.get(reverse("name-probability-export"), {"accessed_to": "yesterday"})
+
+        assert response.status_code == 400
+        assert "error" in response.json()
+
+    def test_invalid_output(self, client):
+        response = client.get(reverse("name-probability-export"), {"output": "xml"})
+
+        assert response.status_code == 400
+
+
+@pytest.mark.django_db
+def test_export_command(probabilities, tmp_path):
+    path = tmp_path / "export.csv"
+
+    call_command("export_names", output="csv", file=str(path), country="fr")
+
+    rows = list(csv.DictReader(path.open()))
+    assert [row["name"] for row in rows] == ["Camille"]
@@ -0,0 +1,142 @@
+from datetime import timedelta
+
+import pytest
+import responses
+from django.utils import timezone
+from prometheus_client import REGISTRY
+
+from api.freshness import is_fresh, next_ttl, total_variation
+from api.models import Country, NameCountryProbability, NameDistribution
+from api.serializers import NameCountryProbabilitySerializer
+
+DAY = timedelta(days=1)
+
+
+@pytest.fixture
+def countries():
+    return [
+        Country.objects.create(
+            code=code, name=name, official_name=name, region="Europe", subregion="Western Europe"
+        )
+        for code, name in [("FR", "France"), ("BE", "Belgium")]
+    ]
+
+
+def mock_nationalize(name, distribution):
+    responses.add(
+        responses.GET,
+        f"https://api.nationalize.io/?name={name}",
+        json={
+            "name": name,
+            "country": [
+                {"country_id": code, "probability": probability}
+                for code, probability in distribution.items()
+            ],
+        },
+        status=200,
+    )
+
+
+class TestTtlPolicy:
+    def test_total_variation(self):
+        assert total_variation({"FR": 0.6, "BE": 0.4}, {"FR": 0.6, "BE": 0.4}) == 0
+        assert total_variation({"FR": 1.0}, {"BE": 1.0}) == 1
+        assert total_variation({"FR": 0.5, "BE": 0.3}, {"FR": 0.4}) == pytest.approx(0.2)
+
+    def test_stable_distribution_grows_ttl(self):
+        grown = REGISTRY.get_sample_value(
+            "name_refresh_ttl_adjustments_total", {"direction": "grow"}
+        )
+
+        assert next_ttl(DAY, {"FR": 0.8}, {"FR": 0.81}) == 2 * DAY
+        assert (
+            REGISTRY.get_sample_value("name_refresh_ttl_adjustments_total", {"direction": "grow"})
+            == (grown or 0) + 1
+        )
+
+    def test_changed_distribution_shrinks_ttl(self):
+        assert next_ttl(4 * DAY, {"FR": 0.8}, {"FR": 0.5, "BE": 0.3}) == 2 * DAY
+
+    def test_moderate_change_keeps_ttl(self):
+        assert next_ttl(4 * DAY, {"FR": 0.8}, {"FR": 0.75}) == 4 * DAY
+
+    def test_bounds(self, settings):
+        settings.NAME_TTL_MAX_HOURS = 72
+        settings.NAME_TTL_MIN_HOURS = 12
+
+        assert next_ttl(2 * DAY, {"FR": 0.8}, {"FR": 0.8}) == 3 * DAY
+        assert next_ttl(DAY, {"FR": 1.0}, {"BE": 1.0}) == timedelta(hours=12)
+
+    def test_new_name_gets_default(self):
+        assert next_ttl(None, {}, {"FR": 0.8}) == DAY
+
+    def test_fixed_ttl(self, settings):
+        settings.NAME_TTL_ADAPTIVE = False
+
+        assert next_ttl(8 * DAY, {"FR": 0.8}, {"FR": 0.8}) == DAY
+
+    def test_switching_adaptive_off_ignores_stored_ttl(self, settings):
+        now = timezone.now()
+        grown = NameDistribution(name="Jean", fetched_at=now - 3 * DAY, refresh_ttl=30 * DAY)
+
+        assert is_fresh(grown, now)
+
+        settings.NAME_TTL_ADAPTIVE = False
+        assert not is_fresh(grown, now)
+        assert is_fresh(NameDistribution(fetched_at=now - DAY / 2, refresh_ttl=DAY / 4), now)
+
+
+@pytest.mark.django_db
+class TestAdaptiveRefresh:
+    @responses.activate
+    def test_rows_refresh_extends_ttl(self, countries):
+        NameCountryProbability.objects.create(
+            name="Jean",
+            country=countries[0],
+            probability=0.9,
+            fetched_at=timezone.now() - 2 * DAY,
+            refresh_ttl=DAY,
+        )
+        mock_nationalize("Jean", {"FR": 0.9})
+
+        NameCountryProbabilitySerializer.get_or_fetch_probabilities("Jean")
+        # Still fresh a day and a half later, so Nationalize is not called again.
+        NameCountryProbability.objects.filter(name="Jean").update(
+            fetched_at=timezone.now() - timedelta(hours=36)
+        )
+        NameCountryProbabilitySerializer.get_or_fetch_probabilities("Jean")
+
+        assert NameCountryProbability.objects.get(name="Jean").refresh_ttl == 2 * DAY
+        assert len(responses.calls) == 1
+
+    @responses.activate
+    def test_rows_refresh_shrinks_ttl(self, countries):
+        NameCountryProbability.objects.create(
+            name="Lou",
+            country=countries[0],
+            probability=0.9,
+            fetched_at=timezone.now() - 5 * DAY,
+            refresh_ttl=4 * DAY,
+        )
+        mock_nationalize("Lou", {"FR": 0.4, "BE": 0.5})
+
+        NameCountryProbabilitySerializer.get_or_fetch_probabilities("Lou")
+
+        assert set(
+            NameCountryProbability.objects.filter(name="Lou").values_list("refresh_ttl", flat=True)
+        ) == {2 * DAY}
+
+    @responses.activate
+    def test_compact_refresh_extends_ttl(self, countries, settings):
+        settings.NAME_STORAGE = "compact"
+        NameDistribution.objects.create(
+            name="Jean",
+            countries={"FR": 0.9},
+            fetched_at=timezone.now() - 2 * DAY,
+            refresh_ttl=DAY,
+        )
+        mock_nationalize("Jean", {"FR": 0.9})
+
+        NameCountryProbabilitySerializer.get_or_fetch_probabilities("Jean")
+
+        assert NameDistribution.objects.get(name="Jean").refresh_ttl == 2 * DAY
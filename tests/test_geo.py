@@ -0,0 +1,113 @@
+import random
+
+import numpy as np
+import pytest
+from django.urls import reverse
+from django.utils import timezone
+
+from api.geo import CapitalGrid, haversine_km
+from api.models import Country, NameCountryProbability
+
+
+class TestCapitalGrid:
+    def test_haversine(self):
+        # Paris - London
+        distance = haversine_km(48.8566, 2.3522, np.array([51.5074]), np.array([-0.1278]))
+
+        assert distance[0] == pytest.approx(343.5, abs=1)
+
+    def test_matches_brute_force(self):
+        rng = random.Random(1)
+        points = [(rng.uniform(-89, 89), rng.uniform(-180, 180)) for _ in range(400)]
+        codes = [f"C{i}" for i in range(len(points))]
+        grid = CapitalGrid(codes, *zip(*points), cell_degrees=5)
+
+        for latitude, longitude, radius in [(0, 179, 1500), (85, 0, 2000), (-30, -60, 800)]:
+            distances = haversine_km(latitude, longitude, *map(np.array, zip(*points)))
+            expected = {code for code, d in zip(codes, distances) if d <= radius}
+
+            assert {code for code, _ in grid.within(latitude, longitude, radius)} == expected
+
+    def test_results_sorted_by_distance(self):
+        grid = CapitalGrid(["A", "B"], [10, 1], [10, 1], cell_degrees=5)
+
+        assert [code for code, _ in grid.within(0, 0, 3000)] == ["B", "A"]
+
+
+@pytest.mark.django_db
+class TestNearbyNamesView:
+    @pytest.fixture(autouse=True)
+    def data(self):
+        capitals = {
+            "FR": (48.8566, 2.3522),
+            "BE": (50.8503, 4.3517),
+            "JP": (35.6762, 139.6503),
+        }
+        for code, (lat, lon) in capitals.items():
+            country = Country.objects.create(
+                code=code,
+                name=code,
+                official_name=code,
+                region="R",
+                subregion="S",
+                capital_latitude=lat,
+                capital_longitude=lon,
+            )
+            NameCountryProbability.objects.create(
+                name=f"Name{code}",
+                country=country,
+                probability=0.5,
+                count_of_requests=len(code) + ord(code[0]),
+                last_accessed=timezone.now(),
+            )
+
+    def test_around_country_capital(self, client):
+        response = client.get(reverse("popular-names-nearby"), {"country": "FR", "radius_km": 400})
+
+        assert response.status_code == 200
+        assert {row["name"] for row in response.json()} == {"NameFR", "NameBE"}
+
+    def test_around_point(self, client):
+        response = client.get(
+            reverse("popular-names-nearby"), {"lat": 35, "lon": 139, "radius_km": 300}
+        )
+
+        assert [row["name"] for row in response.json()] == ["NameJP"]
+
+    def test_nothing_nearby(self, client):
+        response = client.get(reverse("popular-names-nearby"), {"lat": -60, "lon": 0})
+
+        assert response.status_code == 404
+
+    def test_invalid_parameters(self, client):
+        assert client.get(reverse("popular-names-nearby")).status_code == 400
+        assert client.get(reverse("popular-names-nearby"), {"lat": 95, "lon": 0}).status_code == 400
+        assert (
+            client.get(
+                reverse("popular-names-nearby"), {"country": "FR", "radius_km": 0}
+            ).status_code
+            == 400
+        )
+
+    def test_new_country_invalidates_grid(self, client):
+        client.get(reverse("popular-names-nearby"), {"country": "FR", "radius_km": 400})
+        lux = Country.objects.create(
+            code="LU",
+            name="LU",
+            official_name="LU",
+            region="R",
+            subregion="S",
+            capital_latitude=49.6116,
+            capital_longitude=6.1319,
+        )
+        NameCountryProbability.objects.create(
+            name="Luc",
+            country=lux,
+            probability=0.5,
+            count_of_requests=1,
+            last_accessed=timezone.now(),
+        )
+
+        response = client.get(reverse("popular-names-nearby"), {"country": "FR", "radius_km": 400})
+
+        assert "Luc" in {row["name"] for row in response.json()}
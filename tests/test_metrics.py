@@ -0,0 +1,72 @@
+import pytest
+import responses
+from django.urls import reverse
+from django.utils import timezone
+from prometheus_client import REGISTRY
+
+from api.models import Country, NameCountryProbability
+from api.serializers import NameCountryProbabilitySerializer
+
+
+def sample(name, **labels):
+    return REGISTRY.get_sample_value(name, labels) or 0
+
+
+@pytest.fixture
+def country():
+    return Country.objects.create(
+        code="DE",
+        name="Germany",
+        official_name="Federal Republic of Germany",
+        region="Europe",
+        subregion="Western Europe",
+    )
+
+
+@pytest.mark.django_db
+class TestMetrics:
+    def test_cache_hit_counted(self, country):
+        NameCountryProbability.objects.create(
+            name="Hans", country=country, probability=0.7, last_accessed=timezone.now()
+        )
+        before = sample("name_probability_cache_total", result="hit")
+
+        NameCountryProbabilitySerializer.get_or_fetch_probabilities("Hans")
+
+        assert sample("name_probability_cache_total", result="hit") == before + 1
+
+    @responses.activate
+    def test_cache_miss_and_upstream_latency_counted(self, country):
+        responses.add(
+            responses.GET,
+            "https://api.nationalize.io/?name=Fritz",
+            json={"name": "Fritz", "country": [{"country_id": "DE", "probability": 0.6}]},
+            status=200,
+        )
+        misses = sample("name_probability_cache_total", result="miss")
+        calls = sample(
+            "upstream_request_duration_seconds_count", host="api.nationalize.io", status="200"
+        )
+
+        NameCountryProbabilitySerializer.get_or_fetch_probabilities("Fritz")
+
+        assert sample("name_probability_cache_total", result="miss") == misses + 1
+        assert (
+            sample(
+                "upstream_request_duration_seconds_count",
+                host="api.nationalize.io",
+                status="200",
+            )
+            == calls + 1
+        )
+
+    def test_metrics_endpoint(self, client):
+        client.get(reverse("popular-names"), {"country": "DE"})
+
+        response = client.get(reverse("metrics"))
+
+        assert response.status_code == 200
+        assert response["Content-Type"].startswith("text/plain")
+        body = response.content.decode()
+        assert 'view_db_duration_seconds_count{view="popular-names"}' in body
+        assert "view_response_size_bytes_bucket" in body
@@ -0,0 +1,79 @@
+import pytest
+import responses
+from django.core.management import call_command
+
+from api.models import Country, NameCountryProbability
+from api.name_index import NameIndex, write_index
+from api.serializers import NameCountryProbabilitySerializer
+
+
+@pytest.fixture
+def index_path(tmp_path):
+    path = tmp_path / "names.idx"
+    write_index(
+        path,
+        {
+            "Olga": {"UA": 0.6, "RU": 0.3},
+            "Émile": {"FR": 0.9},
+            "Zoe": {"GR": 0.4},
+        },
+    )
+    return path
+
+
+class TestNameIndex:
+    def test_lookup_is_case_insensitive(self, index_path):
+        index = NameIndex(index_path)
+
+        result = index.lookup("OLGA")
+
+        assert [entry["country_id"] for entry in result] == ["UA", "RU"]
+        assert result[0]["probability"] == pytest.approx(0.6, abs=1e-4)
+        assert index.lookup("émile")[0]["country_id"] == "FR"
+
+    def test_unknown_name(self, index_path):
+        index = NameIndex(index_path)
+
+        assert index.lookup("Nobody") is None
+        assert index.lookup("") is None
+
+    def test_build_command_from_csv(self, tmp_path):
+        source = tmp_path / "names.csv"
+        source.write_text("name,country,probability\nIvan,UA,0.5\nIvan,BG,0.2\n")
+        output = tmp_path / "built.idx"
+
+        call_command("build_name_index", str(source), output=str(output))
+
+        assert [e["country_id"] for e in NameIndex(output).lookup("ivan")] == ["UA", "BG"]
+
+
+@pytest.mark.django_db
+class TestLocalPrediction:
+    @responses.activate
+    def test_known_name_skips_nationalize(self, settings, index_path):
+        settings.NAME_INDEX_PATH = str(index_path)
+        Country.objects.create(
+            code="GR",
+            name="Greece",
+            official_name="Hellenic Republic",
+            region="Europe",
+            subregion="Southern Europe",
+        )
+
+        results = NameCountryProbabilitySerializer.get_or_fetch_probabilities("Zoe")
+
+        assert len(responses.calls) == 0
+        assert [r.country.code for r in results] == ["GR"]
+        assert NameCountryProbability.objects.filter(name="Zoe").count() == 1
+
+    @responses.activate
+    def test_unknown_name_falls_back_to_nationalize(self, settings, index_path):
+        settings.NAME_INDEX_PATH = str(index_path)
+        responses.add(
+            responses.GET,
+            "https://api.nationalize.io/?name=Xyz",
+            json={"name": "Xyz", "country": []},
+        )
+
+        assert NameCountryProbabilitySerializer.get_or_fetch_probabilities("Xyz") is None
+        assert len(responses.calls) == 1
@@ -0,0 +1,87 @@
+import pytest
+import responses
+from django.core.management import call_command
+from django.utils import timezone
+
+from api.models import Country, NameCountryProbability
+from api.ngram_model import NgramModel
+from api.serializers import NameCountryProbabilitySerializer
+
+TRAINING = {
+    "Giovanni": {"IT": 0.9},
+    "Giorgio": {"IT": 0.8},
+    "Gianluca": {"IT": 0.85},
+    "Sven": {"SE": 0.7},
+    "Svenja": {"SE": 0.6},
+    "Sverker": {"SE": 0.9},
+}
+
+
+@pytest.fixture
+def model():
+    names = list(TRAINING)
+    return NgramModel.train(names, [TRAINING[name] for name in names], buckets=2**12)
+
+
+class TestNgramModel:
+    def test_predicts_shape_of_nationalize(self, model):
+        results, confidences = model.predict(["Gianni", "Svend"])
+
+        assert results[0][0]["country_id"] == "IT"
+        assert results[1][0]["country_id"] == "SE"
+        assert set(results[0][0]) == {"country_id", "probability"}
+        assert confidences.shape == (2,)
+
+    def test_unseen_fragments_have_low_confidence(self, model):
+        _, known = model.predict_one("Giovanna")
+        _, unknown = model.predict_one("Xqzw")
+
+        assert known > unknown
+
+    def test_save_and_load(self, model, tmp_path):
+        path = tmp_path / "model.npz"
+        model.save(path)
+
+        loaded = NgramModel.load(path)
+
+        assert loaded.predict(["Gino"])[0] == model.predict(["Gino"])[0]
+
+
+@pytest.mark.django_db
+class TestModelFallback:
+    @pytest.fixture
+    def trained(self, settings, tmp_path):
+        now = timezone.now()
+        for code in ["IT", "SE"]:
+            Country.objects.create(
+                code=code, name=code, official_name=code, region="Europe", subregion="Europe"
+            )
+        for name, distribution in TRAINING.items():
+            for code, probability in distribution.items():
+                NameCountryProbability.objects.create(
+                    name=name, country_id=code, probability=probability, last_accessed=now
+                )
+        settings.NGRAM_MODEL_PATH = str(tmp_path / "model.npz")
+        call_command("train_name_model", buckets=2**12)
+
+    @responses.activate
+    def test_confident_prediction_skips_upstream(self, settings, trained):
+        settings.NGRAM_MIN_CONFIDENCE = 0.1
+
+        results = NameCountryProbabilitySerializer.get_or_fetch_probabilities("Giorgino")
+
+        assert len(responses.calls) == 0
+        assert results[0].country.code == "IT"
+
+    @responses.activate
+    def test_low_confidence_calls_upstream(self, settings, trained):
+        settings.NGRAM_MIN_CONFIDENCE = 1.0
+        responses.add(
+            responses.GET,
+            "https://api.nationalize.io/?name=Giorgino",
+            json={"name": "Giorgino", "country": [{"country_id": "IT", "probability": 0.5}]},
+        )
+
+        NameCountryProbabilitySerializer.get_or_fetch_probabilities("Giorgino")
+
+        assert len(responses.calls) == 1
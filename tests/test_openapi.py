@@ -0,0 +1,96 @@
+import json
+
+import pytest
+from django.core.management import call_command
+from django.urls import reverse
+
+from api.openapi import CachedSchemaView
+from app.settings import env_bool
+
+JSON_FORMAT = {"format": "json"}
+
+
+@pytest.fixture
+def artifact(tmp_path, settings):
+    path = tmp_path / "openapi.json"
+    call_command("spectacular", format="openapi-json", file=str(path))
+    settings.OPENAPI_SCHEMA_PATH = str(path)
+    return path
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    CachedSchemaView._rendered.clear()
+    CachedSchemaView._generated = None
+    yield
+    CachedSchemaView._rendered.clear()
+    CachedSchemaView._generated = None
+
+
+@pytest.mark.django_db
+class TestCachedSchemaView:
+    def test_serves_artifact(self, client, artifact):
+        schema = json.loads(artifact.read_text())
+        schema["info"]["title"] = "From artifact"
+        artifact.write_text(json.dumps(schema))
+
+        response = client.get(reverse("schema"), JSON_FORMAT)
+
+        assert response.status_code == 200
+        assert response.json()["info"]["title"] == "From artifact"
+        assert response["ETag"]
+
+    def test_yaml_by_default(self, client, artifact):
+        response = client.get(reverse("schema"))
+
+        assert response.status_code == 200
+        assert response["Content-Type"].startswith("application/vnd.oai.openapi")
+        assert b"openapi: 3" in response.content
+
+    def test_conditional_request(self, client, artifact):
+        etag = client.get(reverse("schema"), JSON_FORMAT)["ETag"]
+
+        response = client.get(reverse("schema"), JSON_FORMAT, HTTP_IF_NONE_MATCH=etag)
+
+        assert response.status_code == 304
+        assert response["ETag"] == etag
+        assert response.content == b""
+
+    def test_rebuilt_artifact_changes_etag(self, client, artifact):
+        etag = client.get(reverse("schema"), JSON_FORMAT)["ETag"]
+        schema = json.loads(artifact.read_text())
+        schema["info"]["version"] = "2.0.0"
+        artifact.write_text(json.dumps(schema))
+
+        response = client.get(reverse("schema"), JSON_FORMAT, HTTP_IF_NONE_MATCH=etag)
+
+        assert response.status_code == 200
+        assert response.json()["info"]["version"] == "2.0.0"
+
+    def test_missing_artifact_generated_once(self, client, settings, tmp_path, mocker):
+        settings.OPENAPI_SCHEMA_PATH = str(tmp_path / "missing.json")
+        get_schema = mocker.spy(CachedSchemaView.generator_class, "get_schema")
+
+        client.get(reverse("schema"), JSON_FORMAT)
+        response = client.get(reverse("schema"))
+
+        assert response.status_code == 200
+        assert get_schema.call_count == 1
+
+    def test_debug_generates_live(self, client, artifact, settings):
+        artifact.write_text(json.dumps({"openapi": "3.0.3", "info": {"title": "Stale"}}))
+        settings.DEBUG = True
+
+        response = client.get(reverse("schema"), JSON_FORMAT)
+
+        assert response.json()["info"]["title"] == "Name Country Probability"
+
+    @pytest.mark.parametrize("value", ["False", "false", "0", ""])
+    def test_debug_off_serves_artifact(self, client, artifact, settings, monkeypatch, value):
+        monkeypatch.setenv("DEBUG", value)
+        settings.DEBUG = env_bool("DEBUG")
+        artifact.write_text(json.dumps({"openapi": "3.0.3", "info": {"title": "From artifact"}}))
+
+        response = client.get(reverse("schema"), JSON_FORMAT)
+
+        assert response.json()["info"]["title"] == "From artifact"
@@ -0,0 +1,43 @@
+import pytest
+from django.urls import reverse
+
+from api.profiling import make_token
+
+
+@pytest.fixture
+def profiling(settings, tmp_path):
+    settings.PROFILING_ENABLED = True
+    settings.PROFILING_SAMPLE_RATE = 0
+    settings.PROFILING_DIR = str(tmp_path)
+    settings.PROFILING_MAX_FILES = 2
+    return tmp_path
+
+
+@pytest.mark.django_db
+class TestProfilingMiddleware:
+    def test_signed_header_writes_profile(self, client, profiling):
+        client.get(reverse("popular-names"), {"country": "US"}, HTTP_X_PROFILE=make_token())
+
+        profiles = list(profiling.glob("*.prof"))
+        assert len(profiles) == 1
+        assert "popular-names" in profiles[0].name
+
+    def test_invalid_header_is_ignored(self, client, profiling):
+        client.get(reverse("popular-names"), {"country": "US"}, HTTP_X_PROFILE="forged")
+
+        assert list(profiling.glob("*.prof")) == []
+
+    def test_sampling_and_retention_cap(self, client, profiling, settings):
+        settings.PROFILING_SAMPLE_RATE = 1
+
+        for _ in range(4):
+            client.get(reverse("popular-names"), {"country": "US"})
+
+        assert len(list(profiling.glob("*.prof"))) == 2
+
+    def test_disabled(self, client, profiling, settings):
+        settings.PROFILING_ENABLED = False
+
+        client.get(reverse("popular-names"), {"country": "US"}, HTTP_X_PROFILE=make_token())
+
+        assert list(profiling.glob("*.prof")) == []
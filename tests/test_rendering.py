@@ -0,0 +1,156 @@
+import gzip
+import json
+from datetime import datetime
+from datetime import timezone as dt_timezone
+from decimal import Decimal
+
+import brotli
+import msgpack
+import pytest
+from django.http import HttpResponse
+from django.test import RequestFactory
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+
+from api.middleware import CompressionMiddleware, choose_encoding
+from api.models import Country, NameCountryProbability
+from api.renderers import MessagePackRenderer, ORJSONRenderer
+
+
+@pytest.fixture
+def probabilities():
+    country = Country.objects.create(
+        code="FR",
+        name="France",
+        official_name="French Republic",
+        region="Europe",
+        subregion="Western Europe",
+        flag_alt="The flag of France is composed of three equal vertical bands " * 10,
+    )
+    return [
+        NameCountryProbability.objects.create(
+            name="Jean",
+            country=country,
+            probability=0.9,
+            count_of_requests=1,
+            last_accessed=timezone.now(),
+        )
+    ]
+
+
+def compressed_response(body, accept_encoding, content_type="application/json", **headers):
+    request = RequestFactory().get("/", HTTP_ACCEPT_ENCODING=accept_encoding)
+    response = HttpResponse(body, content_type=content_type)
+    for header, value in headers.items():
+        response[header] = value
+    return CompressionMiddleware(lambda request: response)(request)
+
+
+class TestRenderers:
+    data = {
+        "name": "Jean",
+        "probability": 0.9,
+        "amount": Decimal("1.50"),
+        "last_accessed": datetime(2024, 1, 2, 3, 4, 5, tzinfo=dt_timezone.utc),
+        "countries": ["FR", "BE"],
+    }
+
+    def test_orjson_matches_json_renderer(self):
+        assert json.loads(ORJSONRenderer().render(self.data)) == json.loads(
+            JSONRenderer().render(self.data)
+        )
+
+    def test_orjson_indent(self):
+        body = ORJSONRenderer().render({"a": 1}, "application/json; indent=4")
+        assert b"\n" in body
+
+    def test_msgpack_round_trip(self):
+        decoded = msgpack.unpackb(MessagePackRenderer().render(self.data))
+        assert decoded == json.loads(JSONRenderer().render(self.data))
+
+
+@pytest.mark.django_db
+class TestContentNegotiation:
+    def test_msgpack(self, client, probabilities):
+        response = client.get(
+            reverse("name-probability"), {"name": "Jean"}, HTTP_ACCEPT="application/msgpack"
+        )
+
+        assert response["Content-Type"] == "application/msgpack"
+        assert msgpack.unpackb(response.content)[0]["country_details"]["code"] == "FR"
+
+    def test_json_by_default(self, client, probabilities):
+        response = client.get(reverse("name-probability"), {"name": "Jean"})
+
+        assert response["Content-Type"] == "application/json"
+        assert response.json()[0]["name"] == "Jean"
+
+    def test_compressed_api_response(self, client, probabilities):
+        response = client.get(
+            reverse("name-probability"), {"name": "Jean"}, HTTP_ACCEPT_ENCODING="gzip, br"
+        )
+
+        assert response["Content-Encoding"] == "br"
+        assert json.loads(brotli.decompress(response.content))[0]["name"] == "Jean"
+
+
+class TestCompressionMiddleware:
+    body = json.dumps([{"name": f"Name{i}", "total_requests": i} for i in range(200)])
+
+    @pytest.mark.parametrize(
+        "header, expected",
+        [
+            ("gzip, deflate, br", "br"),
+            ("gzip", "gzip"),
+            ("br;q=0, gzip", "gzip"),
+            ("gzip;q=0.5, br;q=0.1", "gzip"),
+            ("*", "br"),
+            ("identity", None),
+            ("", None),
+        ],
+    )
+    def test_choose_encoding(self, header, expected):
+        assert choose_encoding(header) == expected
+
+    def test_gzip(self):
+        response = compressed_response(self.body, "gzip")
+
+        assert response["Content-Encoding"] == "gzip"
+        assert response["Vary"] == "Accept-Encoding"
+        assert int(response["Content-Length"]) == len(response.content)
+        assert gzip.decompress(response.content).decode() == self.body
+
+    def test_small_body_not_compressed(self, settings):
+        settings.COMPRESSION_MIN_SIZE = len(self.body) + 1
+
+        response = compressed_response(self.body, "gzip, br")
+
+        assert not response.has_header("Content-Encoding")
+        assert response["Vary"] == "Accept-Encoding"
+        assert response.content.decode() == self.body
+
+    def test_weakens_etag(self):
+        response = compressed_response(self.body, "br", ETag='"abc"')
+
+        assert response["ETag"] == 'W/"abc"'
+
+    def test_openapi_schema_compressed(self):
+        response = compressed_response(
+            self.body, "gzip", content_type="application/vnd.oai.openapi; charset=utf-8"
+        )
+
+        assert response["Content-Encoding"] == "gzip"
+
+    def test_html_not_compressed(self):
+        # Pages with CSRF tokens must not be compressed (BREACH).
+        response = compressed_response(self.body, "gzip, br", content_type="text/html")
+
+        assert not response.has_header("Content-Encoding")
+        assert response.content.decode() == self.body
+
+    def test_already_encoded_untouched(self):
+        response = compressed_response(self.body, "br", **{"Content-Encoding": "identity"})
+
+        assert response["Content-Encoding"] == "identity"
+        assert response.content.decode() == self.body
@@ -0,0 +1,96 @@
+from datetime import timedelta
+
+import pytest
+from django.core.management import call_command
+from django.utils import timezone
+
+from api.models import Country, NameCountryProbability, NamePopularityArchive
+from api.retention import _purge_batch, purge_cold_rows
+
+
+@pytest.fixture
+def country():
+    return Country.objects.create(
+        code="PL",
+        name="Poland",
+        official_name="Republic of Poland",
+        region="Europe",
+        subregion="Central Europe",
+    )
+
+
+def create_probability(name, country, count, days_ago):
+    return NameCountryProbability.objects.create(
+        name=name,
+        country=country,
+        probability=0.5,
+        count_of_requests=count,
+        last_accessed=timezone.now() - timedelta(days=days_ago),
+    )
+
+
+@pytest.mark.django_db
+class TestPurgeColdNames:
+    def test_purges_only_cold_rows_in_batches(self, country):
+        for i in range(5):
+            create_probability(f"Cold{i}", country, 1, days_ago=200)
+        create_probability("Popular", country, 50, days_ago=200)
+        create_probability("Recent", country, 1, days_ago=1)
+
+        call_command("purge_cold_names", days=90, max_requests=2, batch_size=2, sleep=0)
+
+        remaining = set(NameCountryProbability.objects.values_list("name", flat=True))
+        assert remaining == {"Popular", "Recent"}
+        assert NamePopularityArchive.objects.count() == 5
+
+    def test_archive_accumulates_counts(self, country):
+        NamePopularityArchive.objects.create(
+            name="Anna",
+            country=country,
+            total_requests=3,
+            purged_rows=1,
+            last_purged_at=timezone.now(),
+        )
+        create_probability("Anna", country, 1, days_ago=200)
+
+        call_command("purge_cold_names", days=90, max_requests=2, sleep=0)
+
+        archived = NamePopularityArchive.objects.get(name="Anna", country=country)
+        assert archived.total_requests == 4
+        assert archived.purged_rows == 2
+
+    def test_dry_run_keeps_rows(self, country):
+        create_probability("Cold", country, 1, days_ago=200)
+
+        call_command("purge_cold_names", days=90, max_requests=2, sleep=0, dry_run=True)
+
+        assert NameCountryProbability.objects.filter(name="Cold").exists()
+        assert not NamePopularityArchive.objects.exists()
+
+    def test_row_requested_after_selection_is_kept(self, country):
+        row = create_probability("Cold", country, 1, days_ago=200)
+        # The row is requested between the batch select and the delete.
+        NameCountryProbability.objects.filter(id=row.id).update(
+            count_of_requests=5, last_accessed=timezone.now()
+        )
+
+        assert _purge_batch([row.id], days=90, max_requests=2) == 0
+        assert NameCountryProbability.objects.filter(id=row.id).exists()
+        assert not NamePopularityArchive.objects.exists()
+
+    def test_just_fetched_row_without_accesses_is_kept(self, country):
+        # Stored by a refresh, its accesses not flushed yet.
+        fresh = NameCountryProbability.objects.create(
+            name="Fresh", country=country, probability=0.5, count_of_requests=0
+        )
+        old = NameCountryProbability.objects.create(
+            name="Old",
+            country=country,
+            probability=0.5,
+            count_of_requests=0,
+            fetched_at=timezone.now() - timedelta(days=200),
+        )
+
+        assert purge_cold_rows(days=90, max_requests=2) == 1
+        assert NameCountryProbability.objects.filter(id=fresh.id).exists()
+        assert not NameCountryProbability.objects.filter(id=old.id).exists()
@@ -0,0 +1,178 @@
+from datetime import timedelta
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from api.models import (
+    AreaRequestRollup,
+    Country,
+    NameCountryProbability,
+    NamePopularityRollup,
+    RollupCheckpoint,
+)
+from api.rollups import refresh_rollups
+
+
+@pytest.fixture
+def countries():
+    rows = [
+        ("DE", "Europe", "Western Europe"),
+        ("PL", "Europe", "Central Europe"),
+        ("BR", "Americas", "South America"),
+    ]
+    return {
+        code: Country.objects.create(
+            code=code, name=code, official_name=code, region=region, subregion=subregion
+        )
+        for code, region, subregion in rows
+    }
+
+
+def predict(name, country, count, probability=0.5):
+    return NameCountryProbability.objects.create(
+        name=name,
+        country=country,
+        probability=probability,
+        count_of_requests=count,
+        last_accessed=timezone.now(),
+    )
+
+
+@pytest.mark.django_db
+class TestRefreshRollups:
+    def test_aggregates_per_region_and_subregion(self, countries):
+        predict("Anna", countries["DE"], 4)
+        predict("Anna", countries["PL"], 4)
+        predict("Lucas", countries["BR"], 7)
+
+        refresh_rollups()
+
+        europe = NamePopularityRollup.objects.get(scope="region", area="Europe", name="Anna")
+        assert europe.total_requests == 8
+        assert (
+            NamePopularityRollup.objects.get(
+                scope="subregion", area="Central Europe", name="Anna"
+            ).total_requests
+            == 4
+        )
+
+    def test_incremental_refresh_only_touches_changed_names(self, countries):
+        anna = predict("Anna", countries["DE"], 1)
+        predict("Lucas", countries["BR"], 2)
+        refresh_rollups()
+
+        RollupCheckpoint.objects.update(refreshed_until=timezone.now() - timedelta(seconds=1))
+        NameCountryProbability.objects.filter(pk=anna.pk).update(
+            count_of_requests=5, last_accessed=timezone.now()
+        )
+        NameCountryProbability.objects.filter(name="Lucas").update(
+            count_of_requests=9, last_accessed=timezone.now() - timedelta(days=1)
+        )
+
+        assert refresh_rollups() == 1
+        rollups = dict(
+            NamePopularityRollup.objects.filter(scope="region").values_list(
+                "name", "total_requests"
+            )
+        )
+        assert rollups == {"Anna": 5, "Lucas": 2}
+
+    def test_incremental_refresh_only_recomputes_touched_areas(self, countries):
+        anna = predict("Anna", countries["DE"], 1)
+        predict("Lucas", countries["BR"], 2)
+        refresh_rollups()
+
+        RollupCheckpoint.objects.update(refreshed_until=timezone.now() - timedelta(seconds=1))
+        NameCountryProbability.objects.filter(name="Lucas").update(
+            last_accessed=timezone.now() - timedelta(days=1)
+        )
+        # Marks the untouched area: a recomputation would reset it to 2.
+        AreaRequestRollup.objects.filter(area="Americas").update(total_requests=100)
+        anna.delete()
+        predict("Anna", countries["PL"], 3)
+
+        refresh_rollups()
+
+        volumes = dict(
+            AreaRequestRollup.objects.filter(scope="subregion").values_list(
+                "area", "total_requests"
+            )
+        )
+        assert volumes == {"Central Europe": 3, "South America": 2}
+        assert AreaRequestRollup.objects.get(scope="region", area="Americas").total_requests == 100
+        assert AreaRequestRollup.objects.get(scope="region", area="Europe").total_requests == 3
+
+    def test_incremental_refresh_reads_changed_names_once(self, countries, monkeypatch):
+        monkeypatch.setattr("api.rollups.BATCH_SIZE", 1)
+        RollupCheckpoint.objects.create(
+            key="name-popularity", refreshed_until=timezone.now() - timedelta(hours=1)
+        )
+        for name in ("Anna", "Ben", "Lucas"):
+            predict(name, countries["DE"], 1)
+
+        with CaptureQueriesContext(connection) as queries:
+            assert refresh_rollups() == 3
+
+        scans = [q["sql"] for q in queries if '"last_accessed" >=' in q["sql"]]
+        assert len(scans) == 1
+
+
+@pytest.mark.django_db
+class TestAnalyticsViews:
+    @pytest.fixture(autouse=True)
+    def data(self, countries):
+        predict("Anna", countries["DE"], 4, probability=0.6)
+        predict("Anna", countries["PL"], 4, probability=0.2)
+        predict("Jan", countries["PL"], 6, probability=0.8)
+        predict("Lucas", countries["BR"], 7, probability=0.9)
+        refresh_rollups()
+
+    def test_top_names_by_region(self, client):
+        response = client.get(reverse("area-top-names"), {"region": "Europe"})
+
+        assert response.status_code == 200
+        assert response.json() == [
+            {"name": "Anna", "total_requests": 8},
+            {"name": "Jan", "total_requests": 6},
+        ]
+
+    def test_top_names_by_subregion_with_limit(self, client):
+        response = client.get(
+            reverse("area-top-names"), {"subregion": "Central Europe", "limit": 1}
+        )
+
+        assert response.json() == [{"name": "Jan", "total_requests": 6}]
+
+    def test_top_names_requires_one_scope(self, client):
+        response = client.get(reverse("area-top-names"))
+
+        assert response.status_code == 400
+
+    def test_top_names_unknown_region(self, client):
+        response = client.get(reverse("area-top-names"), {"region": "Antarctica"})
+
+        assert response.status_code == 404
+
+    def test_volume(self, client):
+        response = client.get(reverse("area-volume"))
+
+        assert response.json() == [
+            {"area": "Europe", "total_requests": 14, "names": 2},
+            {"area": "Americas", "total_requests": 7, "names": 1},
+        ]
+
+    def test_country_distribution(self, client):
+        response = client.get(reverse("country-distribution"), {"names": "Anna,Jan"})
+
+        data = response.json()
+        assert [row["country"] for row in data] == ["PL", "DE"]
+        assert data[0]["names"] == 2
+        assert data[0]["mean_probability"] == pytest.approx(0.5)
+
+    def test_country_distribution_requires_names(self, client):
+        response = client.get(reverse("country-distribution"), {"names": " , "})
+
+        assert response.status_code == 400
@@ -2,6 +2,8 @@ from datetime import timedelta
 
 import pytest
 import responses
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from django.utils import timezone
 
 from api.models import Country, NameCountryProbability
@@ -140,13 +142,52 @@ class TestNameCountryProbabilitySerializer:
         assert results[0].name == "Marie"
         assert results[0].probability == 0.75
 
+    @responses.activate
+    def test_country_created_concurrently(self):
+        def other_worker_wins(request):
+            Country.objects.create(code="FR", name="France")
+            return 200, {}, '{"name": {"common": "France"}, "borders": ["BE"]}'
+
+        responses.add_callback(
+            responses.GET, "https://restcountries.com/v3.1/alpha/FR", callback=other_worker_wins
+        )
+
+        country = NameCountryProbabilitySerializer._get_or_create_country("FR")
+
+        assert country.pk == Country.objects.get(code="FR").pk
+        # Borders are linked by the worker that created the row.
+        assert len(responses.calls) == 1
+
+    @responses.activate
+    def test_border_country_error_is_logged(self, caplog):
+        responses.add(
+            responses.GET,
+            "https://restcountries.com/v3.1/alpha/FR",
+            json={"name": {"common": "France"}, "borders": ["BE", "DE"]},
+            status=200,
+        )
+        responses.add(responses.GET, "https://restcountries.com/v3.1/alpha/BE", status=503)
+        responses.add(
+            responses.GET,
+            "https://restcountries.com/v3.1/alpha/DE",
+            json={"name": {"common": "Germany"}, "borders": ["FR"]},
+            status=200,
+        )
+
+        with caplog.at_level("ERROR", logger="api.serializers"):
+            country = NameCountryProbabilitySerializer._get_or_create_country("FR")
+
+        assert [border.code for border in country.borders.all()] == ["DE"]
+        assert "Error processing border country BE" in caplog.text
+
     def test_get_or_fetch_probabilities_outdated(self, country):
         old_prob = NameCountryProbability.objects.create(
             name="Louis",
             country=country,
             probability=0.8,
             count_of_requests=1,
-            last_accessed=timezone.now() - timedelta(days=2),
+            last_accessed=timezone.now(),
+            fetched_at=timezone.now() - timedelta(days=2),
         )
 
         with responses.RequestsMock() as rsps:
@@ -207,6 +248,47 @@ class TestNameCountryProbabilitySerializer:
         probabilities = [r.probability for r in results]
         assert probabilities == [0.4, 0.3, 0.2]
 
+    def test_replace_probabilities_drops_missing_countries(self, country):
+        germany = Country.objects.create(
+            code="DE",
+            name="Germany",
+            official_name="Federal Republic of Germany",
+            region="Europe",
+            subregion="Western Europe",
+        )
+        for c in [country, germany]:
+            NameCountryProbability.objects.create(
+                name="Paul", country=c, probability=0.4, count_of_requests=3
+            )
+
+        results = NameCountryProbabilitySerializer._replace_probabilities("Paul", [(country, 0.9)])
+
+        # Refreshing a distribution is not a request; counters are kept as is.
+        assert [(r.country.code, r.probability, r.count_of_requests) for r in results] == [
+            ("FR", 0.9, 3)
+        ]
+        assert list(
+            NameCountryProbability.objects.filter(name="Paul").values_list("country", flat=True)
+        ) == ["FR"]
+
+    def test_replace_probabilities_statement_count_is_constant(self, country):
+        countries = [country] + [
+            Country.objects.create(
+                code=f"X{i}", name=f"C{i}", official_name=f"C{i}", region="R", subregion="S"
+            )
+            for i in range(4)
+        ]
+
+        with CaptureQueriesContext(connection) as single:
+            NameCountryProbabilitySerializer._replace_probabilities("Ann", [(country, 1.0)])
+        with CaptureQueriesContext(connection) as several:
+            NameCountryProbabilitySerializer._replace_probabilities(
+                "Ann", [(c, 0.2) for c in countries]
+            )
+
+        assert len(several.captured_queries) == len(single.captured_queries)
+        assert NameCountryProbability.objects.filter(name="Ann").count() == 5
+
 
 @pytest.mark.django_db
 class TestPopularNamesSerializer:
@@ -0,0 +1,30 @@
+import pytest
+
+from api.management.commands.bench_settings_profiles import OPTIONAL_MODULES, run_profile
+
+
+@pytest.fixture(scope="module")
+def api_profile():
+    return run_profile("app.settings_api", requests=5)
+
+
+def test_api_profile_serves_api_endpoints(api_profile):
+    assert api_profile["status"] == 400
+    assert api_profile["content_type"] == "application/json"
+
+
+def test_api_profile_skips_docs_admin_and_sessions(api_profile):
+    assert api_profile["loaded"] == []
+
+
+def test_api_profile_appends_slash():
+    profile = run_profile("app.settings_api", path="/api/names", requests=0)
+
+    assert profile["status"] == 301
+
+
+def test_full_profile_loads_optional_modules():
+    full = run_profile("app.settings", requests=1)
+
+    assert full["status"] == 400
+    assert set(full["loaded"]) == set(OPTIONAL_MODULES)
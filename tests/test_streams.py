@@ -0,0 +1,148 @@
+import asyncio
+import json
+
+import pytest
+from asgiref.sync import async_to_sync, sync_to_async
+from django.test import AsyncClient
+from django.urls import reverse
+
+from api.models import Country, NameCountryProbability
+from api.serializers import PopularNamesSerializer
+from api.streams import Subscriber, hub, popular_names_events
+
+
+@pytest.fixture
+def country():
+    return Country.objects.create(
+        code="FR",
+        name="France",
+        official_name="French Republic",
+        region="Europe",
+        subregion="Western Europe",
+    )
+
+
+@pytest.fixture
+def fast_stream(settings):
+    settings.POPULAR_STREAM_POLL_SECONDS = 0.01
+    settings.POPULAR_STREAM_HEARTBEAT_SECONDS = 0.05
+
+
+def set_requests(country, **counts):
+    for name, count in counts.items():
+        NameCountryProbability.objects.update_or_create(
+            name=name,
+            country=country,
+            defaults={"probability": 0.5, "count_of_requests": count},
+        )
+
+
+def parse(chunk):
+    fields = dict(
+        line.split(": ", 1) for line in chunk.decode().strip().split("\n") if ": " in line
+    )
+    return fields["event"], json.loads(fields["data"])
+
+
+async def next_ranking(events):
+    while True:
+        chunk = await asyncio.wait_for(events.__anext__(), 1)
+        if chunk.startswith(b"event:"):
+            return parse(chunk)[1]
+
+
+class TestSubscriber:
+    def test_keeps_latest_update_per_country(self):
+        async def scenario():
+            subscriber = Subscriber()
+            subscriber.offer("FR", b"old")
+            subscriber.offer("DE", b"de")
+            subscriber.offer("FR", b"new")
+            return await subscriber.next_batch(1), await subscriber.next_batch(0.01)
+
+        delivered, idle = async_to_sync(scenario)()
+
+        assert delivered == [b"new", b"de"]
+        assert idle == []
+
+
+@pytest.mark.django_db
+class TestPopularNamesStream:
+    def test_pushes_only_ranking_changes(self, country, fast_stream):
+        set_requests(country, Jean=5, Marie=3)
+
+        async def scenario():
+            events = popular_names_events(["FR"])
+            try:
+                assert (await events.__anext__()).startswith(b"retry:")
+                first = await next_ranking(events)
+
+                # Same order, new counts: only keepalives follow.
+                await sync_to_async(set_requests)(country, Jean=6)
+                assert await asyncio.wait_for(events.__anext__(), 1) == b": keepalive\n\n"
+
+                await sync_to_async(set_requests)(country, Marie=10)
+                second = await next_ranking(events)
+            finally:
+                await events.aclose()
+            return first, second
+
+        first, second = async_to_sync(scenario)()
+
+        assert first == {
+            "country": "FR",
+            "names": [
+                {"name": "Jean", "total_requests": 5},
+                {"name": "Marie", "total_requests": 3},
+            ],
+        }
+        assert [entry["name"] for entry in second["names"]] == ["Marie", "Jean"]
+        assert hub.feeds == {}
+
+    def test_subscribers_share_one_computation(self, country, fast_stream, mocker):
+        set_requests(country, Jean=5)
+        ranking = mocker.spy(PopularNamesSerializer, "ranking")
+
+        async def scenario():
+            streams = [popular_names_events(["FR"]) for _ in range(3)]
+            try:
+                return [await next_ranking(events) for events in streams]
+            finally:
+                for events in streams:
+                    await events.aclose()
+
+        updates = async_to_sync(scenario)()
+
+        assert len({json.dumps(update) for update in updates}) == 1
+        # One poll served all three streams (a second may have started meanwhile).
+        assert ranking.call_count <= 2
+
+    def test_view(self, country, fast_stream):
+        set_requests(country, Jean=5)
+
+        async def scenario():
+            response = await AsyncClient().get(reverse("popular-names-stream"), {"country": "fr"})
+            events = response.streaming_content
+            try:
+                return response, await next_ranking(events)
+            finally:
+                await events.aclose()
+
+        response, update = async_to_sync(scenario)()
+
+        assert response["Content-Type"] == "text/event-stream"
+        assert response["Cache-Control"] == "no-cache"
+        assert update["names"] == [{"name": "Jean", "total_requests": 5}]
+
+    def test_refused_under_wsgi(self, client):
+        response = client.get(reverse("popular-names-stream"), {"country": "fr"})
+
+        assert response.status_code == 501
+        assert "error" in response.json()
+
+    @pytest.mark.parametrize("codes", ["", "FRA", "FR,D"])
+    def test_invalid_countries(self, client, codes):
+        response = client.get(reverse("popular-names-stream"), {"country": codes})
+
+        assert response.status_code == 400
+        assert "error" in response.json()
@@ -0,0 +1,153 @@
+import json
+import random
+import threading
+from collections import Counter
+
+import pytest
+from django.urls import reverse
+from django.utils import timezone
+
+from api import trending
+from api.models import Country, NameCountryProbability
+from api.trending import SpaceSaving, TrendingTracker, current_window
+
+
+@pytest.fixture
+def tracker(settings, tmp_path, monkeypatch):
+    settings.TRENDING_DIR = str(tmp_path)
+    settings.TRENDING_CAPACITY = 10
+    fresh = TrendingTracker()
+    monkeypatch.setattr(trending, "tracker", fresh)
+    return fresh
+
+
+def zipf_stream(seed, size):
+    rng = random.Random(seed)
+    names = [f"n{i}" for i in range(200)]
+    weights = [1 / (i + 1) for i in range(len(names))]
+    return rng.choices(names, weights, k=size)
+
+
+class TestSpaceSaving:
+    def test_error_bounds(self):
+        stream = zipf_stream(0, 5000)
+        exact = Counter(stream)
+        summary = SpaceSaving(20)
+        for name in stream:
+            summary.offer(name)
+
+        for name, (count, error) in summary.counters.items():
+            assert count - error <= exact[name] <= count
+            assert error <= len(stream) / 20
+        for name, true_count in exact.items():
+            if true_count > len(stream) / 20:
+                assert name in summary.counters
+
+    def test_merge_keeps_bounds(self):
+        streams = [zipf_stream(seed, 3000) for seed in range(3)]
+        exact = Counter(name for stream in streams for name in stream)
+        summaries = []
+        for stream in streams:
+            summary = SpaceSaving(20)
+            for name in stream:
+                summary.offer(name)
+            summaries.append(summary)
+
+        merged = SpaceSaving.merge(summaries, 20)
+
+        assert merged.total == 9000
+        for name, (count, error) in merged.counters.items():
+            assert count - error <= exact[name] <= count
+            assert error <= merged.total / 20
+        assert merged.top(1)[0]["name"] == "n0"
+
+
+class TestTrendingTracker:
+    def test_concurrent_publishes(self, tracker, tmp_path, settings):
+        settings.TRENDING_PUBLISH_SECONDS = 0
+        errors = []
+
+        def work(worker):
+            try:
+                for i in range(100):
+                    tracker.record(f"n{worker}", ["CZ"])
+                    tracker.publish()
+            except Exception as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=work, args=(i,)) for i in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert errors == []
+        assert [path.suffix for path in tmp_path.iterdir()] == [".json"]
+        published = json.loads(next(tmp_path.iterdir()).read_text())
+        assert published["countries"]["CZ"]["total"] == 800
+
+    def test_publish_failure_does_not_fail_record(self, tracker, settings, mocker):
+        settings.TRENDING_PUBLISH_SECONDS = 0
+        mocker.patch.object(tracker, "publish", side_effect=OSError("disk full"))
+
+        tracker.record("Jan", ["CZ"])
+
+        assert tracker.snapshot()["countries"]["CZ"]["total"] == 1
+
+    def test_reading_does_not_publish(self, tracker, settings, mocker):
+        settings.TRENDING_PUBLISH_SECONDS = 3600
+        tracker.record("Jan", ["CZ"])
+        publish = mocker.spy(tracker, "publish")
+
+        data = trending.trending_names("CZ", 5)
+
+        # This worker's own counters are read from memory.
+        assert publish.call_count == 0
+        assert data["names"] == [{"name": "Jan", "count": 1, "error": 0}]
+
+
+@pytest.mark.django_db
+class TestTrendingNamesView:
+    def test_fed_from_lookups_without_db_writes(self, client, tracker, django_assert_num_queries):
+        country = Country.objects.create(
+            code="CZ",
+            name="Czechia",
+            official_name="Czech Republic",
+            region="Europe",
+            subregion="Central Europe",
+        )
+        for name in ["Jakub", "Tereza"]:
+            NameCountryProbability.objects.create(
+                name=name, country=country, probability=0.7, last_accessed=timezone.now()
+            )
+        for name in ["Jakub", "Jakub", "Tereza"]:
+            client.get(reverse("name-probability"), {"name": name})
+
+        with django_assert_num_queries(0):
+            response = client.get(reverse("popular-names-trending"), {"country": "CZ"})
+
+        data = response.json()
+        assert data["total"] == 3
+        assert data["names"][0] == {"name": "Jakub", "count": 2, "error": 0}
+
+    def test_merges_other_workers(self, client, tracker, tmp_path):
+        tracker.record("Jan", ["CZ"])
+        other = SpaceSaving(10)
+        other.offer("Jan", 4)
+        other.offer("Eva", 2)
+        (tmp_path / "99999.json").write_text(
+            json.dumps({"window": current_window(), "countries": {"CZ": other.to_dict()}})
+        )
+        (tmp_path / "99998.json").write_text(
+            json.dumps({"window": current_window() - 5, "countries": {"CZ": other.to_dict()}})
+        )
+
+        data = client.get(reverse("popular-names-trending"), {"country": "CZ"}).json()
+
+        assert [(n["name"], n["count"]) for n in data["names"]] == [("Jan", 5), ("Eva", 2)]
+        assert not (tmp_path / "99998.json").exists()
+
+    def test_invalid_country(self, client, tracker):
+        response = client.get(reverse("popular-names-trending"), {"country": "CZE"})
+
+        assert response.status_code == 400
@@ -0,0 +1,149 @@
+import os
+
+import pytest
+import requests
+import responses
+from responses import matchers
+
+from api import upstream
+from api.models import Country, NameCountryProbability
+from api.serializers import NameCountryProbabilitySerializer
+
+URL = "https://api.nationalize.io/?name=Marie"
+BODY = {"name": "Marie", "country": [{"country_id": "FR", "probability": 0.75}]}
+
+
+@pytest.fixture
+def cache_dir(tmp_path, settings):
+    settings.UPSTREAM_CACHE_DIR = str(tmp_path)
+    upstream._cache_for.cache_clear()
+    yield tmp_path
+    upstream._cache_for.cache_clear()
+
+
+class TestUpstreamCache:
+    @responses.activate
+    def test_fresh_response_served_from_disk(self, cache_dir):
+        responses.add(responses.GET, URL, json=BODY, headers={"Cache-Control": "max-age=60"})
+
+        first = upstream.get(URL)
+        second = upstream.get(URL)
+
+        assert len(responses.calls) == 1
+        assert second.json() == first.json() == BODY
+        assert second.from_cache
+
+    @responses.activate
+    def test_revalidates_with_etag(self, cache_dir):
+        responses.add(responses.GET, URL, json=BODY, headers={"ETag": '"v1"'})
+        upstream.get(URL)
+
+        responses.replace(
+            responses.GET,
+            URL,
+            status=304,
+            headers={"ETag": '"v1"'},
+            match=[matchers.header_matcher({"If-None-Match": '"v1"'})],
+        )
+        response = upstream.get(URL)
+
+        assert len(responses.calls) == 2
+        assert response.status_code == 200
+        assert response.json() == BODY
+
+    @responses.activate
+    def test_changed_response_replaces_entry(self, cache_dir):
+        responses.add(responses.GET, URL, json=BODY, headers={"ETag": '"v1"'})
+        upstream.get(URL)
+        changed = {"name": "Marie", "country": [{"country_id": "BE", "probability": 0.5}]}
+        responses.replace(responses.GET, URL, json=changed, headers={"ETag": '"v2"'})
+
+        assert upstream.get(URL).json() == changed
+        assert upstream.get_cache().load(URL).headers["ETag"] == '"v2"'
+
+    @responses.activate
+    def test_no_store_and_errors_not_cached(self, cache_dir):
+        responses.add(responses.GET, URL, json=BODY, headers={"Cache-Control": "no-store"})
+        other = "https://restcountries.com/v3.1/alpha/XX"
+        responses.add(responses.GET, other, status=404)
+
+        upstream.get(URL)
+        upstream.get(other)
+
+        assert upstream.get_cache().stats() == (0, 0)
+
+    @responses.activate
+    def test_stale_entry_served_when_upstream_fails(self, cache_dir):
+        responses.add(responses.GET, URL, json=BODY)
+        upstream.get(URL)
+        responses.replace(responses.GET, URL, body=requests.ConnectionError("down"))
+
+        assert upstream.get(URL).json() == BODY
+
+    @responses.activate
+    def test_offline_mode(self, cache_dir, settings):
+        responses.add(responses.GET, URL, json=BODY)
+        upstream.get(URL)
+        settings.UPSTREAM_CACHE_OFFLINE = True
+
+        assert upstream.get(URL).json() == BODY
+        with pytest.raises(requests.ConnectionError):
+            upstream.get("https://api.nationalize.io/?name=Unknown")
+        assert len(responses.calls) == 1
+
+    @responses.activate
+    def test_least_recently_used_evicted(self, cache_dir):
+        urls = [f"https://api.nationalize.io/?name=N{i}" for i in range(3)]
+        for url in urls:
+            responses.add(responses.GET, url, body=b"x" * 1000)
+        cache = upstream.get_cache()
+
+        for i, url in enumerate(urls[:2]):
+            upstream.get(url)
+            os.utime(cache.path(url), (i, i))
+        # Room for two entries; reading the first makes the second the oldest.
+        cache.max_bytes = int(os.path.getsize(cache.path(urls[0])) * 2.3)
+        cache.load(urls[0])
+        upstream.get(urls[2])
+
+        assert cache.load(urls[1]) is None
+        assert cache.load(urls[0]) is not None
+        assert cache.load(urls[2]) is not None
+
+    @responses.activate
+    def test_rewrites_do_not_grow_tracked_size(self, cache_dir):
+        responses.add(responses.GET, URL, json=BODY)
+        cache = upstream.get_cache()
+
+        for _ in range(5):
+            upstream.get(URL)
+
+        assert cache._size == cache.stats()[1]
+
+
+@pytest.mark.django_db
+class TestOfflineRebuild:
+    @responses.activate
+    def test_probabilities_rebuilt_without_network(self, cache_dir, settings):
+        responses.add(responses.GET, URL, json=BODY)
+        responses.add(
+            responses.GET,
+            "https://restcountries.com/v3.1/alpha/FR",
+            json=[
+                {
+                    "name": {"common": "France", "official": "French Republic"},
+                    "region": "Europe",
+                    "subregion": "Western Europe",
+                }
+            ],
+        )
+        NameCountryProbabilitySerializer.get_or_fetch_probabilities("Marie")
+        calls = len(responses.calls)
+
+        NameCountryProbability.objects.all().delete()
+        Country.objects.all().delete()
+        settings.UPSTREAM_CACHE_OFFLINE = True
+        results = NameCountryProbabilitySerializer.get_or_fetch_probabilities("Marie")
+
+        assert len(responses.calls) == calls
+        assert [(r.country.name, r.probability) for r in results] == [("France", 0.75)]
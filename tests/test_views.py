@@ -74,7 +74,7 @@ class TestNameProbabilityView:
         assert data[0]["country_details"]["name"] == "United States"
 
     def test_get_existing_name_outdated(self, client, name_probability):
-        name_probability.last_accessed = timezone.now() - timedelta(days=2)
+        name_probability.fetched_at = timezone.now() - timedelta(days=2)
         name_probability.save()
 
         with responses.RequestsMock() as rsps: